@@ -141,13 +141,11 @@ class Alias(commands.Cog):
         :param message: Message object
         :return:
         """
-        content = message.content
-        prefix_list = await self.bot.command_prefix(self.bot, message)
-        prefixes = sorted(prefix_list, key=lambda pfx: len(pfx), reverse=True)
-        for p in prefixes:
-            if content.startswith(p):
-                return p
-        raise ValueError("No prefix found.")
+        # The message's prefix has already been resolved when its commands were processed
+        ctx = await self.bot.get_cached_context(message)
+        if ctx.prefix is None:
+            raise ValueError("No prefix found.")
+        return ctx.prefix
 
     async def call_alias(self, message: discord.Message, prefix: str, alias: AliasEntry):
         new_message = self.translate_alias_message(message, prefix, alias)
@@ -473,9 +471,8 @@ class Alias(commands.Cog):
             if await self.bot.cog_disabled_in_guild(self, message.guild):
                 return
 
-        try:
-            prefix = await self.get_prefix(message)
-        except ValueError:
+        prefix = (await self.bot.get_cached_context(message)).prefix
+        if prefix is None:
             return
 
         try:
@@ -652,7 +652,7 @@ class CustomCommands(commands.Cog):
         if await self.bot.cog_disabled_in_guild(self, message.guild):
             return
 
-        ctx = await self.bot.get_context(message)
+        ctx = await self.bot.get_cached_context(message)
 
         if ctx.prefix is None:
             return
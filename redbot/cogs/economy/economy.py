@@ -13,7 +13,6 @@ from redbot.core import Config, bank, commands, errors
 from redbot.core.commands.converter import TimedeltaConverter, positive_int
 from redbot.core.bot import Red
 from redbot.core.i18n import Translator, cog_i18n
-from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import box, humanize_number
 from redbot.core.utils.menus import menu
 
@@ -168,10 +167,8 @@ class Economy(commands.Cog):
 
         await self.config.user_from_id(user_id).clear()
 
-        all_members = await self.config.all_members()
-
-        async for guild_id, guild_data in AsyncIter(all_members.items(), steps=100):
-            if user_id in guild_data:
+        async for guild_id, member_id, __ in self.config.iter_all_members(batch_size=100):
+            if member_id == user_id:
                 await self.config.member_from_ids(guild_id, user_id).clear()
 
     @guild_only_check()
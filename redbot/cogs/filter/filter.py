@@ -490,8 +490,10 @@ class Filter(commands.Cog):
     async def check_filter(self, message: discord.Message):
         guild = message.guild
         author = message.author
-        guild_data = await self.config.guild(guild).all()
-        member_data = await self.config.member(author).all()
+        guild_data = await self.config.guild(guild).get_fields("filterban_count", "filterban_time")
+        member_data = await self.config.member(author).get_fields(
+            "filter_count", "next_reset_time"
+        )
         filter_count = guild_data["filterban_count"]
         filter_time = guild_data["filterban_time"]
         user_count = member_data["filter_count"]
@@ -501,11 +503,12 @@ class Filter(commands.Cog):
         if filter_count > 0 and filter_time > 0:
             if created_at.timestamp() >= next_reset_time:
                 next_reset_time = created_at.timestamp() + filter_time
-                async with self.config.member(author).all() as member_data:
-                    member_data["next_reset_time"] = next_reset_time
+                member_group = self.config.member(author)
+                async with member_group.batch():
+                    await member_group.next_reset_time.set(next_reset_time)
                     if user_count > 0:
                         user_count = 0
-                        member_data["filter_count"] = user_count
+                        await member_group.filter_count.set(user_count)
 
         texts = [message.content]
         poll = message.poll
@@ -545,8 +548,7 @@ class Filter(commands.Cog):
             else:
                 self.bot.dispatch("filter_message_delete", message, hits)
                 if filter_count > 0 and filter_time > 0:
-                    user_count += 1
-                    await self.config.member(author).filter_count.set(user_count)
+                    user_count = await self.config.member(author).filter_count.inc()
                     if user_count >= filter_count and created_at.timestamp() < next_reset_time:
                         reason = _("Autoban (too many filtered messages.)")
                         try:
@@ -91,17 +91,13 @@ class Mod(
         if requester != "discord_deleted_user":
             return
 
-        all_members = await self.config.all_members()
-
-        async for guild_id, guild_data in AsyncIter(all_members.items(), steps=100):
-            if user_id in guild_data:
+        async for guild_id, member_id, __ in self.config.iter_all_members(batch_size=100):
+            if member_id == user_id:
                 await self.config.member_from_ids(guild_id, user_id).clear()
 
         await self.config.user_from_id(user_id).clear()
 
-        guild_data = await self.config.all_guilds()
-
-        async for guild_id, guild_data in AsyncIter(guild_data.items(), steps=100):
+        async for guild_id, guild_data in self.config.iter_all_guilds(batch_size=100):
             if user_id in guild_data["current_tempbans"]:
                 async with self.config.guild_from_id(guild_id).current_tempbans() as tbs:
                     try:
@@ -0,0 +1,96 @@
+"""Optional instrumentation of Config's storage access.
+
+While disabled, ``collector`` is ``None`` and the only cost to Config
+is checking that. While enabled, each driver call made by Config is
+timed, and the values read and written are JSON encoded to count their
+size, so it should only be enabled while investigating performance.
+"""
+import json
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ._drivers import IdentifierData
+from ._drivers.metrics import LatencyHistogram
+
+__all__ = ("ConfigStats", "collector", "enable", "disable")
+
+
+class _OperationStats:
+    __slots__ = ("latency", "bytes")
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.bytes = 0
+
+
+class ConfigStats:
+    """Storage access statistics, per cog name, category and operation."""
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._operations: Dict[Tuple[str, str, str], _OperationStats] = {}
+        self._lock_waits: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def record(
+        self,
+        operation: str,
+        identifier_data: IdentifierData,
+        seconds: float,
+        value: Any = ...,
+    ) -> None:
+        """Record a driver call, and the size of the value read or written."""
+        key = (identifier_data.cog_name, identifier_data.category, operation)
+        try:
+            stats = self._operations[key]
+        except KeyError:
+            stats = self._operations[key] = _OperationStats()
+        stats.latency.observe(seconds)
+        if value is not ...:
+            stats.bytes += _encoded_size(value)
+
+    def record_lock_wait(self, identifier_data: IdentifierData, seconds: float) -> None:
+        """Record the time spent waiting for a value's lock."""
+        key = (identifier_data.cog_name, identifier_data.category)
+        try:
+            histogram = self._lock_waits[key]
+        except KeyError:
+            histogram = self._lock_waits[key] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the statistics as JSON serializable data, grouped by cog name."""
+        cogs: Dict[str, Any] = {}
+        for (cog_name, category, operation), stats in sorted(self._operations.items()):
+            cog = cogs.setdefault(cog_name, {"operations": {}, "lock_waits": {}})
+            cog["operations"].setdefault(category, {})[operation] = {
+                **stats.latency.to_dict(),
+                "bytes": stats.bytes,
+            }
+        for (cog_name, category), histogram in sorted(self._lock_waits.items()):
+            cog = cogs.setdefault(cog_name, {"operations": {}, "lock_waits": {}})
+            cog["lock_waits"][category] = histogram.to_dict()
+        return {"started_at": self.started_at, "cogs": cogs}
+
+
+def _encoded_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+#: The statistics being collected, or ``None`` when disabled.
+collector: Optional[ConfigStats] = None
+
+
+def enable() -> ConfigStats:
+    """Start collecting statistics, discarding any collected so far."""
+    global collector
+    collector = ConfigStats()
+    return collector
+
+
+def disable() -> None:
+    """Stop collecting statistics."""
+    global collector
+    collector = None
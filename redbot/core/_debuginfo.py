@@ -4,14 +4,14 @@ import getpass
 import os
 import platform
 import sys
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import discord
 import pip
 import psutil
 
 from redbot import __version__
-from redbot.core import data_manager
+from redbot.core import data_manager, _config_stats, _drivers as drivers
 from redbot.core.bot import Red
 from redbot.core.utils.chat_formatting import box
 
@@ -20,6 +20,14 @@ def noop_box(text: str, **kwargs) -> str:
     return text
 
 
+def _format_latency(name: str, histogram: Dict[str, Any]) -> str:
+    return (
+        f"{name}: {histogram['count']} calls, mean {histogram['mean_ms']:.2f}ms,"
+        f" p50 {histogram['p50_ms']:.2f}ms, p95 {histogram['p95_ms']:.2f}ms,"
+        f" p99 {histogram['p99_ms']:.2f}ms, max {histogram['max_ms']:.2f}ms"
+    )
+
+
 def _datasize(num: int):
     for unit in ["B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB"]:
         if abs(num) < 1024.0:
@@ -189,6 +197,24 @@ class DebugInfo:
             parts.append(f"Disabled intents: {disabled_intents}")
 
         parts.append(f"Storage type: {data_manager.storage_type()}")
+        if data_manager.storage_type() == "JSON":
+            storage_details = data_manager.storage_details()
+            fsync = storage_details.get("fsync", "always")
+            if fsync == "interval":
+                fsync += f" ({storage_details.get('fsync_interval_ms', 1000)}ms)"
+            parts.append(f"JSON fsync policy: {fsync}")
+            if storage_details.get("compact", False):
+                parts.append("JSON compact mode: enabled")
+            flush_interval = storage_details.get("flush_interval")
+            if storage_details.get("journal", False):
+                parts.append("JSON journal: enabled")
+                flush_interval = flush_interval or 60
+            if flush_interval:
+                max_pending_writes = storage_details.get("max_pending_writes", 100)
+                parts.append(
+                    f"JSON flush interval: {flush_interval}s"
+                    f" (or after {max_pending_writes} writes)"
+                )
         parts.append(f"Data path: {data_manager.basic_config['DATA_PATH']}")
         parts.append(f"Metadata file: {data_manager.config_file}")
 
@@ -196,3 +222,92 @@ class DebugInfo:
             "Red variables",
             "\n".join(parts),
         )
+
+    async def get_driver_metrics_command_text(self) -> str:
+        return self._get_driver_metrics_section().get_command_text()
+
+    def _get_driver_metrics_section(self) -> DebugInfoSection:
+        if self.bot is not None:
+            driver_cls = type(self.bot._config._driver)
+        else:
+            driver_cls = drivers.get_driver_class()
+        metrics = driver_cls.get_metrics()
+        if not metrics:
+            return DebugInfoSection(
+                "Storage driver metrics",
+                f"The {data_manager.storage_type()} driver doesn't collect metrics.",
+            )
+
+        parts = []
+        pool = metrics.get("pool")
+        if pool is not None:
+            parts.append(
+                f"Pool size: {pool['size']} (min {pool['min_size']}, max {pool['max_size']}),"
+                f" {pool['idle']} idle\n"
+                + _format_latency("Connection acquire wait", pool["acquire"])
+            )
+        queries = metrics.get("queries")
+        if queries:
+            parts.append(
+                "\n".join(
+                    _format_latency(name, histogram) for name, histogram in sorted(queries.items())
+                )
+            )
+        cache = metrics.get("cache")
+        if cache is not None:
+            parts.append(
+                f"Read cache: {cache['hits']} hits, {cache['misses']} misses,"
+                f" {cache['size']}/{cache['max_size']} entries"
+            )
+        return DebugInfoSection("Storage driver metrics", *parts)
+
+    async def get_driver_memory_text(self) -> str:
+        """Get the memory used by each cog's data loaded by the JSON driver, largest first."""
+        if self.bot is not None:
+            driver_cls = type(self.bot._config._driver)
+        else:
+            driver_cls = drivers.get_driver_class()
+        if not issubclass(driver_cls, drivers.JsonDriver):
+            return (
+                f"The {data_manager.storage_type()} driver doesn't keep data in memory,"
+                " so there's nothing to account for."
+            )
+        usage = await driver_cls.get_memory_usage()
+        if not usage:
+            return "No data is loaded."
+
+        lines = []
+        for cog_name, cog_usage in sorted(
+            usage.items(), key=lambda item: item[1]["resident_bytes"], reverse=True
+        ):
+            line = f"{cog_name}: {_datasize(cog_usage['resident_bytes'])}"
+            if cog_usage["encoded_scopes"]:
+                line += f", {cog_usage['encoded_scopes']} guilds' members still encoded"
+            lines.append(line)
+        total = sum(cog_usage["resident_bytes"] for cog_usage in usage.values())
+        lines.append(f"\nTotal: {_datasize(total)}")
+        return "\n".join(lines)
+
+    def get_config_stats_text(self) -> str:
+        """Get Config's storage access statistics, one paragraph per cog."""
+        collector = _config_stats.collector
+        if collector is None:
+            return "Config statistics aren't being collected."
+        cogs = collector.to_dict()["cogs"]
+        if not cogs:
+            return "No Config storage access has been recorded yet."
+
+        parts = []
+        for cog_name, stats in cogs.items():
+            lines = [f"{cog_name}:"]
+            for category, operations in stats["operations"].items():
+                for operation, histogram in operations.items():
+                    lines.append(
+                        "  "
+                        + _format_latency(f"{category} {operation}", histogram)
+                        + f", {_datasize(histogram['bytes'])}"
+                    )
+            for category, histogram in stats["lock_waits"].items():
+                lines.append("  " + _format_latency(f"{category} lock wait", histogram))
+            parts.append("\n".join(lines))
+        return "\n\n".join(parts)
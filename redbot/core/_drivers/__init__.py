@@ -5,6 +5,7 @@ from .. import data_manager
 from .base import IdentifierData, BaseDriver, ConfigCategory
 from .json import JsonDriver
 from .postgres import PostgresDriver
+from .sqlite import SqliteDriver
 
 __all__ = [
     "get_driver",
@@ -13,6 +14,7 @@ __all__ = [
     "BaseDriver",
     "JsonDriver",
     "PostgresDriver",
+    "SqliteDriver",
     "BackendType",
 ]
 
@@ -24,12 +26,18 @@ class BackendType(enum.Enum):
     JSON = "JSON"
     #: Postgres storage backend.
     POSTGRES = "Postgres"
+    #: SQLite storage backend.
+    SQLITE = "SQLite"
     # Dead drivers below retained for error handling.
     MONGOV1 = "MongoDB"
     MONGO = "MongoDBV2"
 
 
-_DRIVER_CLASSES = {BackendType.JSON: JsonDriver, BackendType.POSTGRES: PostgresDriver}
+_DRIVER_CLASSES = {
+    BackendType.JSON: JsonDriver,
+    BackendType.POSTGRES: PostgresDriver,
+    BackendType.SQLITE: SqliteDriver,
+}
 
 
 def _get_driver_class_include_old(storage_type: Optional[BackendType] = None) -> Type[BaseDriver]:
@@ -1,13 +1,33 @@
 import abc
+import asyncio
 import enum
-from typing import Tuple, Dict, Any, Union, List, AsyncIterator, Type
+import json
+import pickle
+import time
+from typing import (
+    Tuple,
+    Dict,
+    Any,
+    Union,
+    List,
+    AsyncIterator,
+    Iterator,
+    Type,
+    Sequence,
+    Callable,
+    Optional,
+    TextIO,
+)
 
 import rich.progress
 
-from redbot.core.utils._internal_utils import RichIndefiniteBarColumn
+from .. import errors
 
 __all__ = ["BaseDriver", "IdentifierData", "ConfigCategory"]
 
+# The first line of an NDJSON export, identifying its format
+NDJSON_HEADER = {"format": "red-config-ndjson", "version": 1}
+
 
 class ConfigCategory(str, enum.Enum):
     """Represents config category."""
@@ -52,6 +72,18 @@ _CATEGORY_PKEY_COUNTS = {
 
 
 class IdentifierData:
+    __slots__ = (
+        "_cog_name",
+        "_uuid",
+        "_category",
+        "_primary_key",
+        "_identifiers",
+        "primary_key_len",
+        "_is_custom",
+        "_tuple",
+        "_hash",
+    )
+
     def __init__(
         self,
         cog_name: str,
@@ -69,6 +101,9 @@ class IdentifierData:
         self._identifiers = identifiers
         self.primary_key_len = primary_key_len
         self._is_custom = is_custom
+        # These are used as dict keys on every Config access, so they're computed once
+        self._tuple = tuple(filter(None, (cog_name, uuid, category, *primary_key, *identifiers)))
+        self._hash = hash((uuid, category, primary_key, identifiers))
 
     @property
     def cog_name(self) -> str:
@@ -111,7 +146,7 @@ class IdentifierData:
         )
 
     def __hash__(self) -> int:
-        return hash((self.uuid, self.category, self.primary_key, self.identifiers))
+        return self._hash
 
     def get_child(self, *keys: str) -> "IdentifierData":
         if not all(isinstance(i, str) for i in keys):
@@ -150,12 +185,7 @@ class IdentifierData:
         )
 
     def to_tuple(self) -> Tuple[str, ...]:
-        return tuple(
-            filter(
-                None,
-                (self.cog_name, self.uuid, self.category, *self.primary_key, *self.identifiers),
-            )
-        )
+        return self._tuple
 
 
 class BaseDriver(abc.ABC):
@@ -222,6 +252,109 @@ class BaseDriver(abc.ABC):
         """
         raise NotImplementedError
 
+    async def get_view(self, identifier_data: IdentifierData) -> Any:
+        """
+        Finds the value indicated by the given identifiers, without
+        necessarily copying it.
+
+        The returned value may be the driver's own copy of the data, so
+        it must not be modified, and it is only guaranteed to be valid
+        until the caller next yields to the event loop. Drivers which
+        already build a new object on every read don't need to
+        override this.
+
+        Parameters
+        ----------
+        identifier_data
+
+        Returns
+        -------
+        Any
+            Stored value.
+        """
+        return await self.get(identifier_data)
+
+    async def get_fields(
+        self, identifier_data: IdentifierData, fields: Sequence[str]
+    ) -> Dict[str, Any]:
+        """
+        Finds the given fields of the object indicated by the given
+        identifiers.
+
+        Drivers which can extract part of a document on the storage
+        side should override this, so that only the requested fields
+        have to be transferred.
+
+        Parameters
+        ----------
+        identifier_data
+        fields : Sequence[str]
+            The keys to look up in the object.
+
+        Returns
+        -------
+        Dict[str, Any]
+            A new dict containing the fields which are stored. Fields
+            which aren't stored, or don't exist because the object
+            itself doesn't, are left out.
+        """
+        try:
+            data = await self.get_view(identifier_data)
+        except KeyError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return pickle.loads(pickle.dumps({f: data[f] for f in fields if f in data}, -1))
+
+    def declare_index(self, identifier_data: IdentifierData, field: str) -> None:
+        """
+        Declares that documents in a category will be looked up by the
+        value of one of their fields, with `find`.
+
+        Drivers should override this to maintain an index of the field,
+        so that lookups don't have to scan the whole category. Creating
+        the index may be deferred until the first lookup. By default,
+        nothing is done.
+
+        Parameters
+        ----------
+        identifier_data
+            The category, with no primary keys or identifiers.
+        field : str
+            The top-level key of the documents to index.
+        """
+
+    async def find(
+        self, identifier_data: IdentifierData, criteria: Dict[str, Any]
+    ) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        """
+        Finds the documents under the given partial primary key whose
+        fields have the given values.
+
+        Values are compared as JSON, and a field which isn't stored
+        never matches. By default, every document is checked.
+
+        Parameters
+        ----------
+        identifier_data
+            Must have a partial primary key and no identifiers.
+        criteria : Dict[str, Any]
+            Maps top-level keys of the documents to the values they
+            must have.
+
+        Returns
+        -------
+        Dict[Tuple[str, ...], Dict[str, Any]]
+            Maps the rest of each matching document's primary key to a
+            copy of the document.
+        """
+        criteria = {field: _index_key(value) for field, value in criteria.items()}
+        ret = {}
+        async for pkeys, document in self.aiter_documents(identifier_data):
+            if _matches(document, criteria):
+                ret[pkeys] = document
+        return ret
+
     @abc.abstractmethod
     async def set(self, identifier_data: IdentifierData, value=None) -> None:
         """
@@ -248,6 +381,254 @@ class BaseDriver(abc.ABC):
         """
         raise NotImplementedError
 
+    async def aiter_documents(
+        self, identifier_data: IdentifierData, *, batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[Tuple[str, ...], Dict[str, Any]]]:
+        """
+        Iterates over each document under the given partial primary key.
+
+        Drivers should override this to fetch the documents in batches,
+        rather than all at once. By default, all of the documents are
+        fetched with `get`.
+
+        Parameters
+        ----------
+        identifier_data
+            Must have a partial primary key and no identifiers.
+        batch_size
+            How many documents to fetch at a time.
+
+        Yields
+        ------
+        Tuple[Tuple[str, ...], Dict[str, Any]]
+            The rest of each document's primary key, and the document.
+        """
+        try:
+            data = await self.get(identifier_data)
+        except KeyError:
+            return
+        num_missing_pkeys = identifier_data.primary_key_len - len(identifier_data.primary_key)
+        for pkeys, document in _iter_documents(data, num_missing_pkeys):
+            yield pkeys, document
+
+    async def remove_empty_containers(self, identifier_data: IdentifierData) -> int:
+        """
+        Removes the empty containers under the given partial primary key,
+        which can be left between primary keys when documents are cleared.
+
+        Only drivers which store data nested by primary key need to
+        override this. By default, nothing is removed.
+
+        Parameters
+        ----------
+        identifier_data
+            Must have a partial primary key and no identifiers.
+
+        Returns
+        -------
+        int
+            The number of containers removed.
+        """
+        return 0
+
+    async def inc(
+        self, identifier_data: IdentifierData, value: Union[int, float], default: Union[int, float]
+    ) -> Union[int, float]:
+        """
+        Increments the number indicated by the given identifiers.
+
+        If no number is stored there, it is set to ``default + value``.
+
+        Drivers should override this to increment the number
+        atomically. By default, the stored value is read and then set.
+
+        Parameters
+        ----------
+        identifier_data
+        value
+            The amount to increment by.
+        default
+            The value to increment if no number is stored.
+
+        Returns
+        -------
+        Union[int, float]
+            The new value.
+
+        Raises
+        ------
+        StoredTypeError
+            If the stored value isn't a number.
+        """
+        try:
+            existing_value = await self.get(identifier_data)
+        except KeyError:
+            existing_value = ...
+        result = _get_incremented(existing_value, value, default)
+        await self.set(identifier_data, result)
+        return result
+
+    async def toggle(self, identifier_data: IdentifierData, default: bool) -> bool:
+        """
+        Toggles the boolean indicated by the given identifiers.
+
+        If no boolean is stored there, it is set to ``not default``.
+
+        Drivers should override this to toggle the boolean atomically.
+        By default, the stored value is read and then set.
+
+        Parameters
+        ----------
+        identifier_data
+        default
+            The value to toggle if no boolean is stored.
+
+        Returns
+        -------
+        bool
+            The new value.
+
+        Raises
+        ------
+        StoredTypeError
+            If the stored value isn't a boolean.
+        """
+        try:
+            existing_value = await self.get(identifier_data)
+        except KeyError:
+            existing_value = ...
+        result = _get_toggled(existing_value, default)
+        await self.set(identifier_data, result)
+        return result
+
+    async def apply_batch(self, operations: Sequence[Tuple[str, IdentifierData, Any]]) -> None:
+        """
+        Applies a batch of sets and clears, in order.
+
+        A ``"set_expiry"`` operation sets or removes the value's expiry,
+        like `set_expiry`.
+
+        A ``"clear_if_equal"`` operation only clears the value if it is
+        still equal to the given one, which must be checked atomically
+        with clearing it, e.g. under the same lock or in the same
+        statement.
+
+        Drivers should override this to commit the whole batch at once,
+        e.g. in a single transaction. By default, each operation is
+        applied one after another, and values are checked for equality
+        right before being cleared.
+
+        Parameters
+        ----------
+        operations
+            Tuples of ``("set", identifier_data, value)``,
+            ``("clear", identifier_data, None)``,
+            ``("set_expiry", identifier_data, expires_at)`` or
+            ``("clear_if_equal", identifier_data, value)``.
+        """
+        for op, identifier_data, value in operations:
+            if op == "set":
+                await self.set(identifier_data, value)
+            elif op == "set_expiry":
+                await self.set_expiry(identifier_data, value)
+            elif op == "clear_if_equal":
+                try:
+                    existing_value = await self.get(identifier_data)
+                except KeyError:
+                    continue
+                if _strictly_equal(existing_value, value):
+                    await self.clear(identifier_data)
+            else:
+                await self.clear(identifier_data)
+
+    async def set_expiry(
+        self, identifier_data: IdentifierData, expires_at: Optional[float]
+    ) -> None:
+        """
+        Sets or removes the time at which the value indicated by the
+        given identifiers expires.
+
+        Expiries are kept in an index separate from the data, which is
+        swept with `pop_expired`. Writing to the value itself doesn't
+        change its expiry, but `clear` must remove the expiries of the
+        cleared value and of everything within it, so that they can't
+        clear a value set later.
+
+        Parameters
+        ----------
+        identifier_data
+        expires_at : Optional[float]
+            The UNIX timestamp at which the value expires, or ``None`` to
+            keep it indefinitely.
+
+        Raises
+        ------
+        NotImplementedError
+            If this driver doesn't support expiring values.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support expiring values.")
+
+    @classmethod
+    async def pop_expired(cls, now: float) -> List[IdentifierData]:
+        """
+        Removes the expiries which are due from the index, returning the
+        values they were for.
+
+        Drivers whose data is shared by several processes should make
+        sure that each expiry is only returned to one of them. Drivers
+        which don't support expiring values don't need to override
+        this.
+
+        Parameters
+        ----------
+        now : float
+            The current UNIX timestamp.
+
+        Returns
+        -------
+        List[IdentifierData]
+            The values which have expired, which the caller is
+            responsible for clearing.
+        """
+        return []
+
+    async def add_invalidation_listener(
+        self, category: str, callback: Callable[[IdentifierData], None]
+    ) -> None:
+        """
+        Registers a callback for writes made to the given category by
+        other processes sharing this backend.
+
+        This lets in-memory caches of config data stay up to date. The
+        callback is passed the identifier data of the write, which may
+        also cover everything below it, e.g. all members of a guild.
+        Writes made by this process may be reported too.
+
+        Drivers whose data can't be shared by several processes don't
+        need to override this, and never call the callback.
+
+        Parameters
+        ----------
+        category : str
+            The category to listen for writes to.
+        callback : Callable[[IdentifierData], None]
+            The function to call for each write.
+        """
+
+    @classmethod
+    def get_metrics(cls) -> Dict[str, Any]:
+        """
+        Gets performance metrics collected by this driver, such as
+        query latencies and connection pool usage.
+
+        Returns
+        -------
+        Dict[str, Any]
+            JSON serializable metrics, which are driver specific. Empty
+            if the driver doesn't collect any.
+        """
+        return {}
+
     @classmethod
     @abc.abstractmethod
     def aiter_cogs(cls) -> AsyncIterator[Tuple[str, str]]:
@@ -266,6 +647,9 @@ class BaseDriver(abc.ABC):
         cls,
         new_driver_cls: Type["BaseDriver"],
         all_custom_group_data: Dict[str, Dict[str, Dict[str, int]]],
+        *,
+        workers: int = 4,
+        chunk_size: int = 1000,
     ) -> None:
         """Migrate data from this backend to another.
 
@@ -274,6 +658,10 @@ class BaseDriver(abc.ABC):
         This will only move the data - no instance metadata is modified
         as a result of this operation.
 
+        Documents are streamed from this backend to the other in chunks,
+        so that no cog's data has to be held in memory at once, and
+        several cogs are migrated concurrently.
+
         Parameters
         ----------
         new_driver_cls
@@ -281,31 +669,237 @@ class BaseDriver(abc.ABC):
         all_custom_group_data : Dict[str, Dict[str, Dict[str, int]]]
             Dict mapping cog names, to cog IDs, to custom groups, to
             primary key lengths.
+        workers : int
+            The number of cogs to migrate concurrently.
+        chunk_size : int
+            The number of documents to import at once.
 
         """
         # Backend-agnostic method of migrating from one driver to another.
+        cogs = [cog async for cog in cls.aiter_cogs()]
+        rows = 0
+        start = time.perf_counter()
+
         with rich.progress.Progress(
             rich.progress.SpinnerColumn(),
             rich.progress.TextColumn("[progress.description]{task.description}"),
-            RichIndefiniteBarColumn(),
-            rich.progress.TextColumn("{task.completed} cogs processed"),
+            rich.progress.BarColumn(),
+            rich.progress.TextColumn("{task.completed}/{task.total} cogs processed"),
+            rich.progress.TextColumn(
+                "{task.fields[rows]} rows ({task.fields[rate]:.0f} rows/sec)"
+            ),
             rich.progress.TimeElapsedColumn(),
         ) as progress:
-            cog_count = 0
-            tid = progress.add_task("[yellow]Migrating", completed=cog_count, total=cog_count + 1)
-            async for cog_name, cog_id in cls.aiter_cogs():
-                progress.console.print(f"Working on {cog_name}...")
-
-                this_driver = cls(cog_name, cog_id)
-                other_driver = new_driver_cls(cog_name, cog_id)
-                custom_group_data = all_custom_group_data.get(cog_name, {}).get(cog_id, {})
-                exported_data = await this_driver.export_data(custom_group_data)
-                await other_driver.import_data(exported_data, custom_group_data)
-
-                cog_count += 1
-                progress.update(tid, completed=cog_count, total=cog_count + 1)
-            progress.update(tid, total=cog_count)
-        print()
+            tid = progress.add_task("[yellow]Migrating", total=len(cogs), rows=0, rate=0.0)
+
+            def on_rows_imported(count: int) -> None:
+                nonlocal rows
+                rows += count
+                rate = rows / (time.perf_counter() - start)
+                progress.update(tid, rows=rows, rate=rate)
+
+            async def worker() -> None:
+                while cogs:
+                    cog_name, cog_id = cogs.pop(0)
+                    progress.console.print(f"Working on {cog_name}...")
+                    custom_group_data = all_custom_group_data.get(cog_name, {}).get(cog_id, {})
+                    await cls._migrate_cog(
+                        new_driver_cls,
+                        cog_name,
+                        cog_id,
+                        custom_group_data,
+                        chunk_size=chunk_size,
+                        on_rows_imported=on_rows_imported,
+                    )
+                    progress.advance(tid)
+
+            await asyncio.gather(*(worker() for _ in range(max(workers, 1))))
+
+        elapsed = time.perf_counter() - start
+        print(f"Migrated {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/sec).")
+
+    @classmethod
+    async def _migrate_cog(
+        cls,
+        new_driver_cls: Type["BaseDriver"],
+        cog_name: str,
+        cog_id: str,
+        custom_group_data: Dict[str, int],
+        *,
+        chunk_size: int,
+        on_rows_imported: Callable[[int], None],
+    ) -> None:
+        this_driver = cls(cog_name, cog_id)
+        other_driver = new_driver_cls(cog_name, cog_id)
+        chunk = []
+        async for document_ident, document in this_driver._aiter_cog_documents(
+            custom_group_data, batch_size=chunk_size
+        ):
+            chunk.append((document_ident, document))
+            if len(chunk) >= chunk_size:
+                await other_driver.import_documents(chunk)
+                on_rows_imported(len(chunk))
+                chunk = []
+        if chunk:
+            await other_driver.import_documents(chunk)
+            on_rows_imported(len(chunk))
+        await other_driver.finish_import()
+
+    async def _aiter_cog_documents(
+        self, custom_group_data: Dict[str, int], *, batch_size: int
+    ) -> AsyncIterator[Tuple[IdentifierData, Any]]:
+        """Iterate over every document of this driver's cog, in each category."""
+        categories = [c.value for c in ConfigCategory]
+        categories.extend(custom_group_data.keys())
+
+        for category in categories:
+            pkey_len, is_custom = ConfigCategory.get_pkey_info(category, custom_group_data)
+            ident_data = IdentifierData(
+                self.cog_name, self.unique_cog_identifier, category, (), (), pkey_len, is_custom
+            )
+            async for pkeys, document in self.aiter_documents(ident_data, batch_size=batch_size):
+                document_ident = IdentifierData(
+                    self.cog_name,
+                    self.unique_cog_identifier,
+                    category,
+                    pkeys,
+                    (),
+                    pkey_len,
+                    is_custom,
+                )
+                yield document_ident, document
+
+    @classmethod
+    async def export_ndjson(
+        cls,
+        fp: TextIO,
+        all_custom_group_data: Dict[str, Dict[str, Dict[str, int]]],
+        *,
+        batch_size: int = 1000,
+    ) -> int:
+        """Write all data stored on this backend to a file, as newline-delimited JSON.
+
+        The driver must be initialized beforehand.
+
+        After a header line, each line is one document, with the cog,
+        category and primary key it is stored under. Documents are
+        written as they are fetched, so the export doesn't need to
+        hold any cog's data in memory at once. It can be restored
+        into any backend with `import_ndjson`.
+
+        Parameters
+        ----------
+        fp : TextIO
+            The file to write to.
+        all_custom_group_data : Dict[str, Dict[str, Dict[str, int]]]
+            Dict mapping cog names, to cog IDs, to custom groups, to
+            primary key lengths.
+        batch_size : int
+            The number of documents to fetch at a time.
+
+        Returns
+        -------
+        int
+            The number of documents written.
+
+        """
+        fp.write(json.dumps(NDJSON_HEADER) + "\n")
+        count = 0
+        cogs = [cog async for cog in cls.aiter_cogs()]
+        for cog_name, cog_id in cogs:
+            driver = cls(cog_name, cog_id)
+            custom_group_data = all_custom_group_data.get(cog_name, {}).get(cog_id, {})
+            async for ident_data, document in driver._aiter_cog_documents(
+                custom_group_data, batch_size=batch_size
+            ):
+                record = {
+                    "cog_name": cog_name,
+                    "cog_id": cog_id,
+                    "category": ident_data.category,
+                    "primary_key": ident_data.primary_key,
+                    "primary_key_len": ident_data.primary_key_len,
+                    "is_custom": ident_data.is_custom,
+                    "data": document,
+                }
+                fp.write(json.dumps(record) + "\n")
+                count += 1
+        return count
+
+    @classmethod
+    async def import_ndjson(cls, fp: TextIO, *, chunk_size: int = 1000) -> int:
+        """Restore data written by `export_ndjson` into this backend.
+
+        The driver must be initialized beforehand.
+
+        Documents are read and stored in chunks, replacing any stored
+        under the same primary keys. Other stored data is left as is.
+
+        Parameters
+        ----------
+        fp : TextIO
+            The file to read from.
+        chunk_size : int
+            The number of documents to import at once.
+
+        Returns
+        -------
+        int
+            The number of documents imported.
+
+        Raises
+        ------
+        ValueError
+            If the file isn't an NDJSON export, or has an invalid line.
+
+        """
+        try:
+            header = json.loads(fp.readline())
+        except ValueError:
+            header = None
+        if header != NDJSON_HEADER:
+            raise ValueError("The file is not an NDJSON export of Red's data.")
+
+        driver: Optional[BaseDriver] = None
+        chunk: List[Tuple[IdentifierData, Any]] = []
+        count = 0
+        for line_number, line in enumerate(fp, start=2):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                ident_data = IdentifierData(
+                    record["cog_name"],
+                    record["cog_id"],
+                    record["category"],
+                    tuple(record["primary_key"]),
+                    (),
+                    record["primary_key_len"],
+                    record["is_custom"],
+                )
+                document = record["data"]
+            except (ValueError, KeyError, TypeError) as exc:
+                raise ValueError(f"Invalid document on line {line_number}.") from exc
+
+            if driver is None or (driver.cog_name, driver.unique_cog_identifier) != (
+                ident_data.cog_name,
+                ident_data.uuid,
+            ):
+                if driver is not None:
+                    if chunk:
+                        await driver.import_documents(chunk)
+                    await driver.finish_import()
+                driver = cls(ident_data.cog_name, ident_data.uuid)
+                chunk = []
+            chunk.append((ident_data, document))
+            count += 1
+            if len(chunk) >= chunk_size:
+                await driver.import_documents(chunk)
+                chunk = []
+        if driver is not None:
+            if chunk:
+                await driver.import_documents(chunk)
+            await driver.finish_import()
+        return count
 
     @classmethod
     async def delete_all_data(cls, **kwargs) -> None:
@@ -375,6 +969,28 @@ class BaseDriver(abc.ABC):
             ret.append((c, data))
         return ret
 
+    async def import_documents(self, documents: Sequence[Tuple[IdentifierData, Any]]) -> None:
+        """
+        Stores a chunk of whole documents, as part of a bulk import
+        such as a migration.
+
+        By default, the chunk is applied as one batch. Drivers may
+        instead defer making the documents durable until
+        `finish_import` is called.
+
+        Parameters
+        ----------
+        documents
+            Tuples of the identifier data of each document, which
+            has a full primary key and no identifiers, and the document.
+        """
+        await self.apply_batch([("set", ident_data, doc) for ident_data, doc in documents])
+
+    async def finish_import(self) -> None:
+        """
+        Makes all documents stored with `import_documents` durable.
+        """
+
     async def import_data(
         self, cog_data: List[Tuple[str, Dict[str, Any]]], custom_group_data: Dict[str, int]
     ) -> None:
@@ -390,3 +1006,67 @@ class BaseDriver(abc.ABC):
                     *ConfigCategory.get_pkey_info(category, custom_group_data),
                 )
                 await self.set(ident_data, data)
+
+
+def _get_incremented(
+    existing_value: Any, value: Union[int, float], default: Union[int, float]
+) -> Union[int, float]:
+    """Get the result of incrementing a stored value, which is ``...`` when missing."""
+    if existing_value is ...:
+        return default + value
+    elif isinstance(existing_value, (int, float)) and not isinstance(existing_value, bool):
+        return existing_value + value
+    raise errors.StoredTypeError(f"Cannot increment non-numeric value {existing_value!r}")
+
+
+def _get_toggled(existing_value: Any, default: bool) -> bool:
+    """Get the result of toggling a stored value, which is ``...`` when missing."""
+    if existing_value is ...:
+        return not default
+    elif isinstance(existing_value, bool):
+        return not existing_value
+    raise errors.StoredTypeError(f"Cannot toggle non-boolean value {existing_value!r}")
+
+
+def _index_key(value: Any) -> str:
+    """Get the key a value is compared and indexed by, which is its JSON encoding."""
+    return json.dumps(value, sort_keys=True)
+
+
+def _strictly_equal(value: Any, default: Any) -> bool:
+    """Check for equality, without treating e.g. ``1``, ``1.0`` and ``True`` as equal."""
+    if type(value) is not type(default):
+        return False
+    if isinstance(value, dict):
+        return value.keys() == default.keys() and all(
+            _strictly_equal(v, default[k]) for k, v in value.items()
+        )
+    if isinstance(value, list):
+        return len(value) == len(default) and all(map(_strictly_equal, value, default))
+    return value == default
+
+
+def _matches(document: Any, criteria: Dict[str, str]) -> bool:
+    """Check whether a document's fields match the given `_index_key()` values."""
+    if not isinstance(document, dict):
+        return False
+    return all(
+        field in document and _index_key(document[field]) == key for field, key in criteria.items()
+    )
+
+
+def _iter_documents(
+    data: Dict[str, Any], num_missing_pkeys: int, parent_pkeys: Tuple[str, ...] = ()
+) -> Iterator[Tuple[Tuple[str, ...], Any]]:
+    """Yield (primary key, document) pairs from data nested by the missing primary keys."""
+    if num_missing_pkeys == 0:
+        # Categories without primary keys, such as GLOBAL, are a single document
+        yield parent_pkeys, data
+        return
+    for key, value in data.items():
+        if num_missing_pkeys == 1:
+            yield parent_pkeys + (key,), value
+        elif isinstance(value, dict):
+            yield from _iter_documents(value, num_missing_pkeys - 1, parent_pkeys + (key,))
+        else:
+            raise errors.CannotSetSubfield
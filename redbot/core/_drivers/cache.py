@@ -0,0 +1,125 @@
+import collections
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from .base import IdentifierData
+
+__all__ = ["ReadCache"]
+
+# Stored in the cache when the driver raised KeyError, so that reads of
+# values which were never set are cached too.
+_ABSENT = object()
+
+
+class ReadCache:
+    """A size-bounded LRU cache of driver reads, keyed by `IdentifierData`.
+
+    Writes must be reported with `invalidate`, which drops every cached
+    read that overlaps the written path, i.e. the path itself, the
+    paths above it and the paths below it.
+
+    Values are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be a positive integer")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Maps path -> (document path, value), in least to most recently used order
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        # Maps document path -> cached paths within that document
+        self._documents: Dict[Tuple[str, ...], Set[Tuple[str, ...]]] = {}
+        # Bumped on every invalidation, so that reads which raced with a write aren't cached
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(
+        self,
+        identifier_data: IdentifierData,
+        fetch: Callable[[IdentifierData], Awaitable[Any]],
+    ) -> Any:
+        """Get the value at the given path, calling ``fetch`` on a cache miss.
+
+        Raises
+        ------
+        KeyError
+            If ``fetch`` raised it, i.e. the value isn't stored.
+
+        """
+        key = identifier_data.to_tuple()
+        try:
+            value = self._entries[key][1]
+        except KeyError:
+            self.misses += 1
+            generation = self._generation
+            try:
+                value = await fetch(identifier_data)
+            except KeyError:
+                value = _ABSENT
+            if generation == self._generation:
+                self._put(key, identifier_data, value)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        if value is _ABSENT:
+            raise KeyError
+        return value
+
+    def invalidate(self, identifier_data: IdentifierData) -> None:
+        """Drop all cached reads affected by a write to the given path."""
+        self._generation += 1
+        key = identifier_data.to_tuple()
+        for idx in range(1, len(key) + 1):
+            self._pop(key[:idx])
+
+        document = self._document_key(key, identifier_data)
+        if len(identifier_data.primary_key) < identifier_data.primary_key_len or len(key) <= 3:
+            # A write spanning several documents, e.g. clearing all members of a guild, a whole
+            # category, or a whole cog (whose identifier data has an empty category)
+            documents = [doc for doc in self._documents if doc[: len(key)] == key]
+        else:
+            documents = [document] if document in self._documents else []
+        for doc in documents:
+            for path in [p for p in self._documents[doc] if p[: len(key)] == key]:
+                self._pop(path)
+
+    def clear(self) -> None:
+        """Drop all cached reads."""
+        self._generation += 1
+        self._entries.clear()
+        self._documents.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache's counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
+
+    @staticmethod
+    def _document_key(key: Tuple[str, ...], identifier_data: IdentifierData) -> Tuple[str, ...]:
+        # cog_name, uuid and category, followed by the primary keys
+        return key[: 3 + identifier_data.primary_key_len]
+
+    def _put(self, key: Tuple[str, ...], identifier_data: IdentifierData, value: Any) -> None:
+        document = self._document_key(key, identifier_data)
+        self._entries[key] = (document, value)
+        self._documents.setdefault(document, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: Tuple[str, ...]) -> None:
+        try:
+            document, __ = self._entries.pop(key)
+        except KeyError:
+            return
+        paths = self._documents[document]
+        paths.discard(key)
+        if not paths:
+            del self._documents[document]
@@ -1,16 +1,44 @@
 import asyncio
+import heapq
 import json
 import logging
 import os
 import pickle
+import re
+import shutil
+import sys
+import threading
 import weakref
 from collections import defaultdict
 from pathlib import Path
-from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote, unquote
 from uuid import uuid4
 
 from .. import data_manager, errors
-from .base import BaseDriver, IdentifierData, ConfigCategory
+from .base import (
+    BaseDriver,
+    IdentifierData,
+    ConfigCategory,
+    _get_incremented,
+    _get_toggled,
+    _index_key,
+    _matches,
+    _strictly_equal,
+)
 
 __all__ = ["JsonDriver"]
 
@@ -19,6 +47,37 @@ _shared_datastore = {}
 _driver_counts = {}
 _finalizers = []
 _locks = defaultdict(asyncio.Lock)
+# Maps cog names to the path of their data file, for cogs with unflushed changes.
+_dirty_paths: Dict[str, Path] = {}
+# Maps cog names to their units (see `_collect_writes()`) with unflushed changes.
+_dirty_units: Dict[str, Set[Tuple[str, ...]]] = defaultdict(set)
+_pending_writes: Dict[str, int] = defaultdict(int)
+# Maps cog names to the field indexes of their custom groups, keyed by (uuid, category).
+_indexes: Dict[str, Dict[Tuple[str, str], "_FieldIndex"]] = defaultdict(dict)
+# Maps cog names to the keys of the shards which have been loaded into memory.
+# A (uuid, category) key means that all shards in the category have been loaded.
+_loaded_shards: Dict[str, Set[Tuple[str, ...]]] = defaultdict(set)
+# Maps cog names to the (uuid, guild_id) keys of their member scopes which are still encoded,
+# with the compact in-memory representation. Cogs with none left aren't in here.
+_encoded_scopes: Dict[str, Set[Tuple[str, str]]] = {}
+
+# The expiry times of values, for all cogs. Loaded on first use.
+_expiry_index: Optional["_ExpiryIndex"] = None
+_expiry_lock = asyncio.Lock()
+
+# Categories which are split into one file per primary key by the sharded layout.
+_SHARDED_CATEGORIES = (
+    ConfigCategory.GUILD.value,
+    ConfigCategory.MEMBER.value,
+    ConfigCategory.CHANNEL.value,
+)
+_MEMBER = ConfigCategory.MEMBER.value
+LAYOUTS = ("single", "sharded")
+FSYNC_POLICIES = ("always", "interval", "shutdown")
+# Files and directories which have been written since they were last fsynced, when the fsync
+# policy isn't "always". Written to from executor threads, so guarded by a threading lock.
+_unsynced_paths: Set[Path] = set()
+_unsynced_lock = threading.Lock()
 
 log = logging.getLogger("redbot.json_driver")
 
@@ -30,6 +89,23 @@ def finalize_driver(cog_name):
     _driver_counts[cog_name] -= 1
 
     if _driver_counts[cog_name] == 0:
+        if cog_name in _dirty_paths:
+            # The data is about to be dropped from memory, so it can't wait for the flusher.
+            path = _dirty_paths.pop(cog_name)
+            _write_files(
+                *_collect_writes(
+                    path,
+                    _shared_datastore[cog_name],
+                    _dirty_units.pop(cog_name),
+                    JsonDriver._layout == "sharded",
+                )
+            )
+            if JsonDriver._journal:
+                _truncate_journal(_get_journal_path(path))
+            _pending_writes.pop(cog_name, None)
+        _loaded_shards.pop(cog_name, None)
+        _encoded_scopes.pop(cog_name, None)
+        _indexes.pop(cog_name, None)
         if cog_name in _shared_datastore:
             del _shared_datastore[cog_name]
         if cog_name in _locks:
@@ -52,8 +128,62 @@ class JsonDriver(BaseDriver):
     .. py:attribute:: data_path
 
         The path in which to store the file indicated by :py:attr:`file_name`.
+
+    By default, every write rewrites the cog's whole data file. This can
+    be changed with the following storage details:
+
+    ``flush_interval``
+        The number of seconds between flushes of changed data to disk.
+        Writes only mark the cog's data as dirty while this is set, and
+        any unflushed data is written out on :py:meth:`teardown`.
+    ``max_pending_writes``
+        The number of writes to a single cog after which its data is
+        flushed without waiting for the next interval. Defaults to 100.
+    ``journal``
+        Set to ``True`` to append each write to the cog's journal file
+        before returning, instead of rewriting its data. Flushes then
+        compact the journal into the data files, so writes are as durable
+        as without coalescing. Implies a ``flush_interval`` of 60 seconds
+        unless one is set.
+    ``layout``
+        Either ``"single"`` (the default), which keeps all of a cog's data
+        in one file, or ``"sharded"``, which stores each guild, member and
+        channel primary key in its own file in a directory next to the
+        cog's data file. Shards are only loaded when they are first
+        accessed, and a write only rewrites the shard it touches. Data
+        stored in the other layout is converted when it is loaded.
+    ``fsync``
+        When written files are flushed to the disk with fsync. Either
+        ``"always"`` (the default), which waits for each write to reach
+        the disk, ``"interval"``, which fsyncs the files written since
+        the last fsync every ``fsync_interval_ms`` milliseconds, or
+        ``"shutdown"``, which only fsyncs them on :py:meth:`teardown`.
+        Files are replaced atomically either way, but writes made since
+        the last fsync may be lost if the system crashes.
+    ``fsync_interval_ms``
+        The number of milliseconds between fsyncs with the ``"interval"``
+        policy. Defaults to 1000.
+    ``compact``
+        Set to ``True`` to reduce the memory used by loaded data. The
+        members of each guild are kept as JSON text until they are first
+        accessed, and keys are interned, so that the same key in different
+        guilds, members and shards is only stored once. With the sharded
+        layout, member shards are already only loaded when accessed, so
+        only the keys are interned.
+
+    Any records left in a cog's journal are replayed when its data is loaded.
     """
 
+    _flush_interval: Optional[float] = None
+    _journal: bool = False
+    _layout: str = "single"
+    _max_pending_writes: int = 100
+    _flush_task: Optional[asyncio.Task] = None
+    _fsync: str = "always"
+    _fsync_interval: float = 1.0
+    _fsync_task: Optional[asyncio.Task] = None
+    _compact: bool = False
+
     def __init__(
         self,
         cog_name: str,
@@ -72,6 +202,7 @@ class JsonDriver(BaseDriver):
             self.data_path = data_manager.cog_data_path(raw_name=cog_name)
         self.data_path.mkdir(parents=True, exist_ok=True)
         self.data_path = self.data_path / self.file_name
+        self._import_units: Set[Tuple[str, ...]] = set()
         self._load_data()
 
     @property
@@ -86,15 +217,53 @@ class JsonDriver(BaseDriver):
     def data(self, value):
         _shared_datastore[self.cog_name] = value
 
+    @property
+    def _sharded(self) -> bool:
+        return self._layout == "sharded"
+
+    @property
+    def _shard_root(self) -> Path:
+        return _get_shard_root(self.data_path)
+
     @classmethod
     async def initialize(cls, **storage_details) -> None:
-        # No initializing to do
-        return
+        layout = storage_details.get("layout", "single")
+        if layout not in LAYOUTS:
+            raise ValueError(f"Invalid JSON storage layout: {layout!r}")
+        fsync = storage_details.get("fsync", "always")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid JSON fsync policy: {fsync!r}")
+        cls._layout = layout
+        cls._journal = bool(storage_details.get("journal", False))
+        cls._flush_interval = storage_details.get("flush_interval") or None
+        if cls._journal and cls._flush_interval is None:
+            cls._flush_interval = 60
+        cls._max_pending_writes = storage_details.get("max_pending_writes", 100)
+        if cls._flush_interval is not None and cls._flush_task is None:
+            cls._flush_task = asyncio.create_task(cls._flush_loop())
+        cls._fsync = fsync
+        cls._compact = bool(storage_details.get("compact", False))
+        cls._fsync_interval = storage_details.get("fsync_interval_ms", 1000) / 1000
+        if cls._fsync == "interval" and cls._fsync_task is None:
+            cls._fsync_task = asyncio.create_task(cls._fsync_loop())
 
     @classmethod
     async def teardown(cls) -> None:
-        # No tearing down to do
-        return
+        if cls._flush_task is not None:
+            cls._flush_task.cancel()
+            cls._flush_task = None
+        if cls._fsync_task is not None:
+            cls._fsync_task.cancel()
+            cls._fsync_task = None
+        await cls._flush_all()
+        await asyncio.get_running_loop().run_in_executor(None, _fsync_unsynced)
+        cls._flush_interval = None
+        cls._journal = False
+        cls._layout = "single"
+        cls._max_pending_writes = 100
+        cls._fsync = "always"
+        cls._fsync_interval = 1.0
+        cls._compact = False
 
     @staticmethod
     def get_config_details() -> Dict[str, Any]:
@@ -119,6 +288,159 @@ class JsonDriver(BaseDriver):
             with self.data_path.open("w", encoding="utf-8") as fs:
                 json.dump(self.data, fs)
 
+        self._convert_layout()
+        self._replay_journal()
+        if self._compact and not self._sharded:
+            self._encode_scopes()
+
+    def _convert_layout(self) -> None:
+        """Convert the data on disk to the configured layout, if needed."""
+        shard_root = self._shard_root
+        if self._sharded:
+            units = set()
+            for uuid, inner in self.data.items():
+                if not isinstance(inner, dict):
+                    continue
+                for category in _SHARDED_CATEGORIES:
+                    if category not in inner:
+                        continue
+                    # The main file is always written after the shards, so if these were left
+                    # behind by an interrupted conversion, they're still up to date.
+                    _loaded_shards[self.cog_name].update(
+                        (uuid, category, pkey) for pkey in inner[category]
+                    )
+                    units.update((uuid, category, pkey) for pkey in inner[category])
+            if units:
+                writes, removals = _collect_writes(self.data_path, self.data, units, True)
+                _write_files(writes, removals)
+                _write_files(*_collect_writes(self.data_path, self.data, {()}, True))
+        elif shard_root.is_dir():
+            for uuid_dir in shard_root.iterdir():
+                if not uuid_dir.is_dir():
+                    continue
+                for category in _SHARDED_CATEGORIES:
+                    for pkey, value in _read_shards(uuid_dir / category):
+                        inner = self.data.setdefault(uuid_dir.name, {})
+                        inner.setdefault(category, {})[pkey] = value
+            _save_json(self.data_path, self.data)
+            shutil.rmtree(shard_root)
+
+    def _replay_journal(self) -> None:
+        """Apply any writes left in the cog's journal, then compact it."""
+        journal_path = _get_journal_path(self.data_path)
+        try:
+            with journal_path.open("r", encoding="utf-8") as fs:
+                lines = fs.readlines()
+        except FileNotFoundError:
+            return
+
+        units = set()
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The bot must have stopped while this record was being appended, so the write
+                # it's for never completed.
+                break
+            units |= self._apply_record(record)
+
+        if units:
+            log.debug("Replayed %s journal records for %s", len(lines), self.cog_name)
+            _write_files(*_collect_writes(self.data_path, self.data, units, self._sharded))
+        _truncate_journal(journal_path)
+
+    def _encode_scopes(self) -> None:
+        """Replace the members of each guild with their JSON text, until they're accessed."""
+        encoded = set()
+        for uuid, inner in self.data.items():
+            members = inner.get(_MEMBER) if isinstance(inner, dict) else None
+            if not isinstance(members, dict):
+                continue
+            for guild_id, value in members.items():
+                if isinstance(value, dict):
+                    members[guild_id] = _EncodedScope(json.dumps(value, separators=(",", ":")))
+                    encoded.add((uuid, guild_id))
+        if encoded:
+            _encoded_scopes[self.cog_name] = encoded
+
+    def _decode_scopes(self, path: Tuple[str, ...]) -> None:
+        """Decode the encoded member scopes which hold data at or under ``path``."""
+        encoded = _encoded_scopes[self.cog_name]
+        if len(path) >= 2 and path[1] != _MEMBER:
+            return
+        if len(path) >= 3:
+            keys = [(path[0], path[2])] if (path[0], path[2]) in encoded else []
+        else:
+            keys = [key for key in encoded if not path or key[0] == path[0]]
+        for uuid, guild_id in keys:
+            members = self.data[uuid][_MEMBER]
+            members[guild_id] = _loads_interned(members[guild_id].text)
+            encoded.discard((uuid, guild_id))
+        if not encoded:
+            del _encoded_scopes[self.cog_name]
+
+    def _ensure_loaded(self, path: Tuple[str, ...]) -> None:
+        """Load the shards which hold the data at ``path``, and decode its member scopes."""
+        if self.cog_name in _encoded_scopes:
+            self._decode_scopes(path)
+        if not self._sharded or not path:
+            return
+        if len(path) == 1:
+            for category in _SHARDED_CATEGORIES:
+                self._load_category(path[0], category)
+        elif path[1] not in _SHARDED_CATEGORIES:
+            return
+        elif len(path) == 2:
+            self._load_category(*path)
+        else:
+            self._load_shard(*path[:3])
+
+    def _load_shard(self, uuid: str, category: str, pkey: str) -> None:
+        loaded = _loaded_shards[self.cog_name]
+        if (uuid, category) in loaded or (uuid, category, pkey) in loaded:
+            return
+        shard_path = self._shard_root / uuid / category / _shard_file_name(pkey)
+        try:
+            with shard_path.open("r", encoding="utf-8") as fs:
+                value = json.load(fs, object_pairs_hook=self._object_pairs_hook)
+        except FileNotFoundError:
+            pass
+        else:
+            self.data.setdefault(uuid, {}).setdefault(category, {})[pkey] = value
+        loaded.add((uuid, category, pkey))
+
+    def _load_category(self, uuid: str, category: str) -> None:
+        loaded = _loaded_shards[self.cog_name]
+        if (uuid, category) in loaded:
+            return
+        shards = _read_shards(
+            self._shard_root / uuid / category,
+            exclude=loaded,
+            object_pairs_hook=self._object_pairs_hook,
+        )
+        for pkey, value in shards:
+            self.data.setdefault(uuid, {}).setdefault(category, {})[pkey] = value
+        loaded.add((uuid, category))
+
+    @property
+    def _object_pairs_hook(self) -> Optional[Callable[[List[Tuple[str, Any]]], Dict[str, Any]]]:
+        return _interned_dict if self._compact else None
+
+    def _units_for(self, path: Tuple[str, ...]) -> Set[Tuple[str, ...]]:
+        """Get the units (see `_collect_writes()`) which store the data at ``path``."""
+        if not self._sharded:
+            return {()}
+        units = set()
+        if path[0] not in self.data or len(path) == 1:
+            units.add(())
+        if len(path) == 1:
+            units.add(path)
+        elif path[1] not in _SHARDED_CATEGORIES:
+            units.add(())
+        else:
+            units.add(path[:3])
+        return units
+
     def migrate_identifier(self, raw_identifier: int):
         if self.unique_cog_identifier in self.data:
             # Data has already been migrated
@@ -126,55 +448,281 @@ class JsonDriver(BaseDriver):
         poss_identifiers = [str(raw_identifier), str(hash(raw_identifier))]
         for ident in poss_identifiers:
             if ident in self.data:
+                self._ensure_loaded((ident,))
                 self.data[self.unique_cog_identifier] = self.data[ident]
                 del self.data[ident]
-                _save_json(self.data_path, self.data)
+                self._update_indexes(())
+                if self._sharded:
+                    _loaded_shards[self.cog_name].update(
+                        (self.unique_cog_identifier, category) for category in _SHARDED_CATEGORIES
+                    )
+                units = {(), (ident,), (self.unique_cog_identifier,)}
+                _write_files(*_collect_writes(self.data_path, self.data, units, self._sharded))
                 break
 
     async def get(self, identifier_data: IdentifierData):
+        return pickle.loads(pickle.dumps(self._find(identifier_data), -1))
+
+    async def get_view(self, identifier_data: IdentifierData):
+        return self._find(identifier_data)
+
+    async def aiter_documents(self, identifier_data: IdentifierData, *, batch_size: int = 1000):
+        try:
+            data = self._find(identifier_data)
+        except KeyError:
+            return
+        num_missing_pkeys = identifier_data.primary_key_len - len(identifier_data.primary_key)
+        documents = _iter_live_documents(data, num_missing_pkeys)
+        for count, (pkeys, document) in enumerate(documents, start=1):
+            yield pkeys, pickle.loads(pickle.dumps(document, -1))
+            if count % batch_size == 0:
+                await asyncio.sleep(0)
+
+    async def remove_empty_containers(self, identifier_data: IdentifierData) -> int:
+        full_identifiers = identifier_data.to_tuple()[1:]
+        num_missing_pkeys = identifier_data.primary_key_len - len(identifier_data.primary_key)
+        if num_missing_pkeys < 1:
+            return 0
+        async with self._lock:
+            self._ensure_loaded(full_identifiers)
+            try:
+                data = self._find(identifier_data)
+            except KeyError:
+                return 0
+            if _holds_no_documents(data, num_missing_pkeys):
+                empty_paths = [full_identifiers]
+            else:
+                empty_paths = list(
+                    _iter_empty_containers(data, num_missing_pkeys, full_identifiers)
+                )
+            for path in empty_paths:
+                _clear_path(self.data, path)
+                self._update_indexes(path)
+                await self._save(self._units_for(path), {"op": "clear", "path": path})
+        return len(empty_paths)
+
+    def _find(self, identifier_data: IdentifierData):
         partial = self.data
         full_identifiers = identifier_data.to_tuple()[1:]
+        self._ensure_loaded(full_identifiers)
         for i in full_identifiers:
             partial = partial[i]
-        return pickle.loads(pickle.dumps(partial, -1))
+        return partial
 
     async def set(self, identifier_data: IdentifierData, value=None):
-        partial = self.data
-        full_identifiers = identifier_data.to_tuple()[1:]
         # This is both our deepcopy() and our way of making sure this value is actually JSON
         # serializable.
-        value_copy = json.loads(json.dumps(value))
+        value_copy = json.loads(json.dumps(value), object_pairs_hook=self._object_pairs_hook)
 
         async with self._lock:
-            for i in full_identifiers[:-1]:
-                try:
-                    partial = partial.setdefault(i, {})
-                except AttributeError:
-                    # Tried to set sub-field of non-object
-                    raise errors.CannotSetSubfield
-
-            partial[full_identifiers[-1]] = value_copy
-            await self._save()
+            await self._set_locked(identifier_data, value_copy)
 
     async def clear(self, identifier_data: IdentifierData):
-        partial = self.data
         full_identifiers = identifier_data.to_tuple()[1:]
+        async with self._lock:
+            self._ensure_loaded(full_identifiers)
+            cleared = _clear_path(self.data, full_identifiers)
+            if cleared:
+                self._update_indexes(full_identifiers)
+                units = self._units_for(full_identifiers)
+                await self._save(units, {"op": "clear", "path": full_identifiers})
+        if cleared:
+            await self._update_expiries([("clear", identifier_data, None)])
+
+    async def inc(
+        self, identifier_data: IdentifierData, value: Union[int, float], default: Union[int, float]
+    ) -> Union[int, float]:
+        async with self._lock:
+            existing_value = self._find_or_missing(identifier_data)
+            result = _get_incremented(existing_value, value, default)
+            await self._set_locked(identifier_data, result)
+        return result
+
+    async def toggle(self, identifier_data: IdentifierData, default: bool) -> bool:
+        async with self._lock:
+            existing_value = self._find_or_missing(identifier_data)
+            result = _get_toggled(existing_value, default)
+            await self._set_locked(identifier_data, result)
+        return result
+
+    def _find_or_missing(self, identifier_data: IdentifierData) -> Any:
+        try:
+            return self._find(identifier_data)
+        except (KeyError, TypeError):
+            return ...
+
+    def declare_index(self, identifier_data: IdentifierData, field: str) -> None:
+        key = (identifier_data.uuid, identifier_data.category)
         try:
-            for i in full_identifiers[:-1]:
-                partial = partial[i]
+            index = _indexes[self.cog_name][key]
         except KeyError:
-            pass
-        else:
-            async with self._lock:
-                try:
-                    del partial[full_identifiers[-1]]
-                except KeyError:
-                    pass
+            index = _indexes[self.cog_name][key] = _FieldIndex(identifier_data.primary_key_len)
+        index.add_field(field)
+
+    async def find(self, identifier_data: IdentifierData, criteria: Dict[str, Any]):
+        index = _indexes[self.cog_name].get((identifier_data.uuid, identifier_data.category))
+        field = None
+        if index is not None:
+            field = next((f for f in criteria if f in index.fields), None)
+        if field is None:
+            return await super().find(identifier_data, criteria)
+
+        path = (identifier_data.uuid, identifier_data.category)
+        self._ensure_loaded(path)
+        category_data = self.data.get(path[0], {}).get(path[1], {})
+        keys = {f: _index_key(value) for f, value in criteria.items()}
+        prefix = identifier_data.primary_key
+        ret = {}
+        for pkeys in index.lookup(field, keys[field], category_data):
+            if pkeys[: len(prefix)] != prefix:
+                continue
+            document = _get_document(category_data, pkeys)
+            if _matches(document, keys):
+                ret[pkeys[len(prefix) :]] = pickle.loads(pickle.dumps(document, -1))
+        return ret
+
+    async def set_expiry(self, identifier_data: IdentifierData, expires_at: Optional[float]):
+        await self._update_expiries([("set_expiry", identifier_data, expires_at)])
+
+    @staticmethod
+    async def _update_expiries(changes: List[Tuple[str, IdentifierData, Any]]) -> None:
+        """
+        Apply ``("set_expiry", identifier_data, expires_at)`` changes to the expiry index,
+        and remove the expiries within values for ``("clear", identifier_data, None)``.
+        """
+        if not changes:
+            return
+        async with _expiry_lock:
+            index = _get_expiry_index()
+            changed = False
+            for op, identifier_data, expires_at in changes:
+                if op == "set_expiry":
+                    changed |= index.set(_encode_expiry_key(identifier_data), expires_at)
                 else:
-                    await self._save()
+                    changed |= index.clear_within(identifier_data.to_tuple())
+            if changed:
+                await index.save()
+
+    @classmethod
+    async def pop_expired(cls, now: float) -> List[IdentifierData]:
+        async with _expiry_lock:
+            index = _get_expiry_index()
+            expired = index.pop_expired(now)
+            if expired:
+                await index.save()
+        return [_decode_expiry_key(key) for key in expired]
+
+    def _update_indexes(self, path: Tuple[str, ...]) -> None:
+        """Update the field indexes after the data at ``path`` has been changed."""
+        indexes = _indexes.get(self.cog_name)
+        if not indexes:
+            return
+        if len(path) < 2:
+            for (uuid, __), index in indexes.items():
+                if not path or uuid == path[0]:
+                    index.reset()
+            return
+        index = indexes.get(path[:2])
+        if index is None:
+            return
+        pkeys = path[2 : 2 + index.pkey_len]
+        if len(pkeys) < index.pkey_len:
+            # Several documents were replaced, so rebuild the index when it's next used
+            index.reset()
+            return
+        try:
+            category_data = self.data[path[0]][path[1]]
+        except KeyError:
+            document = ...
+        else:
+            document = _get_document(category_data, pkeys)
+        index.update_document(pkeys, document)
+
+    async def _set_locked(self, identifier_data: IdentifierData, value: Any) -> None:
+        # The caller must hold the cog's lock, and value must be JSON serializable.
+        full_identifiers = identifier_data.to_tuple()[1:]
+        self._ensure_loaded(full_identifiers)
+        units = self._units_for(full_identifiers)
+        _set_path(self.data, full_identifiers, value)
+        self._update_indexes(full_identifiers)
+        await self._save(units, {"op": "set", "path": full_identifiers, "value": value})
+
+    async def apply_batch(self, operations):
+        records = []
+        for op, identifier_data, value in operations:
+            record = {"op": op, "path": identifier_data.to_tuple()[1:]}
+            if op == "set":
+                record["value"] = json.loads(
+                    json.dumps(value), object_pairs_hook=self._object_pairs_hook
+                )
+            records.append(record)
+
+        # The clears and expiries applied, in order
+        expiry_changes = []
+        async with self._lock:
+            units = set()
+            applied = []
+            for record, (op, identifier_data, value) in zip(records, operations):
+                if op == "set_expiry":
+                    expiry_changes.append((op, identifier_data, value))
+                    continue
+                if op == "clear_if_equal":
+                    if not _strictly_equal(self._find_or_missing(identifier_data), value):
+                        continue
+                    record["op"] = "clear"
+                changed_units = self._apply_record(record)
+                if record["op"] == "clear" and changed_units:
+                    expiry_changes.append(("clear", identifier_data, None))
+                units |= changed_units
+                applied.append(record)
+            if units:
+                await self._save(units, {"op": "batch", "records": applied})
+        await self._update_expiries(expiry_changes)
+
+    def _apply_record(self, record: Dict[str, Any]) -> Set[Tuple[str, ...]]:
+        """Apply a set, clear or batch record to the data, returning the units it changed."""
+        if record["op"] == "batch":
+            units = set()
+            for sub_record in record["records"]:
+                units |= self._apply_record(sub_record)
+            return units
+
+        path = tuple(record["path"])
+        self._ensure_loaded(path)
+        if record["op"] == "set":
+            _set_path(self.data, path, record["value"])
+        elif not _clear_path(self.data, path):
+            return set()
+        self._update_indexes(path)
+        return self._units_for(path)
+
+    @classmethod
+    async def get_memory_usage(cls) -> Dict[str, Dict[str, int]]:
+        """Estimate the memory used by each cog's loaded data.
+
+        Returns
+        -------
+        Dict[str, Dict[str, int]]
+            The ``resident_bytes`` of each cog's data, along with the number
+            of its member scopes which are still ``encoded`` in compact mode.
+
+        """
+        usage = {}
+        for cog_name in list(_shared_datastore):
+            data = _shared_datastore.get(cog_name)
+            if data is None:
+                continue
+            usage[cog_name] = {
+                "resident_bytes": _deep_sizeof(data),
+                "encoded_scopes": len(_encoded_scopes.get(cog_name, ())),
+            }
+            await asyncio.sleep(0)
+        return usage
 
     @classmethod
     async def aiter_cogs(cls) -> AsyncIterator[Tuple[str, str]]:
+        # Cogs are listed from the files, so they must be up to date
+        await cls._flush_all()
         yield "Core", "0"
         for _dir in data_manager.cog_data_path().iterdir():
             fpath = _dir / "settings.json"
@@ -188,11 +736,37 @@ class JsonDriver(BaseDriver):
             if not isinstance(data, dict):
                 continue
             cog_name = _dir.stem
-            for cog_id, inner in data.items():
-                if not isinstance(inner, dict):
-                    continue
+            cog_ids = [cog_id for cog_id, inner in data.items() if isinstance(inner, dict)]
+            # Left by a bot which stopped before flushing, and replayed once the cog is loaded
+            cog_ids.extend(
+                cog_id
+                for cog_id in _read_journal_uuids(_get_journal_path(fpath))
+                if cog_id not in cog_ids
+            )
+            shard_root = _get_shard_root(fpath)
+            if shard_root.is_dir():
+                cog_ids.extend(
+                    d.name for d in shard_root.iterdir() if d.is_dir() and d.name not in cog_ids
+                )
+            for cog_id in cog_ids:
                 yield cog_name, cog_id
 
+    async def import_documents(self, documents):
+        # Saving after every chunk would rewrite the whole file each time
+        async with self._lock:
+            for identifier_data, document in documents:
+                path = identifier_data.to_tuple()[1:]
+                self._ensure_loaded(path)
+                _set_path(self.data, path, document)
+                self._update_indexes(path)
+                self._import_units |= self._units_for(path)
+
+    async def finish_import(self):
+        async with self._lock:
+            if self._import_units:
+                await self._save(self._import_units)
+                self._import_units = set()
+
     async def import_data(self, cog_data, custom_group_data):
         def update_write_data(identifier_data: IdentifierData, _data):
             partial = self.data
@@ -202,7 +776,10 @@ class JsonDriver(BaseDriver):
             partial[idents[-1]] = _data
 
         async with self._lock:
+            units = {()}
             for category, all_data in cog_data:
+                self._ensure_loaded((self.unique_cog_identifier, category))
+                units |= self._units_for((self.unique_cog_identifier, category))
                 splitted_pkey = self._split_primary_key(category, custom_group_data, all_data)
                 for pkey, data in splitted_pkey:
                     ident_data = IdentifierData(
@@ -214,11 +791,524 @@ class JsonDriver(BaseDriver):
                         *ConfigCategory.get_pkey_info(category, custom_group_data),
                     )
                     update_write_data(ident_data, data)
-            await self._save()
+            self._update_indexes((self.unique_cog_identifier,))
+            await self._save(units)
 
-    async def _save(self) -> None:
+    async def _save(
+        self, units: Set[Tuple[str, ...]], record: Optional[Dict[str, Any]] = None
+    ) -> None:
+        # The caller must hold the cog's lock.
         loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, _save_json, self.data_path, self.data)
+        if self._flush_interval is None:
+            writes, removals = _collect_writes(self.data_path, self.data, units, self._sharded)
+            await loop.run_in_executor(None, _write_files, writes, removals)
+            return
+
+        _dirty_paths[self.cog_name] = self.data_path
+        _dirty_units[self.cog_name].update(units)
+        _pending_writes[self.cog_name] += 1
+        if self._journal and record is not None:
+            journal_path = _get_journal_path(self.data_path)
+            await loop.run_in_executor(None, _append_journal, journal_path, record)
+        elif self._journal:
+            # Bulk writes aren't journaled, so they must be made durable straight away.
+            await self._flush(self.cog_name)
+            return
+        if _pending_writes[self.cog_name] >= self._max_pending_writes:
+            await self._flush(self.cog_name)
+
+    @classmethod
+    async def _flush(cls, cog_name: str) -> None:
+        # The caller must hold the cog's lock.
+        path = _dirty_paths.get(cog_name)
+        if path is None:
+            return
+        if cog_name in _shared_datastore:
+            writes, removals = _collect_writes(
+                path, _shared_datastore[cog_name], _dirty_units[cog_name], cls._layout == "sharded"
+            )
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _write_files, writes, removals)
+            if cls._journal:
+                await loop.run_in_executor(None, _truncate_journal, _get_journal_path(path))
+        del _dirty_paths[cog_name]
+        _dirty_units.pop(cog_name, None)
+        _pending_writes.pop(cog_name, None)
+
+    @classmethod
+    async def _flush_all(cls) -> None:
+        for cog_name in list(_dirty_paths):
+            async with _locks[cog_name]:
+                await cls._flush(cog_name)
+
+    @classmethod
+    async def _flush_loop(cls) -> None:
+        while True:
+            await asyncio.sleep(cls._flush_interval)
+            try:
+                await cls._flush_all()
+            except Exception:
+                log.exception("Failed to flush JSON data to disk.")
+
+    @classmethod
+    async def _fsync_loop(cls) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(cls._fsync_interval)
+            try:
+                await loop.run_in_executor(None, _fsync_unsynced)
+            except Exception:
+                log.exception("Failed to fsync JSON data.")
+
+
+class _FieldIndex:
+    """
+    An inverted index of the documents in a category, by the values of
+    some of their top-level fields.
+
+    The index is built from the data when it's first looked up, and is
+    updated after each write from then on.
+    """
+
+    __slots__ = ("fields", "pkey_len", "_entries", "_document_keys")
+
+    def __init__(self, pkey_len: int) -> None:
+        self.fields: Set[str] = set()
+        self.pkey_len = pkey_len
+        # Maps fields to the index keys of their values, to the primary keys of the documents
+        # with them. None until the index is built.
+        self._entries: Optional[Dict[str, Dict[str, Set[Tuple[str, ...]]]]] = None
+        # Maps the primary keys of indexed documents to their fields' index keys.
+        self._document_keys: Dict[Tuple[str, ...], Dict[str, str]] = {}
+
+    def add_field(self, field: str) -> None:
+        if field not in self.fields:
+            self.fields.add(field)
+            self.reset()
+
+    def reset(self) -> None:
+        self._entries = None
+        self._document_keys = {}
+
+    def lookup(self, field: str, key: str, category_data: Dict[str, Any]) -> Set[Tuple[str, ...]]:
+        """Get the primary keys of the documents whose field has the given index key."""
+        if self._entries is None:
+            self._entries = {f: {} for f in self.fields}
+            for pkeys, document in _iter_live_documents(category_data, self.pkey_len):
+                self.update_document(pkeys, document)
+        return set(self._entries[field].get(key, ()))
+
+    def update_document(self, pkeys: Tuple[str, ...], document: Any) -> None:
+        """Update the index with a document's new value, which is ``...`` when removed."""
+        if self._entries is None:
+            return
+        for field, key in self._document_keys.pop(pkeys, {}).items():
+            matching = self._entries[field][key]
+            matching.discard(pkeys)
+            if not matching:
+                del self._entries[field][key]
+        if not isinstance(document, dict):
+            return
+        keys = {f: _index_key(document[f]) for f in self.fields if f in document}
+        for field, key in keys.items():
+            self._entries[field].setdefault(key, set()).add(pkeys)
+        if keys:
+            self._document_keys[pkeys] = keys
+
+
+class _ExpiryIndex:
+    """The expiry times of values, stored in a single file in the core data directory."""
+
+    __slots__ = ("path", "expiries", "_heap", "_paths", "_within")
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        # Maps `_encode_expiry_key()` keys to UNIX timestamps.
+        self.expiries: Dict[str, float] = {}
+        try:
+            with path.open("r", encoding="utf-8") as fs:
+                self.expiries = json.load(fs)
+        except FileNotFoundError:
+            pass
+        # Entries are left in the heap when their expiry is changed, and skipped when popped.
+        self._heap = [(expires_at, key) for key, expires_at in self.expiries.items()]
+        heapq.heapify(self._heap)
+        # Maps keys to the paths of their values, and each prefix of those paths to the
+        # keys below it, so that the expiries within a cleared value are found directly.
+        self._paths: Dict[str, Tuple[str, ...]] = {}
+        self._within: Dict[Tuple[str, ...], Set[str]] = {}
+        for key in self.expiries:
+            self._add_path(key)
+
+    def set(self, key: str, expires_at: Optional[float]) -> bool:
+        """Set or remove an expiry, returning whether anything changed."""
+        if expires_at is None:
+            if key not in self.expiries:
+                return False
+            self._remove(key)
+            return True
+        if self.expiries.get(key) == expires_at:
+            return False
+        if key not in self.expiries:
+            self._add_path(key)
+        self.expiries[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        return True
+
+    def clear_within(self, path: Tuple[str, ...]) -> bool:
+        """Remove the expiries at or below the path, returning whether there were any."""
+        keys = self._within.pop(path, None)
+        if not keys:
+            return False
+        for key in keys:
+            del self.expiries[key]
+            # The prefixes below the path only lead to the keys being removed
+            key_path = self._paths.pop(key)
+            for idx in range(len(path) + 1, len(key_path) + 1):
+                self._within.pop(key_path[:idx], None)
+        for idx in range(1, len(path)):
+            ancestor_keys = self._within[path[:idx]]
+            ancestor_keys -= keys
+            if not ancestor_keys:
+                del self._within[path[:idx]]
+        return True
+
+    def pop_expired(self, now: float) -> List[str]:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self.expiries.get(key) == expires_at:
+                self._remove(key)
+                expired.append(key)
+        return expired
+
+    def _add_path(self, key: str) -> None:
+        path = self._paths[key] = _decode_expiry_key(key).to_tuple()
+        for idx in range(1, len(path) + 1):
+            self._within.setdefault(path[:idx], set()).add(key)
+
+    def _remove(self, key: str) -> None:
+        # Heap entries are skipped once their key is gone
+        del self.expiries[key]
+        path = self._paths.pop(key)
+        for idx in range(1, len(path) + 1):
+            prefix = path[:idx]
+            keys = self._within[prefix]
+            keys.discard(key)
+            if not keys:
+                del self._within[prefix]
+
+    async def save(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _save_json, self.path, dict(self.expiries))
+
+
+def _get_expiry_index() -> _ExpiryIndex:
+    global _expiry_index
+    path = data_manager.core_data_path() / "config_expiries.json"
+    if _expiry_index is None or _expiry_index.path != path:
+        _expiry_index = _ExpiryIndex(path)
+    return _expiry_index
+
+
+def _encode_expiry_key(identifier_data: IdentifierData) -> str:
+    return json.dumps(
+        [
+            identifier_data.cog_name,
+            identifier_data.uuid,
+            identifier_data.category,
+            identifier_data.primary_key,
+            identifier_data.identifiers,
+            identifier_data.primary_key_len,
+            identifier_data.is_custom,
+        ]
+    )
+
+
+def _decode_expiry_key(key: str) -> IdentifierData:
+    cog_name, uuid, category, pkeys, identifiers, pkey_len, is_custom = json.loads(key)
+    return IdentifierData(
+        cog_name, uuid, category, tuple(pkeys), tuple(identifiers), pkey_len, is_custom
+    )
+
+
+def _get_document(category_data: Dict[str, Any], pkeys: Tuple[str, ...]) -> Any:
+    """Get the document at ``pkeys`` in a category's data, or ``...`` if there isn't one."""
+    document = category_data
+    try:
+        for pkey in pkeys:
+            document = document[pkey]
+    except (KeyError, TypeError):
+        return ...
+    return document
+
+
+def _set_path(data: Dict[str, Any], path: Tuple[str, ...], value: Any) -> None:
+    partial = data
+    for i in path[:-1]:
+        try:
+            partial = partial.setdefault(i, {})
+        except AttributeError:
+            # Tried to set sub-field of non-object
+            raise errors.CannotSetSubfield
+    partial[path[-1]] = value
+
+
+def _clear_path(data: Dict[str, Any], path: Tuple[str, ...]) -> bool:
+    """Remove the value at ``path``, returning whether there was one."""
+    partial = data
+    try:
+        for i in path[:-1]:
+            partial = partial[i]
+        del partial[path[-1]]
+    except KeyError:
+        return False
+    return True
+
+
+def _holds_no_documents(data: Any, num_missing_pkeys: int) -> bool:
+    """Check whether data nested by the missing primary keys holds no documents at all."""
+    if not isinstance(data, dict):
+        return False
+    if num_missing_pkeys == 1:
+        return not data
+    return all(_holds_no_documents(value, num_missing_pkeys - 1) for value in data.values())
+
+
+def _iter_empty_containers(
+    data: Dict[str, Any], num_missing_pkeys: int, parent_path: Tuple[str, ...]
+) -> Iterator[Tuple[str, ...]]:
+    """Yield the paths of the outermost containers between primary keys holding no documents."""
+    if num_missing_pkeys < 2:
+        return
+    for key, value in data.items():
+        path = parent_path + (key,)
+        if _holds_no_documents(value, num_missing_pkeys - 1):
+            yield path
+        elif isinstance(value, dict):
+            yield from _iter_empty_containers(value, num_missing_pkeys - 1, path)
+
+
+def _iter_live_documents(
+    data: Dict[str, Any], num_missing_pkeys: int, parent_pkeys: Tuple[str, ...] = ()
+) -> Iterator[Tuple[Tuple[str, ...], Any]]:
+    """
+    Yield (primary key, document) pairs from data nested by the missing primary keys.
+
+    Unlike iterating over the data directly, this allows the data to be
+    modified between each document.
+    """
+    if num_missing_pkeys == 0:
+        # Categories without primary keys, such as GLOBAL, are a single document
+        yield parent_pkeys, data
+        return
+    for key in list(data):
+        value = data.get(key, ...)
+        if value is ...:
+            # Removed since we started iterating
+            continue
+        if num_missing_pkeys == 1:
+            yield parent_pkeys + (key,), value
+        elif isinstance(value, dict):
+            yield from _iter_live_documents(value, num_missing_pkeys - 1, parent_pkeys + (key,))
+
+
+class _EncodedScope:
+    """The members of a guild, kept as their JSON text until they're first accessed."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _EncodedScopeFound(Exception):
+    pass
+
+
+def _interned_dict(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    return {sys.intern(key): value for key, value in pairs}
+
+
+def _loads_interned(text: str) -> Any:
+    # A single json.loads() call already reuses equal keys, but separate calls don't
+    return json.loads(text, object_pairs_hook=_interned_dict)
+
+
+def _deep_sizeof(data: Any) -> int:
+    """Get the size of data and everything it contains, counting shared objects once."""
+    seen = set()
+    size = 0
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(obj)
+        elif isinstance(obj, _EncodedScope):
+            stack.append(obj.text)
+    return size
+
+
+def _get_journal_path(data_path: Path) -> Path:
+    return data_path.with_suffix(".journal")
+
+
+def _append_journal(journal_path: Path, record: Dict[str, Any]) -> None:
+    with journal_path.open("a", encoding="utf-8") as fs:
+        fs.write(json.dumps(record) + "\n")
+        if JsonDriver._fsync == "always":
+            fs.flush()
+            os.fsync(fs.fileno())
+    if JsonDriver._fsync != "always":
+        _mark_unsynced(journal_path)
+
+
+def _read_journal_uuids(journal_path: Path) -> List[str]:
+    """Get the cog IDs written to by the records in a journal, in order."""
+    try:
+        with journal_path.open("r", encoding="utf-8") as fs:
+            lines = fs.readlines()
+    except FileNotFoundError:
+        return []
+    uuids = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # The same as when the journal is replayed
+            break
+        records = record["records"] if record["op"] == "batch" else [record]
+        for sub_record in records:
+            if sub_record["path"]:
+                uuids[sub_record["path"][0]] = None
+    return list(uuids)
+
+
+def _truncate_journal(journal_path: Path) -> None:
+    # If this doesn't make it to disk, the journal will just get replayed again on startup -
+    # replaying records which have already been applied doesn't change anything.
+    with journal_path.open("w", encoding="utf-8"):
+        pass
+
+
+def _get_shard_root(data_path: Path) -> Path:
+    return data_path.with_name(f"{data_path.stem}_shards")
+
+
+def _shard_file_name(pkey: str) -> str:
+    return f"{quote(pkey, safe='')}.json"
+
+
+def _read_shards(
+    category_dir: Path,
+    exclude: Iterable[Tuple[str, ...]] = (),
+    object_pairs_hook: Optional[Callable[[List[Tuple[str, Any]]], Dict[str, Any]]] = None,
+) -> Iterable[Tuple[str, Any]]:
+    """Read every shard file in a category's directory.
+
+    Shards whose ``(uuid, category, pkey)`` key is in ``exclude`` are skipped.
+    """
+    if not category_dir.is_dir():
+        return
+    uuid, category = category_dir.parent.name, category_dir.name
+    for shard_path in category_dir.iterdir():
+        if shard_path.suffix != ".json":
+            continue
+        pkey = unquote(shard_path.stem)
+        if (uuid, category, pkey) in exclude:
+            continue
+        with shard_path.open("r", encoding="utf-8") as fs:
+            yield pkey, json.load(fs, object_pairs_hook=object_pairs_hook)
+
+
+def _collect_writes(
+    path: Path, data: Dict[str, Any], units: Iterable[Tuple[str, ...]], sharded: bool
+) -> Tuple[List[Tuple[Path, Any]], List[Tuple[Path, Optional[Set[str]]]]]:
+    """Resolve units of a cog's data into the files which need to be written or removed.
+
+    A unit is one of:
+
+    - ``()``: The main data file, which holds everything not stored in shards.
+    - ``(uuid,)``: All of a cog identifier's shards.
+    - ``(uuid, category)``: All shards in a category.
+    - ``(uuid, category, pkey)``: A single shard.
+
+    This is done before handing the writes off to an executor, since shards may be
+    loaded into the same dicts on the event loop while the files are being written.
+
+    Returns
+    -------
+    Tuple[List[Tuple[Path, Any]], List[Tuple[Path, Optional[Set[str]]]]]
+        The files to write along with their data, and the files to remove. A removal
+        with a set of file names is a directory, from which every file not in the set
+        should be removed.
+
+    """
+    writes = []
+    removals = []
+    for unit in units:
+        if not unit:
+            main_data = data
+            if sharded:
+                main_data = {
+                    uuid: (
+                        {k: v for k, v in inner.items() if k not in _SHARDED_CATEGORIES}
+                        if isinstance(inner, dict)
+                        else inner
+                    )
+                    for uuid, inner in data.items()
+                }
+            writes.append((path, main_data))
+            continue
+        if not sharded:
+            continue
+
+        uuid, *rest = unit
+        uuid_dir = _get_shard_root(path) / uuid
+        categories = _SHARDED_CATEGORIES if not rest else (rest[0],)
+        for category in categories:
+            shards = data.get(uuid, {}).get(category, {})
+            if len(rest) == 2:
+                shard_path = uuid_dir / category / _shard_file_name(rest[1])
+                if rest[1] in shards:
+                    writes.append((shard_path, shards[rest[1]]))
+                else:
+                    removals.append((shard_path, None))
+                continue
+            file_names = set()
+            for pkey, value in shards.items():
+                file_name = _shard_file_name(pkey)
+                file_names.add(file_name)
+                writes.append((uuid_dir / category / file_name, value))
+            removals.append((uuid_dir / category, file_names))
+    return writes, removals
+
+
+def _write_files(
+    writes: List[Tuple[Path, Any]], removals: List[Tuple[Path, Optional[Set[str]]]]
+) -> None:
+    for path, data in writes:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _save_json(path, data)
+    for path, keep in removals:
+        if keep is None:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        elif path.is_dir():
+            for child in path.iterdir():
+                if child.name not in keep:
+                    child.unlink()
+            if not keep:
+                path.rmdir()
 
 
 def _save_json(path: Path, data: Dict[str, Any]) -> None:
@@ -244,20 +1334,95 @@ def _save_json(path: Path, data: Dict[str, Any]) -> None:
     filename = path.stem
     tmp_file = "{}-{}.tmp".format(filename, uuid4().fields[0])
     tmp_path = path.parent / tmp_file
+    always = JsonDriver._fsync == "always"
     with tmp_path.open(encoding="utf-8", mode="w") as fs:
-        json.dump(data, fs)
-        fs.flush()  # This does get closed on context exit, ...
-        os.fsync(fs.fileno())  # but that needs to happen prior to this line
+        _dump_json(data, fs)
+        if always:
+            fs.flush()  # This does get closed on context exit, ...
+            os.fsync(fs.fileno())  # but that needs to happen prior to this line
 
     tmp_path.replace(path)
 
+    if always:
+        _fsync_directory(path.parent)
+    else:
+        # The replace is still atomic, but it and the new data only reach the disk later.
+        _mark_unsynced(path, path.parent)
+
+
+def _dump_json(data: Any, fs: TextIO) -> None:
+    """Write data as JSON, splicing in the text of any encoded member scopes."""
+    if not JsonDriver._compact:
+        try:
+            json.dump(data, fs, default=_reject_encoded_scope)
+            return
+        except _EncodedScopeFound:
+            # Left in memory from when the compact mode was enabled
+            fs.seek(0)
+            fs.truncate()
+
+    texts = []
+    marker = f"\x00{uuid4().hex}:"
+    encoded_marker = json.dumps(marker)[1:-1]
+    # The markers can't be in the other strings, since they're encoded with a unique ID
+    pattern = re.compile(r'"{}(\d+)"'.format(re.escape(encoded_marker)))
+
+    def default(obj: Any) -> str:
+        if not isinstance(obj, _EncodedScope):
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+        texts.append(obj.text)
+        return f"{marker}{len(texts) - 1}"
+
+    # Streamed like json.dump(), so that the whole text is never held in memory at once.
+    # Strings returned by default() are encoded as a chunk of their own, but searching
+    # each chunk doesn't rely on that.
+    for chunk in json.JSONEncoder(default=default).iterencode(data):
+        if encoded_marker in chunk:
+            chunk = pattern.sub(lambda match: texts[int(match.group(1))], chunk)
+        fs.write(chunk)
+
+
+def _reject_encoded_scope(obj: Any) -> Any:
+    if isinstance(obj, _EncodedScope):
+        raise _EncodedScopeFound
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _fsync_directory(path: Path) -> None:
     try:
         flag = os.O_DIRECTORY  # pylint: disable=no-member
     except AttributeError:
         pass
     else:
-        fd = os.open(path.parent, flag)
+        fd = os.open(path, flag)
         try:
             os.fsync(fd)
         finally:
             os.close(fd)
+
+
+def _mark_unsynced(*paths: Path) -> None:
+    with _unsynced_lock:
+        _unsynced_paths.update(paths)
+
+
+def _fsync_unsynced() -> None:
+    """Fsync the files and directories written since they were last fsynced."""
+    with _unsynced_lock:
+        paths = list(_unsynced_paths)
+        _unsynced_paths.clear()
+    directories = {path for path in paths if path.is_dir()}
+    # Files must reach the disk before the directory entries which point to them.
+    for path in paths:
+        if path in directories:
+            continue
+        try:
+            # Windows can only flush files opened for writing. Unlike "ab", "r+b"
+            # doesn't recreate a file which has been removed.
+            with path.open("r+b") as fs:
+                os.fsync(fs.fileno())
+        except FileNotFoundError:
+            # Removed since it was written
+            pass
+    for path in directories:
+        _fsync_directory(path)
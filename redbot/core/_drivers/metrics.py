@@ -0,0 +1,66 @@
+import bisect
+from typing import Any, Dict, List
+
+__all__ = ["LatencyHistogram"]
+
+# Upper bounds of the histogram's buckets, in milliseconds
+BUCKET_BOUNDS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """A histogram of durations, with fixed logarithmic buckets.
+
+    Recording a duration is cheap and uses constant memory, at the cost
+    of percentiles only being estimated to the bucket they fall in.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        # The last bucket holds everything above the largest bound
+        self.counts: List[int] = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record a duration, in seconds."""
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, percent: float) -> float:
+        """Estimate a percentile of the recorded durations, in milliseconds.
+
+        This is the upper bound of the bucket the percentile falls in,
+        capped at the largest recorded duration.
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for idx, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count:
+                if idx < len(BUCKET_BOUNDS_MS):
+                    return min(BUCKET_BOUNDS_MS[idx], self.max)
+                break
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a JSON serializable summary of the histogram, in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+            "buckets": {
+                **{f"<={bound}ms": n for bound, n in zip(BUCKET_BOUNDS_MS, self.counts)},
+                f">{BUCKET_BOUNDS_MS[-1]}ms": self.counts[-1],
+            },
+        }
@@ -185,6 +185,134 @@ CREATE OR REPLACE FUNCTION
 $$;
 
 
+CREATE OR REPLACE FUNCTION
+  /*
+   * Get some of the fields of a config object.
+   *
+   * `pkeys` must be a full primary key. Only the given keys of the
+   * object at `identifiers` are extracted from the document, and
+   * returned as a JSONB object. Missing keys are left out.
+   */
+  red_config.get_fields(
+    id_data red_config.identifier_data,
+    fields text[],
+    OUT result jsonb
+  )
+    LANGUAGE 'plpgsql'
+    STABLE
+    PARALLEL SAFE
+  AS $$
+  DECLARE
+    schemaname CONSTANT text := concat_ws('.', id_data.cog_name, id_data.cog_id);
+    num_pkeys CONSTANT integer := coalesce(array_length(id_data.pkeys, 1), 0);
+    pkey_type CONSTANT text := red_utils.get_pkey_type(id_data.is_custom);
+    whereclause CONSTANT text := red_utils.gen_whereclause(num_pkeys, pkey_type);
+
+    table_exists CONSTANT boolean := exists(
+      SELECT 1
+      FROM information_schema.tables
+      WHERE table_schema = schemaname AND table_name = id_data.category);
+
+  BEGIN
+    IF table_exists THEN
+      EXECUTE format(
+        $query$
+        SELECT (
+          SELECT jsonb_object_agg(f.key, json_data #> ($2 || f.key))
+          FROM unnest($3) AS f(key)
+          WHERE json_data #> ($2 || f.key) IS NOT NULL)
+        FROM %I.%I WHERE %s
+        $query$,
+        schemaname,
+        id_data.category,
+        whereclause)
+      INTO result
+      USING id_data.pkeys, id_data.identifiers, fields;
+    END IF;
+  END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION
+  /*
+   * Create an index on a top-level field of a category's documents.
+   *
+   * The table is created first if it does not exist yet.
+   */
+  red_config.create_field_index(
+    id_data red_config.identifier_data,
+    field text
+  )
+    RETURNS void
+    LANGUAGE 'plpgsql'
+  AS $$
+  DECLARE
+    schemaname CONSTANT text := concat_ws('.', id_data.cog_name, id_data.cog_id);
+    -- Identifiers are truncated to 63 bytes, so the field is hashed to keep names unique.
+    indexname CONSTANT text := left(id_data.category, 40)||'_'||left(md5(field), 16)||'_idx';
+
+  BEGIN
+    PERFORM red_config.maybe_create_table(id_data);
+
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON %I.%I ((json_data -> %L))',
+      indexname,
+      schemaname,
+      id_data.category,
+      field);
+  END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION
+  /*
+   * Find the documents whose top-level field has the given value.
+   *
+   * `pkeys` may be a partial primary key, to limit the documents
+   * searched. Returns a JSONB array of `[primary keys, document]`
+   * pairs, or NULL when nothing matches.
+   */
+  red_config.find(
+    id_data red_config.identifier_data,
+    field text,
+    value jsonb,
+    OUT result jsonb
+  )
+    LANGUAGE 'plpgsql'
+    STABLE
+    PARALLEL SAFE
+  AS $$
+  DECLARE
+    schemaname CONSTANT text := concat_ws('.', id_data.cog_name, id_data.cog_id);
+    num_pkeys CONSTANT integer := coalesce(array_length(id_data.pkeys, 1), 0);
+    pkey_type CONSTANT text := red_utils.get_pkey_type(id_data.is_custom);
+    whereclause CONSTANT text := red_utils.gen_whereclause(num_pkeys, pkey_type);
+
+    table_exists CONSTANT boolean := exists(
+      SELECT 1
+      FROM information_schema.tables
+      WHERE table_schema = schemaname AND table_name = id_data.category);
+
+  BEGIN
+    IF table_exists THEN
+      -- The field is a literal, so that the expression matches the field's index.
+      EXECUTE format(
+        $query$
+        SELECT jsonb_agg(jsonb_build_array(jsonb_build_array(%s), json_data))
+        FROM %I.%I WHERE %s AND (json_data -> %L) = $2
+        $query$,
+        red_utils.gen_pkey_columns_casted(1, id_data.pkey_len),
+        schemaname,
+        id_data.category,
+        whereclause,
+        field)
+      INTO result
+      USING id_data.pkeys, value;
+    END IF;
+  END;
+$$;
+
+
 CREATE OR REPLACE FUNCTION
   /*
    * Set config data.
@@ -267,6 +395,8 @@ CREATE OR REPLACE FUNCTION
         constraintname)
       USING id_data.pkeys, new_value, num_missing_pkeys;
     END IF;
+
+    PERFORM red_config.notify_write(id_data);
   END;
 $$;
 
@@ -283,7 +413,8 @@ CREATE OR REPLACE FUNCTION
    * - When `id_data.category` is NULL or an empty string, it will drop
    * the whole schema.
    *
-   * Has no effect when the document or key does not exist.
+   * Has no effect when the document or key does not exist. The expiries
+   * of everything cleared are removed too.
    */
   red_config.clear(
     id_data red_config.identifier_data
@@ -309,6 +440,19 @@ CREATE OR REPLACE FUNCTION
     whereclause text;
 
   BEGIN
+    DELETE FROM red_config.red_expiries AS e
+    WHERE
+      e.cog_name = id_data.cog_name
+      AND e.cog_id = id_data.cog_id
+      AND (
+        coalesce(id_data.category, '') = ''
+        OR e.category = id_data.category
+        AND e.pkeys[1:num_pkeys] = id_data.pkeys
+        AND (
+          num_identifiers = 0
+          OR e.pkeys = id_data.pkeys
+          AND e.identifiers[1:num_identifiers] = id_data.identifiers));
+
     -- If the schema or table doesn't exist, just don't do anything to prevent SQL errors.
     IF NOT schema_exists THEN
       -- pass
@@ -355,6 +499,53 @@ CREATE OR REPLACE FUNCTION
       DELETE FROM red_config.red_cogs
       WHERE cog_name = id_data.cog_name AND cog_id = id_data.cog_id;
     END IF;
+
+    PERFORM red_config.notify_write(id_data);
+  END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION
+  /*
+   * Clear config data, only if it is equal to the given value.
+   *
+   * `pkeys` must be a full primary key. The document is locked while
+   * it is compared, so that it can't be written to before it is
+   * cleared. Returns whether the data was cleared.
+   */
+  red_config.clear_if_equal(
+    id_data red_config.identifier_data,
+    expected jsonb,
+    OUT cleared boolean
+  )
+    LANGUAGE 'plpgsql'
+  AS $$
+  DECLARE
+    schemaname CONSTANT text := concat_ws('.', id_data.cog_name, id_data.cog_id);
+    num_pkeys CONSTANT integer := coalesce(array_length(id_data.pkeys, 1), 0);
+    pkey_type CONSTANT text := red_utils.get_pkey_type(id_data.is_custom);
+    whereclause CONSTANT text := red_utils.gen_whereclause(num_pkeys, pkey_type);
+
+    table_exists CONSTANT boolean := exists(
+      SELECT 1
+      FROM information_schema.tables
+      WHERE table_schema = schemaname AND table_name = id_data.category);
+
+  BEGIN
+    cleared := false;
+    IF table_exists THEN
+      EXECUTE format(
+        'SELECT json_data #> $2 = $3 FROM %I.%I WHERE %s FOR UPDATE',
+        schemaname,
+        id_data.category,
+        whereclause)
+      INTO cleared
+      USING id_data.pkeys, id_data.identifiers, expected;
+      cleared := coalesce(cleared, false);
+    END IF;
+    IF cleared THEN
+      PERFORM red_config.clear(id_data);
+    END IF;
   END;
 $$;
 
@@ -386,7 +577,6 @@ CREATE OR REPLACE FUNCTION
     new_document jsonb;
     existing_document jsonb;
     existing_value jsonb;
-    pkey_placeholders text;
 
   BEGIN
     IF num_identifiers = 0 THEN
@@ -397,52 +587,47 @@ CREATE OR REPLACE FUNCTION
 
     PERFORM red_config.maybe_create_table(id_data);
 
-    -- Look for the existing document
+    -- Make sure the document exists, so that it can be locked until the update is done.
+    -- Otherwise concurrent calls would read the same value, and all but one would be lost.
     EXECUTE format(
-        'SELECT json_data FROM %I.%I WHERE %s',
-        schemaname,
-        id_data.category,
-        whereclause)
+      'INSERT INTO %I.%I VALUES(%s, %L) ON CONFLICT DO NOTHING',
+      schemaname,
+      id_data.category,
+      red_utils.gen_pkey_placeholders(id_data.pkey_len, pkey_type),
+      '{}')
+    USING id_data.pkeys;
+
+    EXECUTE format(
+      'SELECT json_data FROM %I.%I WHERE %s FOR UPDATE',
+      schemaname,
+      id_data.category,
+      whereclause)
     INTO existing_document USING id_data.pkeys;
 
-    IF existing_document IS NULL THEN
-      -- We need to insert a new document
+    existing_value := existing_document #> id_data.identifiers;
+
+    IF existing_value IS NULL THEN
       result := default_value + amount;
-      new_document := red_utils.jsonb_set2('{}', result, VARIADIC id_data.identifiers);
-      pkey_placeholders := red_utils.gen_pkey_placeholders(id_data.pkey_len, pkey_type);
 
-      EXECUTE format(
-        'INSERT INTO %I.%I VALUES(%s, $2)',
-        schemaname,
-        id_data.category,
-        pkey_placeholders)
-      USING id_data.pkeys, new_document;
+    ELSIF jsonb_typeof(existing_value) = 'number' THEN
+      result := existing_value::text::numeric + amount;
 
     ELSE
-      -- We need to update the existing document
-      existing_value := existing_document #> id_data.identifiers;
-
-      IF existing_value IS NULL THEN
-        result := default_value + amount;
-
-      ELSIF jsonb_typeof(existing_value) = 'number' THEN
-        result := existing_value::text::numeric + amount;
+      RAISE EXCEPTION 'Cannot increment non-numeric value %', existing_value
+      USING ERRCODE = 'wrong_object_type';
+    END IF;
 
-      ELSE
-        RAISE EXCEPTION 'Cannot increment non-numeric value %', existing_value
-        USING ERRCODE = 'wrong_object_type';
-      END IF;
+    new_document := red_utils.jsonb_set2(
+      existing_document, to_jsonb(result), VARIADIC id_data.identifiers);
 
-      new_document := red_utils.jsonb_set2(
-        existing_document, to_jsonb(result), id_data.identifiers);
+    EXECUTE format(
+      'UPDATE %I.%I SET json_data = $2 WHERE %s',
+      schemaname,
+      id_data.category,
+      whereclause)
+    USING id_data.pkeys, new_document;
 
-      EXECUTE format(
-        'UPDATE %I.%I SET json_data = $2 WHERE %s',
-        schemaname,
-        id_data.category,
-        whereclause)
-      USING id_data.pkeys, new_document;
-    END IF;
+    PERFORM red_config.notify_write(id_data);
   END;
 $$;
 
@@ -473,7 +658,6 @@ CREATE OR REPLACE FUNCTION
     new_document jsonb;
     existing_document jsonb;
     existing_value jsonb;
-    pkey_placeholders text;
 
   BEGIN
     IF num_identifiers = 0 THEN
@@ -484,52 +668,47 @@ CREATE OR REPLACE FUNCTION
 
     PERFORM red_config.maybe_create_table(id_data);
 
-    -- Look for the existing document
+    -- Make sure the document exists, so that it can be locked until the update is done.
+    -- Otherwise concurrent calls would read the same value, and all but one would be lost.
     EXECUTE format(
-      'SELECT json_data FROM %I.%I WHERE %s',
+      'INSERT INTO %I.%I VALUES(%s, %L) ON CONFLICT DO NOTHING',
+      schemaname,
+      id_data.category,
+      red_utils.gen_pkey_placeholders(id_data.pkey_len, pkey_type),
+      '{}')
+    USING id_data.pkeys;
+
+    EXECUTE format(
+      'SELECT json_data FROM %I.%I WHERE %s FOR UPDATE',
       schemaname,
       id_data.category,
       whereclause)
     INTO existing_document USING id_data.pkeys;
 
-    IF existing_document IS NULL THEN
-      -- We need to insert a new document
+    existing_value := existing_document #> id_data.identifiers;
+
+    IF existing_value IS NULL THEN
       result := NOT default_value;
-      new_document := red_utils.jsonb_set2('{}', result, VARIADIC id_data.identifiers);
-      pkey_placeholders := red_utils.gen_pkey_placeholders(id_data.pkey_len, pkey_type);
 
-      EXECUTE format(
-        'INSERT INTO %I.%I VALUES(%s, $2)',
-        schemaname,
-        id_data.category,
-        pkey_placeholders)
-      USING id_data.pkeys, new_document;
+    ELSIF jsonb_typeof(existing_value) = 'boolean' THEN
+      result := NOT existing_value::text::boolean;
 
     ELSE
-      -- We need to update the existing document
-      existing_value := existing_document #> id_data.identifiers;
-
-      IF existing_value IS NULL THEN
-        result := NOT default_value;
-
-      ELSIF jsonb_typeof(existing_value) = 'boolean' THEN
-        result := NOT existing_value::text::boolean;
+      RAISE EXCEPTION 'Cannot increment non-boolean value %', existing_value
+      USING ERRCODE = 'wrong_object_type';
+    END IF;
 
-      ELSE
-        RAISE EXCEPTION 'Cannot increment non-boolean value %', existing_value
-        USING ERRCODE = 'wrong_object_type';
-      END IF;
+    new_document := red_utils.jsonb_set2(
+      existing_document, to_jsonb(result), VARIADIC id_data.identifiers);
 
-      new_document := red_utils.jsonb_set2(
-        existing_document, to_jsonb(result), id_data.identifiers);
+    EXECUTE format(
+      'UPDATE %I.%I SET json_data = $2 WHERE %s',
+      schemaname,
+      id_data.category,
+      whereclause)
+    USING id_data.pkeys, new_document;
 
-      EXECUTE format(
-        'UPDATE %I.%I SET json_data = $2 WHERE %s',
-        schemaname,
-        id_data.category,
-        whereclause)
-      USING id_data.pkeys, new_document;
-    END IF;
+    PERFORM red_config.notify_write(id_data);
   END;
 $$;
 
@@ -619,6 +798,38 @@ CREATE OR REPLACE FUNCTION
         whereclause)
       USING id_data.pkeys, new_document;
     END IF;
+
+    PERFORM red_config.notify_write(id_data);
+  END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION
+  /*
+   * Notify listeners of a write, if its scope is in the
+   * red_config.red_notify_scopes table.
+   *
+   * The notification is sent on the `red_config` channel when the
+   * transaction commits. Its payload is a JSON object with the fields
+   * of `id_data`.
+   */
+  red_config.notify_write(
+    id_data red_config.identifier_data
+  )
+    RETURNS void
+    LANGUAGE 'plpgsql'
+  AS $$
+  BEGIN
+    IF exists(
+      SELECT 1
+      FROM red_config.red_notify_scopes t
+      WHERE
+        t.cog_name = id_data.cog_name
+        AND t.cog_id = id_data.cog_id
+        AND (coalesce(id_data.category, '') = '' OR t.category = id_data.category))
+    THEN
+      PERFORM pg_notify('red_config', to_jsonb(id_data)::text);
+    END IF;
   END;
 $$;
 
@@ -865,3 +1076,36 @@ CREATE TABLE IF NOT EXISTS
     PRIMARY KEY (cog_name, cog_id)
 )
 ;
+
+
+CREATE TABLE IF NOT EXISTS
+  /*
+   * Table of the scopes which red_config.notify_write() sends
+   * notifications for.
+   */
+  red_config.red_notify_scopes(
+    cog_name text,
+    cog_id text,
+    category text,
+    PRIMARY KEY (cog_name, cog_id, category)
+)
+;
+
+
+CREATE TABLE IF NOT EXISTS
+  /*
+   * Table of the times at which config values expire.
+   */
+  red_config.red_expiries(
+    cog_name text,
+    cog_id text,
+    category text,
+    pkeys text[],
+    identifiers text[],
+    pkey_len integer NOT NULL,
+    is_custom boolean NOT NULL,
+    expires_at double precision NOT NULL,
+    PRIMARY KEY (cog_name, cog_id, category, pkeys, identifiers)
+)
+;
+CREATE INDEX IF NOT EXISTS red_expiries_expires_at ON red_config.red_expiries (expires_at);
@@ -1,8 +1,13 @@
+import asyncio
 import getpass
 import json
+import pickle
+import re
 import sys
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import Optional, Any, AsyncIterator, Tuple, Union, Callable, List
+from typing import Optional, Any, AsyncIterator, Tuple, Union, Callable, List, Dict
 
 try:
     # pylint: disable=import-error
@@ -11,14 +16,17 @@ except ModuleNotFoundError:
     asyncpg = None
 
 from ... import data_manager, errors
-from ..base import BaseDriver, IdentifierData, ConfigCategory
+from ..base import BaseDriver, IdentifierData, ConfigCategory, _index_key, _matches
+from ..cache import ReadCache
 from ..log import log
+from ..metrics import LatencyHistogram
 
 __all__ = ["PostgresDriver"]
 
 _PKG_PATH = Path(__file__).parent
 DDL_SCRIPT_PATH = _PKG_PATH / "ddl.sql"
 DROP_DDL_SCRIPT_PATH = _PKG_PATH / "drop_ddl.sql"
+_FUNCTION_NAME_RE = re.compile(r"red_config\.(\w+)\(")
 
 
 def encode_identifier_data(
@@ -35,8 +43,37 @@ def encode_identifier_data(
     )
 
 
+def _quote_ident(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def decode_identifier_data(payload: Dict[str, Any]) -> IdentifierData:
+    is_global = payload["category"] == ConfigCategory.GLOBAL
+    return IdentifierData(
+        payload["cog_name"],
+        payload["cog_id"],
+        payload["category"] or "",
+        () if is_global else tuple(payload["pkeys"] or ()),
+        tuple(payload["identifiers"] or ()),
+        0 if is_global else payload["pkey_len"] or 0,
+        bool(payload["is_custom"]),
+    )
+
+
 class PostgresDriver(BaseDriver):
     _pool: Optional["asyncpg.pool.Pool"] = None
+    _cache: Optional[ReadCache] = None
+    _connect_details: Dict[str, Any] = {}
+    _listener_conn: Optional["asyncpg.Connection"] = None
+    _listener_lock: Optional[asyncio.Lock] = None
+    _reconnect_task: Optional[asyncio.Task] = None
+    _invalidation_listeners: Dict[
+        Tuple[str, str, str], List[Callable[[IdentifierData], None]]
+    ] = {}
+    # Fields declared as indexed, keyed by (cog_name, cog_id, category).
+    _declared_indexes: Dict[Tuple[str, str, str], Dict[str, bool]] = {}
+    _query_latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+    _acquire_latency: LatencyHistogram = LatencyHistogram()
 
     @classmethod
     async def initialize(cls, **storage_details) -> None:
@@ -44,14 +81,145 @@ class PostgresDriver(BaseDriver):
             raise errors.MissingExtraRequirements(
                 "Red must be installed with the [postgres] extra to use the PostgreSQL driver"
             )
-        cls._pool = await asyncpg.create_pool(**storage_details)
+        storage_details = storage_details.copy()
+        # The read cache is only safe when no other process writes to the database,
+        # or when their writes are notified, see add_invalidation_listener()
+        cache_size = storage_details.pop("cache_size", None)
+        cls._cache = ReadCache(cache_size) if cache_size else None
+        # The pool's size doesn't apply to the connection listening for notifications
+        pool_options = {
+            key: storage_details.pop(key)
+            for key in ("min_size", "max_size")
+            if key in storage_details
+        }
+        # asyncpg prepares every query which has arguments, and caches the prepared statements
+        # for each connection, so red_config's functions are only planned once per connection
+        storage_details.setdefault("statement_cache_size", 100)
+        cls._connect_details = storage_details
+        cls._listener_lock = asyncio.Lock()
+        cls._query_latency = defaultdict(LatencyHistogram)
+        cls._acquire_latency = LatencyHistogram()
+        cls._pool = await asyncpg.create_pool(**storage_details, **pool_options)
         with DDL_SCRIPT_PATH.open() as fs:
             await cls._pool.execute(fs.read())
 
     @classmethod
     async def teardown(cls) -> None:
+        if cls._reconnect_task is not None:
+            cls._reconnect_task.cancel()
+            cls._reconnect_task = None
+        if cls._listener_conn is not None:
+            conn, cls._listener_conn = cls._listener_conn, None
+            await conn.close()
+        cls._invalidation_listeners = {}
         if cls._pool is not None:
-            await cls._pool.close()
+            pool, cls._pool = cls._pool, None
+            await pool.close()
+        cls._cache = None
+
+    @classmethod
+    def cache_stats(cls) -> Optional[Dict[str, int]]:
+        """Get the read cache's hit and miss counters.
+
+        Returns
+        -------
+        Optional[Dict[str, int]]
+            The counters, or ``None`` if the read cache is disabled.
+
+        """
+        if cls._cache is None:
+            return None
+        return cls._cache.stats()
+
+    @classmethod
+    def get_metrics(cls) -> Dict[str, Any]:
+        if cls._pool is None:
+            return {}
+        return {
+            "pool": {
+                "min_size": cls._pool.get_min_size(),
+                "max_size": cls._pool.get_max_size(),
+                "size": cls._pool.get_size(),
+                "idle": cls._pool.get_idle_size(),
+                "acquire": cls._acquire_latency.to_dict(),
+            },
+            "queries": {name: hist.to_dict() for name, hist in cls._query_latency.items()},
+            "cache": cls.cache_stats(),
+        }
+
+    async def add_invalidation_listener(
+        self, category: str, callback: Callable[[IdentifierData], None]
+    ) -> None:
+        # Writes to the category, from this or any other process, will now be notified
+        await self._execute(
+            "INSERT INTO red_config.red_notify_scopes VALUES ($1, $2, $3) ON CONFLICT DO NOTHING",
+            self.cog_name,
+            self.unique_cog_identifier,
+            category,
+        )
+        key = (self.cog_name, self.unique_cog_identifier, category)
+        self._invalidation_listeners.setdefault(key, []).append(callback)
+        await self._ensure_listening()
+
+    @classmethod
+    async def _ensure_listening(cls) -> None:
+        async with cls._listener_lock:
+            if cls._listener_conn is not None:
+                return
+            conn = await asyncpg.connect(**cls._connect_details)
+            await conn.add_listener("red_config", cls._on_notification)
+            conn.add_termination_listener(cls._on_listener_terminated)
+            cls._listener_conn = conn
+
+    @classmethod
+    def _on_notification(cls, conn, pid: int, channel: str, payload: str) -> None:
+        identifier_data = decode_identifier_data(json.loads(payload))
+        cls._dispatch_invalidation(identifier_data)
+
+    @classmethod
+    def _on_listener_terminated(cls, conn) -> None:
+        if conn is not cls._listener_conn:
+            # We closed it ourselves
+            return
+        log.warning("Lost the connection listening for config writes, reconnecting")
+        cls._listener_conn = None
+        # Writes may be missed until we're listening again, so drop everything cached
+        for cog_name, cog_id, category in list(cls._invalidation_listeners):
+            cls._dispatch_invalidation(IdentifierData(cog_name, cog_id, category, (), (), 0))
+        if cls._reconnect_task is None:
+            cls._reconnect_task = asyncio.create_task(cls._reconnect_listener())
+
+    @classmethod
+    async def _reconnect_listener(cls) -> None:
+        try:
+            while cls._pool is not None and cls._listener_conn is None:
+                try:
+                    await cls._ensure_listening()
+                except (OSError, asyncpg.PostgresError):
+                    await asyncio.sleep(5)
+        finally:
+            if cls._reconnect_task is asyncio.current_task():
+                cls._reconnect_task = None
+
+    @classmethod
+    def _dispatch_invalidation(cls, identifier_data: IdentifierData) -> None:
+        if cls._cache is not None:
+            cls._cache.invalidate(identifier_data)
+        if identifier_data.category:
+            keys = [(identifier_data.cog_name, identifier_data.uuid, identifier_data.category)]
+        else:
+            # The cog's whole data was cleared
+            keys = [
+                key
+                for key in cls._invalidation_listeners
+                if key[:2] == (identifier_data.cog_name, identifier_data.uuid)
+            ]
+        for key in keys:
+            for callback in cls._invalidation_listeners.get(key, ()):
+                try:
+                    callback(identifier_data)
+                except Exception:
+                    log.exception("Error in config invalidation listener %r", callback)
 
     @staticmethod
     def get_config_details():
@@ -136,10 +304,20 @@ class PostgresDriver(BaseDriver):
         }
 
     async def get(self, identifier_data: IdentifierData):
+        if self._cache is None:
+            return await self._fetch(identifier_data)
+        return pickle.loads(pickle.dumps(await self.get_view(identifier_data), -1))
+
+    async def get_view(self, identifier_data: IdentifierData):
+        if self._cache is None:
+            return await self._fetch(identifier_data)
+        return await self._cache.get(identifier_data, self._fetch)
+
+    async def _fetch(self, identifier_data: IdentifierData):
         result = await self._execute(
             "SELECT red_config.get($1)",
             encode_identifier_data(identifier_data),
-            method=self._pool.fetchval,
+            method="fetchval",
         )
 
         if result is None:
@@ -148,6 +326,125 @@ class PostgresDriver(BaseDriver):
             raise KeyError
         return json.loads(result)
 
+    async def get_fields(self, identifier_data: IdentifierData, fields):
+        if (
+            self._cache is not None
+            or len(identifier_data.primary_key) < identifier_data.primary_key_len
+        ):
+            return await super().get_fields(identifier_data, fields)
+        result = await self._execute(
+            "SELECT red_config.get_fields($1, $2)",
+            encode_identifier_data(identifier_data),
+            list(fields),
+            method="fetchval",
+        )
+        if result is None:
+            return {}
+        return json.loads(result)
+
+    def declare_index(self, identifier_data: IdentifierData, field: str) -> None:
+        key = (identifier_data.cog_name, identifier_data.uuid, identifier_data.category)
+        # Maps each field to whether its index has been created
+        self._declared_indexes.setdefault(key, {}).setdefault(field, False)
+
+    async def find(self, identifier_data: IdentifierData, criteria: Dict[str, Any]):
+        key = (identifier_data.cog_name, identifier_data.uuid, identifier_data.category)
+        declared = self._declared_indexes.get(key, {})
+        field = next((f for f in criteria if f in declared), None)
+        if field is None:
+            return await super().find(identifier_data, criteria)
+
+        category_ident = IdentifierData(
+            identifier_data.cog_name,
+            identifier_data.uuid,
+            identifier_data.category,
+            (),
+            (),
+            identifier_data.primary_key_len,
+            identifier_data.is_custom,
+        )
+        if not declared[field]:
+            await self._execute(
+                "SELECT red_config.create_field_index($1, $2)",
+                encode_identifier_data(category_ident),
+                field,
+            )
+            declared[field] = True
+        result = await self._execute(
+            "SELECT red_config.find($1, $2, $3::jsonb)",
+            encode_identifier_data(identifier_data),
+            field,
+            json.dumps(criteria[field]),
+            method="fetchval",
+        )
+        if result is None:
+            return {}
+        keys = {f: _index_key(value) for f, value in criteria.items()}
+        num_pkeys = len(identifier_data.primary_key)
+        return {
+            tuple(pkeys[num_pkeys:]): document
+            for pkeys, document in json.loads(result)
+            if _matches(document, keys)
+        }
+
+    async def set_expiry(self, identifier_data: IdentifierData, expires_at: Optional[float]):
+        await self._set_expiry(identifier_data, expires_at)
+
+    async def _set_expiry(
+        self,
+        identifier_data: IdentifierData,
+        expires_at: Optional[float],
+        *,
+        conn: Optional["asyncpg.Connection"] = None,
+    ) -> None:
+        (
+            cog_name,
+            cog_id,
+            category,
+            pkeys,
+            identifiers,
+            pkey_len,
+            is_custom,
+        ) = encode_identifier_data(identifier_data)
+        if expires_at is None:
+            await self._execute(
+                "DELETE FROM red_config.red_expiries"
+                " WHERE cog_name = $1 AND cog_id = $2 AND category = $3"
+                " AND pkeys = $4 AND identifiers = $5",
+                cog_name,
+                cog_id,
+                category,
+                pkeys,
+                identifiers,
+                conn=conn,
+            )
+            return
+        await self._execute(
+            "INSERT INTO red_config.red_expiries VALUES ($1, $2, $3, $4, $5, $6, $7, $8)"
+            " ON CONFLICT (cog_name, cog_id, category, pkeys, identifiers) DO UPDATE"
+            " SET expires_at = excluded.expires_at",
+            cog_name,
+            cog_id,
+            category,
+            pkeys,
+            identifiers,
+            pkey_len,
+            is_custom,
+            expires_at,
+            conn=conn,
+        )
+
+    @classmethod
+    async def pop_expired(cls, now: float) -> List[IdentifierData]:
+        # Deleting the rows makes sure only one process sharing the database gets each of them
+        rows = await cls._execute(
+            "DELETE FROM red_config.red_expiries WHERE expires_at <= $1"
+            " RETURNING cog_name, cog_id, category, pkeys, identifiers, pkey_len, is_custom",
+            now,
+            method="fetch",
+        )
+        return [decode_identifier_data(dict(row)) for row in rows]
+
     async def set(self, identifier_data: IdentifierData, value=None):
         try:
             await self._execute(
@@ -157,34 +454,143 @@ class PostgresDriver(BaseDriver):
             )
         except asyncpg.ErrorInAssignmentError:
             raise errors.CannotSetSubfield
+        finally:
+            self._invalidate(identifier_data)
 
     async def clear(self, identifier_data: IdentifierData):
-        await self._execute("SELECT red_config.clear($1)", encode_identifier_data(identifier_data))
+        try:
+            await self._execute(
+                "SELECT red_config.clear($1)", encode_identifier_data(identifier_data)
+            )
+        finally:
+            self._invalidate(identifier_data)
+
+    def _invalidate(self, identifier_data: IdentifierData) -> None:
+        if self._cache is not None:
+            self._cache.invalidate(identifier_data)
+
+    async def apply_batch(self, operations):
+        try:
+            await self._apply_batch(operations)
+        finally:
+            for __, identifier_data, __ in operations:
+                self._invalidate(identifier_data)
+
+    async def _apply_batch(self, operations):
+        async with self._pool.acquire() as conn, conn.transaction():
+            for op, identifier_data, value in operations:
+                if op == "set":
+                    try:
+                        await self._execute(
+                            "SELECT red_config.set($1, $2::jsonb)",
+                            encode_identifier_data(identifier_data),
+                            json.dumps(value),
+                            conn=conn,
+                        )
+                    except asyncpg.ErrorInAssignmentError:
+                        raise errors.CannotSetSubfield
+                elif op == "set_expiry":
+                    await self._set_expiry(identifier_data, value, conn=conn)
+                elif op == "clear_if_equal":
+                    await self._execute(
+                        "SELECT red_config.clear_if_equal($1, $2::jsonb)",
+                        encode_identifier_data(identifier_data),
+                        json.dumps(value),
+                        conn=conn,
+                    )
+                else:
+                    await self._execute(
+                        "SELECT red_config.clear($1)",
+                        encode_identifier_data(identifier_data),
+                        conn=conn,
+                    )
+
+    async def aiter_documents(self, identifier_data: IdentifierData, *, batch_size: int = 1000):
+        num_pkeys = len(identifier_data.primary_key)
+        pkey_type = "text" if identifier_data.is_custom else "bigint"
+        conditions = [
+            f"primary_key_{idx} = ($1::text[])[{idx}]::{pkey_type}"
+            for idx in range(1, num_pkeys + 1)
+        ]
+        remaining = [
+            f"primary_key_{idx}"
+            for idx in range(num_pkeys + 1, identifier_data.primary_key_len + 1)
+        ]
+        # Aliased, so that ORDER BY sorts on the columns rather than on their text
+        columns = ", ".join(
+            [*(f"{column}::text AS {column}_text" for column in remaining), "json_data"]
+        )
+        query = (
+            f"SELECT {columns}"
+            f" FROM {_quote_ident(f'{self.cog_name}.{self.unique_cog_identifier}')}"
+            f".{_quote_ident(identifier_data.category)}"
+        )
+        first_query = f"{query} WHERE {' AND '.join(conditions) or 'TRUE'}"
+        if remaining:
+            # Keyset pagination, so that no connection is held while documents are yielded
+            order_by = ", ".join(remaining)
+            after_param = "$2" if num_pkeys else "$1"
+            after = ", ".join(
+                f"({after_param}::text[])[{idx}]::{pkey_type}"
+                for idx in range(1, len(remaining) + 1)
+            )
+            conditions.append(f"({order_by}) > ({after})")
+            next_query = (
+                f"{query} WHERE {' AND '.join(conditions)}"
+                f" ORDER BY {order_by} LIMIT {int(batch_size)}"
+            )
+            first_query += f" ORDER BY {order_by} LIMIT {int(batch_size)}"
+        args = (list(identifier_data.primary_key),) if num_pkeys else ()
+        last_pkeys = None
+        while True:
+            try:
+                if last_pkeys is None:
+                    rows = await self._execute(first_query, *args, method="fetch")
+                else:
+                    rows = await self._execute(next_query, *args, last_pkeys, method="fetch")
+            except (asyncpg.InvalidSchemaNameError, asyncpg.UndefinedTableError):
+                # No data has been stored in this category yet
+                return
+            for row in rows:
+                *pkeys, json_data = row
+                yield tuple(pkeys), json.loads(json_data)
+            if not remaining or len(rows) < batch_size:
+                return
+            # Continue from the last primary key, in case documents were removed meanwhile
+            last_pkeys = list(rows[-1])[:-1]
 
     async def inc(
         self, identifier_data: IdentifierData, value: Union[int, float], default: Union[int, float]
     ) -> Union[int, float]:
         try:
-            return await self._execute(
+            result = await self._execute(
                 f"SELECT red_config.inc($1, $2, $3)",
                 encode_identifier_data(identifier_data),
                 value,
                 default,
-                method=self._pool.fetchval,
+                method="fetchval",
             )
         except asyncpg.WrongObjectTypeError as exc:
             raise errors.StoredTypeError(*exc.args)
+        finally:
+            self._invalidate(identifier_data)
+        # The result is a numeric, which asyncpg decodes to a Decimal
+        if result.as_tuple().exponent >= 0:
+            return int(result)
+        return float(result)
 
     async def toggle(self, identifier_data: IdentifierData, default: bool) -> bool:
         try:
             return await self._execute(
-                "SELECT red_config.inc($1, $2)",
+                "SELECT red_config.toggle($1, $2)",
                 encode_identifier_data(identifier_data),
                 default,
-                method=self._pool.fetchval,
+                method="fetchval",
             )
         except asyncpg.WrongObjectTypeError as exc:
             raise errors.StoredTypeError(*exc.args)
+        finally:
+            self._invalidate(identifier_data)
 
     @classmethod
     async def aiter_cogs(cls) -> AsyncIterator[Tuple[str, str]]:
@@ -217,12 +623,35 @@ class PostgresDriver(BaseDriver):
             )
         with DROP_DDL_SCRIPT_PATH.open() as fs:
             await cls._pool.execute(fs.read())
+        if cls._cache is not None:
+            cls._cache.clear()
 
     @classmethod
-    async def _execute(cls, query: str, *args, method: Optional[Callable] = None) -> Any:
-        if method is None:
-            method = cls._pool.execute
+    async def _execute(
+        cls,
+        query: str,
+        *args,
+        method: str = "execute",
+        conn: Optional["asyncpg.Connection"] = None,
+    ) -> Any:
         log.invisible("Query: %s", query)
         if args:
             log.invisible("Args: %s", args)
-        return await method(query, *args)
+        if conn is not None:
+            return await cls._timed(query, getattr(conn, method), args)
+
+        start = time.perf_counter()
+        async with cls._pool.acquire() as conn:
+            # Time spent waiting for a free connection means the pool is too small
+            cls._acquire_latency.observe(time.perf_counter() - start)
+            return await cls._timed(query, getattr(conn, method), args)
+
+    @classmethod
+    async def _timed(cls, query: str, method: Callable, args: Tuple[Any, ...]) -> Any:
+        match = _FUNCTION_NAME_RE.search(query)
+        name = match[1] if match else "other"
+        start = time.perf_counter()
+        try:
+            return await method(query, *args)
+        finally:
+            cls._query_latency[name].observe(time.perf_counter() - start)
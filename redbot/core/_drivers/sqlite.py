@@ -0,0 +1,563 @@
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import json
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .. import data_manager, errors
+from ..utils.dbtools import APSWConnectionWrapper
+from .base import (
+    BaseDriver,
+    IdentifierData,
+    _get_incremented,
+    _get_toggled,
+    _index_key,
+    _iter_documents,
+    _matches,
+    _strictly_equal,
+)
+from .log import log
+
+__all__ = ["SqliteDriver"]
+
+_T = TypeVar("_T")
+
+DEFAULT_DB_FILE_NAME = "config.sqlite3"
+
+PRAGMA_SET_journal_mode = "PRAGMA journal_mode = wal;"
+PRAGMA_SET_synchronous = "PRAGMA synchronous = normal;"
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS red_config (
+  cog_name TEXT NOT NULL,
+  cog_id TEXT NOT NULL,
+  category TEXT NOT NULL,
+  -- JSON array of the document's primary key. JSON arrays sharing a prefix are sorted next to
+  -- each other, so documents with a partial primary key can be found with a range query.
+  pkeys TEXT NOT NULL,
+  json_data TEXT NOT NULL,
+  PRIMARY KEY (cog_name, cog_id, category, pkeys)
+) WITHOUT ROWID;
+"""
+CREATE_EXPIRY_TABLE = """
+CREATE TABLE IF NOT EXISTS red_config_expiries (
+  cog_name TEXT NOT NULL,
+  cog_id TEXT NOT NULL,
+  category TEXT NOT NULL,
+  pkeys TEXT NOT NULL,
+  identifiers TEXT NOT NULL,
+  pkey_len INTEGER NOT NULL,
+  is_custom INTEGER NOT NULL,
+  expires_at REAL NOT NULL,
+  PRIMARY KEY (cog_name, cog_id, category, pkeys, identifiers)
+) WITHOUT ROWID;
+"""
+CREATE_EXPIRY_INDEX = """
+CREATE INDEX IF NOT EXISTS red_config_expiries_expires_at ON red_config_expiries (expires_at);
+"""
+DOCUMENT_FETCH = """
+SELECT json_data FROM red_config
+WHERE cog_name = ? AND cog_id = ? AND category = ? AND pkeys = ?;
+"""
+DOCUMENT_UPSERT = """
+INSERT INTO red_config (cog_name, cog_id, category, pkeys, json_data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (cog_name, cog_id, category, pkeys) DO UPDATE
+SET json_data = excluded.json_data;
+"""
+# Indexes are on the fields of all documents, so there's one for each indexed field name.
+FIELD_INDEX_CREATE = """
+CREATE INDEX IF NOT EXISTS {name} ON red_config (cog_name, cog_id, category, {expression});
+"""
+EXPIRY_UPSERT = """
+INSERT INTO red_config_expiries
+  (cog_name, cog_id, category, pkeys, identifiers, pkey_len, is_custom, expires_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (cog_name, cog_id, category, pkeys, identifiers) DO UPDATE
+SET expires_at = excluded.expires_at;
+"""
+EXPIRY_DELETE = """
+DELETE FROM red_config_expiries
+WHERE cog_name = ? AND cog_id = ? AND category = ? AND pkeys = ? AND identifiers = ?;
+"""
+EXPIRED_POP = """
+DELETE FROM red_config_expiries WHERE expires_at <= ?
+RETURNING cog_name, cog_id, category, pkeys, identifiers, pkey_len, is_custom;
+"""
+COGS_FETCH_ALL = "SELECT DISTINCT cog_name, cog_id FROM red_config;"
+DELETE_ALL = "DELETE FROM red_config;"
+DELETE_ALL_EXPIRIES = "DELETE FROM red_config_expiries;"
+
+
+def _encode_pkeys(pkeys: Tuple[str, ...]) -> str:
+    return json.dumps(list(pkeys))
+
+
+def _field_expression(field: str) -> str:
+    """Get the SQL expression for the JSON text of a document's top-level field.
+
+    Queries must use the exact same expression for SQLite to use the field's index.
+    """
+    path = '$."' + field + '"'
+    return "json_data -> '" + path.replace("'", "''") + "'"
+
+
+def _get_nested(document: Any, identifiers: Tuple[str, ...]) -> Any:
+    for i in identifiers:
+        if not isinstance(document, dict):
+            raise KeyError(i)
+        document = document[i]
+    return document
+
+
+def _set_nested(document: Any, identifiers: Tuple[str, ...], value: Any) -> Any:
+    """Set a value within a document, returning the new document."""
+    if not identifiers:
+        return value
+    partial = document
+    for i in identifiers[:-1]:
+        partial = partial.setdefault(i, {})
+        if not isinstance(partial, dict):
+            raise errors.CannotSetSubfield
+    partial[identifiers[-1]] = value
+    return document
+
+
+class SqliteDriver(BaseDriver):
+    """
+    Subclass of :py:class:`.BaseDriver`.
+
+    Stores each document - the data for one full primary key - as a row
+    of JSON in an SQLite database in the instance's data directory. The
+    database uses write-ahead logging, so reads don't wait for writes.
+
+    All queries are run on a single worker thread, which serializes
+    access to the connection without blocking the event loop.
+    """
+
+    _conn: Optional[APSWConnectionWrapper] = None
+    _executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+    # Fields whose indexes have been created since the driver was initialized.
+    _indexed_fields: Set[str] = set()
+    # Fields declared as indexed, keyed by (cog_name, cog_id, category).
+    _declared_indexes: Dict[Tuple[str, str, str], Set[str]] = {}
+
+    @classmethod
+    async def initialize(cls, **storage_details) -> None:
+        path = storage_details.get("path")
+        if path is None:
+            path = data_manager._base_data_path() / DEFAULT_DB_FILE_NAME
+        cls._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="red_sqlite_driver"
+        )
+        cls._conn = await cls._run(APSWConnectionWrapper, Path(path))
+        with cls._conn.with_cursor() as cursor:
+            await cls._run(cursor.execute, PRAGMA_SET_journal_mode)
+            await cls._run(cursor.execute, PRAGMA_SET_synchronous)
+            await cls._run(cursor.execute, CREATE_TABLE)
+            await cls._run(cursor.execute, CREATE_EXPIRY_TABLE)
+            await cls._run(cursor.execute, CREATE_EXPIRY_INDEX)
+
+    @classmethod
+    async def teardown(cls) -> None:
+        if cls._conn is not None:
+            await cls._run(cls._conn.close)
+            cls._conn = None
+        if cls._executor is not None:
+            cls._executor.shutdown()
+            cls._executor = None
+        cls._indexed_fields = set()
+
+    @staticmethod
+    def get_config_details() -> Dict[str, Any]:
+        # The database is always stored in the instance's data directory
+        return {}
+
+    @classmethod
+    async def _run(cls, func: Callable[..., _T], *args) -> _T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._executor, functools.partial(func, *args))
+
+    @staticmethod
+    def _where_clause(identifier_data: IdentifierData) -> Tuple[str, List[str]]:
+        clauses = ["cog_name = ?", "cog_id = ?"]
+        params = [identifier_data.cog_name, identifier_data.uuid]
+        if not identifier_data.category:
+            return " AND ".join(clauses), params
+
+        clauses.append("category = ?")
+        params.append(identifier_data.category)
+        pkeys = identifier_data.primary_key
+        if len(pkeys) >= identifier_data.primary_key_len:
+            clauses.append("pkeys = ?")
+            params.append(_encode_pkeys(pkeys))
+        elif pkeys:
+            # Matches every JSON array which starts with these primary keys.
+            prefix = _encode_pkeys(pkeys)[:-1] + ", "
+            clauses.append("pkeys >= ? AND pkeys < ?")
+            params.extend((prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+        return " AND ".join(clauses), params
+
+    @staticmethod
+    def _expiry_where_clause(identifier_data: IdentifierData) -> Tuple[str, List[str]]:
+        """Get the clause matching the expiries of a value and of everything within it."""
+        clauses = ["cog_name = ?", "cog_id = ?"]
+        params = [identifier_data.cog_name, identifier_data.uuid]
+        if not identifier_data.category:
+            return " AND ".join(clauses), params
+
+        clauses.append("category = ?")
+        params.append(identifier_data.category)
+        if identifier_data.identifiers:
+            clauses.append("pkeys = ?")
+            params.append(_encode_pkeys(identifier_data.primary_key))
+            column, keys = "identifiers", identifier_data.identifiers
+        else:
+            column, keys = "pkeys", identifier_data.primary_key
+        if keys:
+            # Matches this JSON array, and every longer one which starts with it.
+            encoded = _encode_pkeys(keys)
+            prefix = encoded[:-1] + ", "
+            clauses.append(f"({column} = ? OR {column} >= ? AND {column} < ?)")
+            params.extend((encoded, prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+        return " AND ".join(clauses), params
+
+    def _fetch_document(self, cursor, identifier_data: IdentifierData) -> Optional[Any]:
+        row = cursor.execute(
+            DOCUMENT_FETCH,
+            (
+                identifier_data.cog_name,
+                identifier_data.uuid,
+                identifier_data.category,
+                _encode_pkeys(identifier_data.primary_key),
+            ),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def _upsert_document(self, cursor, identifier_data: IdentifierData, document: Any) -> None:
+        cursor.execute(
+            DOCUMENT_UPSERT,
+            (
+                identifier_data.cog_name,
+                identifier_data.uuid,
+                identifier_data.category,
+                _encode_pkeys(identifier_data.primary_key),
+                json.dumps(document),
+            ),
+        )
+
+    def _get(self, identifier_data: IdentifierData) -> Any:
+        num_pkeys = len(identifier_data.primary_key)
+        with self._conn.with_cursor() as cursor:
+            if num_pkeys >= identifier_data.primary_key_len:
+                document = self._fetch_document(cursor, identifier_data)
+                if document is None:
+                    raise KeyError
+                return _get_nested(document, identifier_data.identifiers)
+
+            where, params = self._where_clause(identifier_data)
+            query = f"SELECT pkeys, json_data FROM red_config WHERE {where};"
+            log.invisible("Query: %s", query)
+            ret = {}
+            for pkeys, json_data in cursor.execute(query, params):
+                *parent_pkeys, last_pkey = json.loads(pkeys)[num_pkeys:]
+                partial = ret
+                for pkey in parent_pkeys:
+                    partial = partial.setdefault(pkey, {})
+                partial[last_pkey] = json.loads(json_data)
+        if not ret:
+            raise KeyError
+        return ret
+
+    def _fetch_documents(
+        self, identifier_data: IdentifierData, after: Optional[str], limit: int
+    ) -> List[Tuple[str, str]]:
+        where, params = self._where_clause(identifier_data)
+        if after is not None:
+            where += " AND pkeys > ?"
+            params.append(after)
+        query = f"SELECT pkeys, json_data FROM red_config WHERE {where} ORDER BY pkeys LIMIT ?;"
+        log.invisible("Query: %s", query)
+        with self._conn.with_cursor() as cursor:
+            return list(cursor.execute(query, (*params, limit)))
+
+    def _set(self, cursor, identifier_data: IdentifierData, value: Any) -> None:
+        num_pkeys = len(identifier_data.primary_key)
+        if num_pkeys >= identifier_data.primary_key_len:
+            document = value
+            if identifier_data.identifiers:
+                document = self._fetch_document(cursor, identifier_data)
+                if document is None:
+                    document = {}
+                elif not isinstance(document, dict):
+                    raise errors.CannotSetSubfield
+                document = _set_nested(document, identifier_data.identifiers, value)
+            self._upsert_document(cursor, identifier_data, document)
+            return
+
+        # Setting multiple documents
+        where, params = self._where_clause(identifier_data)
+        cursor.execute(f"DELETE FROM red_config WHERE {where};", params)
+        num_missing_pkeys = identifier_data.primary_key_len - num_pkeys
+        cursor.executemany(
+            DOCUMENT_UPSERT,
+            (
+                (
+                    identifier_data.cog_name,
+                    identifier_data.uuid,
+                    identifier_data.category,
+                    _encode_pkeys(identifier_data.primary_key + pkeys),
+                    json.dumps(document),
+                )
+                for pkeys, document in _iter_documents(value, num_missing_pkeys)
+            ),
+        )
+
+    def _clear(self, cursor, identifier_data: IdentifierData) -> None:
+        where, params = self._expiry_where_clause(identifier_data)
+        cursor.execute(f"DELETE FROM red_config_expiries WHERE {where};", params)
+        if not identifier_data.identifiers:
+            where, params = self._where_clause(identifier_data)
+            cursor.execute(f"DELETE FROM red_config WHERE {where};", params)
+            return
+
+        # Popping a key from a document or nested document
+        document = self._fetch_document(cursor, identifier_data)
+        *parent_identifiers, last_identifier = identifier_data.identifiers
+        try:
+            parent = _get_nested(document, tuple(parent_identifiers))
+            del parent[last_identifier]
+        except (KeyError, TypeError):
+            return
+        self._upsert_document(cursor, identifier_data, document)
+
+    def _clear_if_equal(self, cursor, identifier_data: IdentifierData, value: Any) -> None:
+        # Only called within a transaction, so nothing can write in between
+        document = self._fetch_document(cursor, identifier_data)
+        if document is None:
+            return
+        try:
+            existing_value = _get_nested(document, identifier_data.identifiers)
+        except KeyError:
+            return
+        if _strictly_equal(existing_value, value):
+            self._clear(cursor, identifier_data)
+
+    def _apply_batch(self, operations: Sequence[Tuple[str, IdentifierData, Any]]) -> None:
+        with self._conn.transaction() as cursor:
+            for op, identifier_data, value in operations:
+                if op == "set":
+                    self._set(cursor, identifier_data, value)
+                elif op == "set_expiry":
+                    self._set_expiry(cursor, identifier_data, value)
+                elif op == "clear_if_equal":
+                    self._clear_if_equal(cursor, identifier_data, value)
+                else:
+                    self._clear(cursor, identifier_data)
+
+    @classmethod
+    def _create_field_index(cls, field: str) -> None:
+        name = "red_config_field_" + hashlib.sha1(field.encode()).hexdigest()[:16]
+        with cls._conn.with_cursor() as cursor:
+            cursor.execute(
+                FIELD_INDEX_CREATE.format(name=name, expression=_field_expression(field))
+            )
+
+    def _find(
+        self, identifier_data: IdentifierData, field: str, criteria: Dict[str, Any]
+    ) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        where, params = self._where_clause(identifier_data)
+        query = (
+            f"SELECT pkeys, json_data FROM red_config"
+            f" WHERE {where} AND {_field_expression(field)} = json(?);"
+        )
+        log.invisible("Query: %s", query)
+        keys = {f: _index_key(value) for f, value in criteria.items()}
+        num_pkeys = len(identifier_data.primary_key)
+        ret = {}
+        with self._conn.with_cursor() as cursor:
+            for pkeys, json_data in cursor.execute(query, (*params, json.dumps(criteria[field]))):
+                document = json.loads(json_data)
+                if _matches(document, keys):
+                    ret[tuple(json.loads(pkeys)[num_pkeys:])] = document
+        return ret
+
+    def _set_expiry(
+        self, cursor, identifier_data: IdentifierData, expires_at: Optional[float]
+    ) -> None:
+        key = (
+            identifier_data.cog_name,
+            identifier_data.uuid,
+            identifier_data.category,
+            _encode_pkeys(identifier_data.primary_key),
+            _encode_pkeys(identifier_data.identifiers),
+        )
+        if expires_at is None:
+            cursor.execute(EXPIRY_DELETE, key)
+        else:
+            cursor.execute(
+                EXPIRY_UPSERT,
+                (
+                    *key,
+                    identifier_data.primary_key_len,
+                    identifier_data.is_custom,
+                    expires_at,
+                ),
+            )
+
+    @classmethod
+    def _pop_expired(cls, now: float) -> List[IdentifierData]:
+        with cls._conn.with_cursor() as cursor:
+            rows = list(cursor.execute(EXPIRED_POP, (now,)))
+        return [
+            IdentifierData(
+                cog_name,
+                cog_id,
+                category,
+                tuple(json.loads(pkeys)),
+                tuple(json.loads(identifiers)),
+                pkey_len,
+                bool(is_custom),
+            )
+            for cog_name, cog_id, category, pkeys, identifiers, pkey_len, is_custom in rows
+        ]
+
+    def _update_value(
+        self, identifier_data: IdentifierData, func: Callable[[Any], Any]
+    ) -> Union[int, float, bool]:
+        if not identifier_data.identifiers:
+            raise errors.StoredTypeError("Cannot update document(s)")
+        with self._conn.transaction() as cursor:
+            document = self._fetch_document(cursor, identifier_data)
+            if document is None:
+                document = {}
+            try:
+                existing_value = _get_nested(document, identifier_data.identifiers)
+            except KeyError:
+                existing_value = ...
+            result = func(existing_value)
+            if not isinstance(document, dict):
+                raise errors.CannotSetSubfield
+            document = _set_nested(document, identifier_data.identifiers, result)
+            self._upsert_document(cursor, identifier_data, document)
+        return result
+
+    async def get(self, identifier_data: IdentifierData):
+        return await self._run(self._get, identifier_data)
+
+    async def aiter_documents(self, identifier_data: IdentifierData, *, batch_size: int = 1000):
+        num_pkeys = len(identifier_data.primary_key)
+        after = None
+        while True:
+            rows = await self._run(self._fetch_documents, identifier_data, after, batch_size)
+            for pkeys, json_data in rows:
+                yield tuple(json.loads(pkeys)[num_pkeys:]), json.loads(json_data)
+            if len(rows) < batch_size:
+                return
+            # Continue from the last primary key, in case documents were removed meanwhile
+            after = rows[-1][0]
+
+    def declare_index(self, identifier_data: IdentifierData, field: str) -> None:
+        key = (identifier_data.cog_name, identifier_data.uuid, identifier_data.category)
+        self._declared_indexes.setdefault(key, set()).add(field)
+
+    async def find(self, identifier_data: IdentifierData, criteria: Dict[str, Any]):
+        key = (identifier_data.cog_name, identifier_data.uuid, identifier_data.category)
+        declared = self._declared_indexes.get(key, ())
+        # Fields with double quotes can't be put in a JSON path
+        field = next((f for f in criteria if f in declared and '"' not in f), None)
+        if field is None:
+            return await super().find(identifier_data, criteria)
+        if field not in self._indexed_fields:
+            await self._run(self._create_field_index, field)
+            self._indexed_fields.add(field)
+        return await self._run(self._find, identifier_data, field, criteria)
+
+    async def set(self, identifier_data: IdentifierData, value=None):
+        await self._run(self._apply_batch, [("set", identifier_data, value)])
+
+    async def set_expiry(self, identifier_data: IdentifierData, expires_at: Optional[float]):
+        await self._run(self._apply_batch, [("set_expiry", identifier_data, expires_at)])
+
+    @classmethod
+    async def pop_expired(cls, now: float) -> List[IdentifierData]:
+        return await cls._run(cls._pop_expired, now)
+
+    async def clear(self, identifier_data: IdentifierData):
+        await self._run(self._apply_batch, [("clear", identifier_data, None)])
+
+    async def apply_batch(self, operations):
+        await self._run(self._apply_batch, operations)
+
+    async def inc(
+        self, identifier_data: IdentifierData, value: Union[int, float], default: Union[int, float]
+    ) -> Union[int, float]:
+        return await self._run(
+            self._update_value,
+            identifier_data,
+            lambda existing_value: _get_incremented(existing_value, value, default),
+        )
+
+    async def toggle(self, identifier_data: IdentifierData, default: bool) -> bool:
+        return await self._run(
+            self._update_value,
+            identifier_data,
+            lambda existing_value: _get_toggled(existing_value, default),
+        )
+
+    @classmethod
+    async def aiter_cogs(cls) -> AsyncIterator[Tuple[str, str]]:
+        def fetch_cogs():
+            with cls._conn.with_cursor() as cursor:
+                return list(cursor.execute(COGS_FETCH_ALL))
+
+        for cog_name, cog_id in await cls._run(fetch_cogs):
+            yield cog_name, cog_id
+
+    async def import_data(self, cog_data, custom_group_data):
+        def import_documents():
+            with self._conn.transaction() as cursor:
+                for category, all_data in cog_data:
+                    splitted_pkey = self._split_primary_key(category, custom_group_data, all_data)
+                    cursor.executemany(
+                        DOCUMENT_UPSERT,
+                        (
+                            (
+                                self.cog_name,
+                                self.unique_cog_identifier,
+                                category,
+                                _encode_pkeys(pkey),
+                                json.dumps(data),
+                            )
+                            for pkey, data in splitted_pkey
+                        ),
+                    )
+
+        await self._run(import_documents)
+
+    @classmethod
+    async def delete_all_data(cls, **kwargs) -> None:
+        """Delete all data being stored by this driver.
+
+        The database file itself is kept.
+
+        """
+        with cls._conn.with_cursor() as cursor:
+            await cls._run(cursor.execute, DELETE_ALL)
+            await cls._run(cursor.execute, DELETE_ALL_EXPIRIES)
@@ -1,16 +1,61 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Union, Set, Iterable, Tuple, overload
+from typing import Any, Dict, List, Optional, Union, Set, Iterable, Tuple, overload
 import asyncio
 from argparse import Namespace
 from collections import defaultdict
 
 import discord
 
+from ._drivers import ConfigCategory, IdentifierData
 from .config import Config
 from .utils import AsyncIter
 
 
+def _affects(identifier_data: IdentifierData, *names: str) -> bool:
+    """Whether a write to the given path may have changed any of the named attributes."""
+    return not identifier_data.identifiers or identifier_data.identifiers[0] in names
+
+
+def _guild_id(identifier_data: IdentifierData) -> Optional[int]:
+    """Get the ID of the guild written to, or None if the write was to all guilds."""
+    return int(identifier_data.primary_key[0]) if identifier_data.primary_key else None
+
+
+class PrefixMatcher:
+    """Finds which of a list of prefixes some text starts with, using a trie.
+
+    As with discord.py's own matching, the first prefix in the list which
+    matches wins. Text whose first character can't start any of the prefixes
+    is rejected after a single dict lookup.
+    """
+
+    __slots__ = ("prefixes", "_root")
+
+    def __init__(self, prefixes: Iterable[str]) -> None:
+        self.prefixes: Tuple[str, ...] = tuple(prefixes)
+        # Each node maps characters to child nodes, and None to the index of the prefix ending there
+        self._root: Dict[Optional[str], Any] = {}
+        for idx, prefix in enumerate(self.prefixes):
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, idx)
+
+    def match(self, text: str) -> Optional[str]:
+        """Get the prefix which the text starts with, or None if there's none."""
+        node = self._root
+        best = node.get(None)
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            idx = node.get(None)
+            if idx is not None and (best is None or idx < best):
+                best = idx
+        return None if best is None else self.prefixes[best]
+
+
 class PrefixManager:
     def __init__(self, config: Config, cli_flags: Namespace):
         self._config: Config = config
@@ -18,6 +63,8 @@ class PrefixManager:
             sorted(cli_flags.prefix, reverse=True) or None
         )
         self._cached: Dict[Optional[int], List[str]] = {}
+        # Maps guild IDs to their matchers, along with the extra prefixes they were built with
+        self._matchers: Dict[Optional[int], Tuple[Tuple[str, ...], PrefixMatcher]] = {}
 
     async def get_prefixes(self, guild: Optional[discord.Guild] = None) -> List[str]:
         ret: List[str]
@@ -38,6 +85,18 @@ class PrefixManager:
 
         return ret
 
+    async def get_matcher(
+        self, guild: Optional[discord.Guild] = None, extra_prefixes: Tuple[str, ...] = ()
+    ) -> PrefixMatcher:
+        """Get a matcher for the guild's prefixes, preceded by ``extra_prefixes``."""
+        gid: Optional[int] = guild.id if guild else None
+        cached = self._matchers.get(gid)
+        if cached is not None and cached[0] == extra_prefixes:
+            return cached[1]
+        matcher = PrefixMatcher((*extra_prefixes, *await self.get_prefixes(guild)))
+        self._matchers[gid] = (extra_prefixes, matcher)
+        return matcher
+
     async def set_prefixes(
         self, guild: Optional[discord.Guild] = None, prefixes: Optional[List[str]] = None
     ):
@@ -54,11 +113,26 @@ class PrefixManager:
             if not prefixes:
                 raise ValueError("You must have at least one prefix.")
             self._cached.clear()
+            self._matchers.clear()
             await self._config.prefix.set(prefixes)
         else:
             self._cached.pop(gid, None)
+            self._matchers.pop(gid, None)
             await self._config.guild_from_id(gid).prefix.set(prefixes)
 
+    def invalidate(self, identifier_data: IdentifierData) -> None:
+        """Drop the cached prefixes affected by a config write made elsewhere."""
+        if not _affects(identifier_data, "prefix"):
+            return
+        gid = _guild_id(identifier_data)
+        if identifier_data.category == ConfigCategory.GUILD and gid is not None:
+            self._cached.pop(gid, None)
+            self._matchers.pop(gid, None)
+        elif identifier_data.category in (ConfigCategory.GLOBAL, ConfigCategory.GUILD, ""):
+            # Guilds without prefixes use the global ones
+            self._cached.clear()
+            self._matchers.clear()
+
 
 class I18nManager:
     def __init__(self, config: Config):
@@ -146,6 +220,28 @@ class I18nManager:
         self._guild_regional_format[guild.id] = regional_format
         await self._config.guild(guild).regional_format.set(regional_format)
 
+    def invalidate(self, identifier_data: IdentifierData) -> None:
+        """Drop the cached locales affected by a config write made elsewhere."""
+        if identifier_data.category in (ConfigCategory.GLOBAL, ""):
+            keys = [None]
+        elif identifier_data.category == ConfigCategory.GUILD:
+            gid = _guild_id(identifier_data)
+            keys = [gid] if gid is not None else None
+        else:
+            return
+        for name, cache in (
+            ("locale", self._guild_locale),
+            ("regional_format", self._guild_regional_format),
+        ):
+            if not _affects(identifier_data, name):
+                continue
+            if keys is None:
+                for key in [k for k in cache if k is not None]:
+                    del cache[key]
+            else:
+                for key in keys:
+                    cache.pop(key, None)
+
 
 class IgnoreManager:
     def __init__(self, config: Config):
@@ -227,6 +323,26 @@ class IgnoreManager:
         else:
             await self._config.guild_from_id(gid).ignored.clear()
 
+    def invalidate(self, identifier_data: IdentifierData) -> None:
+        """Drop the cached settings affected by a config write made elsewhere."""
+        if identifier_data.category == ConfigCategory.CHANNEL:
+            cache = self._cached_channels
+        elif identifier_data.category == ConfigCategory.GUILD:
+            cache = self._cached_guilds
+        elif identifier_data.category == "":
+            self._cached_channels.clear()
+            self._cached_guilds.clear()
+            return
+        else:
+            return
+        if not _affects(identifier_data, "ignored"):
+            return
+        object_id = _guild_id(identifier_data)
+        if object_id is None:
+            cache.clear()
+        else:
+            cache.pop(object_id, None)
+
 
 class WhitelistBlacklistManager:
     def __init__(self, config: Config):
@@ -411,6 +527,28 @@ class WhitelistBlacklistManager:
                     list(self._cached_blacklist[gid])
                 )
 
+    def invalidate(self, identifier_data: IdentifierData) -> None:
+        """Drop the cached lists affected by a config write made elsewhere."""
+        if identifier_data.category in (ConfigCategory.GLOBAL, ""):
+            gid = None
+        elif identifier_data.category == ConfigCategory.GUILD:
+            gid = _guild_id(identifier_data)
+        else:
+            return
+        for name, cache in (
+            ("whitelist", self._cached_whitelist),
+            ("blacklist", self._cached_blacklist),
+        ):
+            if not _affects(identifier_data, name):
+                continue
+            if identifier_data.category == "":
+                cache.clear()
+            elif identifier_data.category == ConfigCategory.GUILD and gid is None:
+                for key in [k for k in cache if k is not None]:
+                    del cache[key]
+            else:
+                cache.pop(gid, None)
+
 
 class DisabledCogCache:
     def __init__(self, config: Config):
@@ -515,3 +653,18 @@ class DisabledCogCache:
         self._disable_map[cog_name][guild_id] = False
         await self._config.custom("COG_DISABLE_SETTINGS", cog_name, guild_id).disabled.set(False)
         return True
+
+    def invalidate(self, identifier_data: IdentifierData) -> None:
+        """Drop the cached settings affected by a config write made elsewhere."""
+        if identifier_data.category not in ("COG_DISABLE_SETTINGS", ""):
+            return
+        if not _affects(identifier_data, "disabled"):
+            return
+        pkeys = identifier_data.primary_key
+        if len(pkeys) == 2 and pkeys[1] != "0":
+            self._disable_map[pkeys[0]].pop(int(pkeys[1]), None)
+        elif pkeys:
+            # The cog's default changed, which applies to every guild
+            self._disable_map.pop(pkeys[0], None)
+        else:
+            self._disable_map.clear()
@@ -11,6 +11,7 @@ import discord
 from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import humanize_number
 from . import Config, errors, commands
+from .config import Group
 from .i18n import Translator
 
 from .errors import BankPruneError
@@ -144,9 +145,8 @@ async def _process_data_deletion(
 
     async with _data_deletion_lock:
         await _config.user_from_id(user_id).clear()
-        all_members = await _config.all_members()
-        async for guild_id, member_dict in AsyncIter(all_members.items(), steps=100):
-            if user_id in member_dict:
+        async for guild_id, member_id, __ in _config.iter_all_members(batch_size=100):
+            if member_id == user_id:
                 await _config.member_from_ids(guild_id, user_id).clear()
 
 
@@ -336,16 +336,21 @@ async def set_balance(member: Union[discord.Member, discord.User], amount: int)
         group = _config.user(member)
     else:
         group = _config.member(member)
-    await group.balance.set(amount)
+    async with group.batch():
+        await group.balance.set(amount)
+        await _fill_account_details(group, member)
 
-    if await group.created_at() == 0:
-        time = _encoded_current_time()
-        await group.created_at.set(time)
+    return amount
 
-    if await group.name() == "":
-        await group.name.set(member.display_name)
 
-    return amount
+async def _fill_account_details(group: Group, member: Union[discord.Member, discord.User]) -> None:
+    async with group.batch():
+        if await group.created_at() == 0:
+            time = _encoded_current_time()
+            await group.created_at.set(time)
+
+        if await group.name() == "":
+            await group.name.set(member.display_name)
 
 
 def _invalid_amount(amount: int) -> bool:
@@ -429,8 +434,23 @@ async def deposit_credits(member: discord.Member, amount: int) -> int:
             )
         )
 
-    bal = await get_balance(member)
-    return await set_balance(member, amount + bal)
+    guild = getattr(member, "guild", None)
+    max_bal = await get_max_balance(guild)
+    if await is_global():
+        group = _config.user(member)
+    else:
+        group = _config.member(member)
+    # The lock makes concurrent deposits check the maximum balance one at a time, and
+    # incrementing keeps them from overwriting writes made without it, e.g. withdrawals.
+    async with group.balance.get_lock():
+        if await get_balance(member) + amount > max_bal:
+            currency = await get_currency_name(guild)
+            raise errors.BalanceTooHigh(
+                user=member.display_name, max_balance=max_bal, currency_name=currency
+            )
+        new_bal = await group.balance.inc(amount, default=await get_default_balance(guild))
+    await _fill_account_details(group, member)
+    return new_bal
 
 
 async def transfer_credits(
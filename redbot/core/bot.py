@@ -6,7 +6,9 @@ import os
 import platform
 import shutil
 import sys
+import time
 import contextlib
+import copy
 import weakref
 import functools
 from collections import namedtuple, OrderedDict
@@ -36,6 +38,7 @@ from types import MappingProxyType
 import discord
 from discord.ext import commands as dpy_commands
 from discord.ext.commands import when_mentioned_or
+from discord.ext.commands.view import StringView
 
 from . import Config, i18n, app_commands, commands, errors, _drivers, modlog, bank
 from ._cli import ExitCodes
@@ -68,6 +71,10 @@ _T = TypeVar("_T")
 CUSTOM_GROUPS = "CUSTOM_GROUPS"
 COMMAND_SCOPE = "COMMAND"
 SHARED_API_TOKENS = "SHARED_API_TOKENS"
+# How often to check for expired config values, in seconds.
+CONFIG_EXPIRY_INTERVAL = 2
+# The number of message contexts kept for get_cached_context()
+MAX_CACHED_CONTEXTS = 100
 
 log = logging.getLogger("red")
 
@@ -202,6 +209,7 @@ class Red(
 
         if "command_prefix" not in kwargs:
             kwargs["command_prefix"] = prefix_manager
+        self._red_prefix_manager = prefix_manager
 
         if "owner_id" in kwargs:
             raise RuntimeError("Red doesn't accept owner_id kwarg, use owner_ids instead.")
@@ -249,6 +257,9 @@ class Red(
         self._red_before_invoke_objs: Set[PreInvokeCoroutine] = set()
 
         self._deletion_requests: MutableMapping[int, asyncio.Lock] = weakref.WeakValueDictionary()
+        # Contexts of the latest messages, for listeners to reuse. See `get_cached_context()`.
+        self._context_cache: "OrderedDict[int, commands.Context]" = OrderedDict()
+        self._config_expiry_task: Optional[asyncio.Task] = None
 
     def set_help_formatter(self, formatter: commands.help.HelpFormatterABC):
         """
@@ -1128,6 +1139,7 @@ class Red(
         await super()._pre_login()
 
         await self._maybe_update_config()
+        await self._listen_for_settings_changes()
         self.description = await self._config.description()
         self._color = discord.Colour(await self._config.color())
 
@@ -1144,6 +1156,32 @@ class Red(
         i18n_regional_format = await self._config.regional_format()
         i18n.set_regional_format(i18n_regional_format)
 
+    async def _listen_for_settings_changes(self) -> None:
+        """
+        Keep the settings caches up to date with changes made by other processes
+        sharing this instance's backend, if the driver supports it.
+        """
+        driver = self._config._driver
+        for category, caches in (
+            (
+                _drivers.ConfigCategory.GLOBAL,
+                (self._prefix_cache, self._i18n_cache, self._whiteblacklist_cache),
+            ),
+            (
+                _drivers.ConfigCategory.GUILD,
+                (
+                    self._prefix_cache,
+                    self._i18n_cache,
+                    self._ignored_cache,
+                    self._whiteblacklist_cache,
+                ),
+            ),
+            (_drivers.ConfigCategory.CHANNEL, (self._ignored_cache,)),
+            ("COG_DISABLE_SETTINGS", (self._disabled_cog_cache,)),
+        ):
+            for cache in caches:
+                await driver.add_invalidation_listener(category, cache.invalidate)
+
     async def _pre_connect(self) -> None:
         """
         This should only be run once, prior to connecting to Discord gateway.
@@ -1254,6 +1292,30 @@ class Red(
         if self.rpc_enabled:
             await self.rpc.initialize(self.rpc_port)
 
+        # Started after loading packages, so that their listeners see the first expiries
+        self._config_expiry_task = asyncio.create_task(self._expire_config_values())
+
+    async def _expire_config_values(self) -> None:
+        """
+        Clear config values as they expire, dispatching ``red_config_expired`` for each.
+        """
+        driver_cls = type(self._config._driver)
+        while True:
+            try:
+                expired = await driver_cls.pop_expired(time.time())
+                for identifier_data in expired:
+                    driver = _drivers.get_driver(identifier_data.cog_name, identifier_data.uuid)
+                    try:
+                        value = await driver.get(identifier_data)
+                    except KeyError:
+                        # Already cleared
+                        continue
+                    await driver.clear(identifier_data)
+                    self.dispatch("red_config_expired", identifier_data, value)
+            except Exception:
+                log.exception("Failed to clear expired config values.")
+            await asyncio.sleep(CONFIG_EXPIRY_INTERVAL)
+
     def _setup_owners(self) -> None:
         if self.application.team:
             if self._use_team_features:
@@ -1614,6 +1676,62 @@ class Red(
     async def get_context(self, message, /, *, cls=commands.Context):
         return await super().get_context(message, cls=cls)
 
+    async def get_cached_context(self, message: discord.Message, /) -> commands.Context:
+        """
+        Get the context for a message, reusing the one made when its commands were processed.
+
+        This is meant for ``on_message_without_command`` listeners, so that each of them
+        doesn't resolve the message's prefix and command again with `get_context`.
+        Only the contexts of the latest messages are kept.
+
+        Parameters
+        ----------
+        message : discord.Message
+            The message to get the context for.
+
+        Returns
+        -------
+        commands.Context
+            A copy of the context, which the caller is free to modify,
+            e.g. by setting the command to invoke with it.
+        """
+        ctx = self._context_cache.get(message.id)
+        # A copy of the message (e.g. made by Alias) has the same ID, but is a different object
+        if ctx is None or ctx.message is not message:
+            if await self._may_be_command(message):
+                ctx = await self.get_context(message)
+            else:
+                # This is what get_context() makes when no prefix matches
+                ctx = commands.Context(
+                    prefix=None, view=StringView(message.content), bot=self, message=message
+                )
+            self._cache_context(ctx)
+        new_ctx = copy.copy(ctx)
+        new_ctx.view = copy.copy(ctx.view)
+        new_ctx.args = ctx.args.copy()
+        new_ctx.kwargs = ctx.kwargs.copy()
+        new_ctx.invoked_parents = ctx.invoked_parents.copy()
+        return new_ctx
+
+    def _cache_context(self, ctx: commands.Context) -> None:
+        self._context_cache[ctx.message.id] = ctx
+        self._context_cache.move_to_end(ctx.message.id)
+        while len(self._context_cache) > MAX_CACHED_CONTEXTS:
+            self._context_cache.popitem(last=False)
+
+    async def _may_be_command(self, message: discord.Message) -> bool:
+        """Whether the message starts with any of its prefixes, or with a mention of the bot.
+
+        Messages for which this is False can't be commands, so they're
+        rejected without building a Context for them.
+        """
+        if self.command_prefix is not self._red_prefix_manager:
+            return True
+        # Mentions always go into the matcher, since licenseinfo must work with them
+        mentions = (f"<@{self.user.id}> ", f"<@!{self.user.id}> ")
+        matcher = await self._prefix_cache.get_matcher(message.guild, mentions)
+        return matcher.match(message.content) is not None
+
     async def process_commands(self, message: discord.Message, /):
         """
         Same as base method, but dispatches an additional event for cogs
@@ -1621,7 +1739,7 @@ class Red(
         messages,  without the overhead of additional get_context calls
         per cog.
         """
-        if not message.author.bot:
+        if not message.author.bot and await self._may_be_command(message):
             ctx = await self.get_context(message)
 
             # The licenseinfo command must always be available, even in a slash only bot.
@@ -1655,6 +1773,9 @@ class Red(
             ctx = None
 
         if ctx is None or ctx.valid is False:
+            if ctx is not None:
+                # Listeners can reuse it with get_cached_context()
+                self._cache_context(ctx)
             self.dispatch("message_without_command", message)
 
     @staticmethod
@@ -2176,6 +2297,8 @@ class Red(
     async def close(self):
         """Logs out of Discord and closes all connections."""
         await super().close()
+        if self._config_expiry_task is not None:
+            self._config_expiry_task.cancel()
         await _drivers.get_driver_class().teardown()
         try:
             if self.rpc_enabled:
@@ -1,17 +1,25 @@
 import asyncio
 import collections.abc
+import contextvars
+import datetime
 import json
 import logging
 import pickle
+import time
 import weakref
 from typing import (
     Any,
     AsyncContextManager,
+    AsyncIterator,
     Awaitable,
     Dict,
     Generator,
+    Iterable,
+    List,
     MutableMapping,
     Optional,
+    Set,
+    TextIO,
     Tuple,
     Type,
     TypeVar,
@@ -20,7 +28,9 @@ from typing import (
 
 import discord
 
+from . import _config_stats
 from ._drivers import BaseDriver, ConfigCategory, IdentifierData, get_driver
+from ._drivers.base import _strictly_equal
 
 __all__ = (
     "ConfigCategory",
@@ -36,6 +46,15 @@ _T = TypeVar("_T")
 
 _config_cache = weakref.WeakValueDictionary()
 _retrieved = weakref.WeakSet()
+# Maps each Config with an open batch to the operations buffered for it.
+_batches: contextvars.ContextVar[
+    Optional[Dict["Config", "_BatchOperations"]]
+] = contextvars.ContextVar("red_config_batches", default=None)
+
+# Limits on the number of base groups cached per Config, and children cached per Group,
+# so that accessors like config.guild(guild).prefix don't allocate new objects every time.
+_MAX_CACHED_GROUPS = 1024
+_MAX_CACHED_CHILDREN = 64
 
 
 class ConfigMeta(type):
@@ -102,7 +121,15 @@ class _ValueCtxManager(Awaitable[_T], AsyncContextManager[_T]):  # pylint: disab
 
     async def __aenter__(self) -> _T:
         if self.__acquire_lock is True:
-            await self.__lock.acquire()
+            collector = _config_stats.collector
+            if collector is None:
+                await self.__lock.acquire()
+            else:
+                start = time.perf_counter()
+                await self.__lock.acquire()
+                collector.record_lock_wait(
+                    self.value_obj.identifier_data, time.perf_counter() - start
+                )
         self.raw_value = await self
         if not isinstance(self.raw_value, (list, dict)):
             raise TypeError(
@@ -121,11 +148,65 @@ class _ValueCtxManager(Awaitable[_T], AsyncContextManager[_T]):  # pylint: disab
                 raw_value = self.raw_value
             if raw_value != self.__original_value:
                 await self.value_obj.set(self.raw_value)
+                if self.__acquire_lock is True:
+                    # Others can only see the change once the lock is released
+                    await self.value_obj._config._commit_batch()
         finally:
             if self.__acquire_lock is True:
                 self.__lock.release()
 
 
+class _BatchOperations(List[Tuple[str, IdentifierData, Any]]):
+    """The operations buffered by a batch.
+
+    Tasks created within a batch inherit its context, so they can still see
+    it after it has exited. It's marked as closed then, so that their writes
+    are made directly instead of being buffered and never committed.
+    """
+
+    closed = False
+
+
+def _get_open_batch(config: "Config") -> Optional[_BatchOperations]:
+    batches = _batches.get()
+    if batches is None:
+        return None
+    operations = batches.get(config)
+    if operations is None or operations.closed:
+        return None
+    return operations
+
+
+class _BatchCtxManager(AsyncContextManager[None]):
+    """Context manager implementation of `Config.transaction`.
+
+    Sets and clears made through the config within this context manager
+    are buffered, then committed with a single call to the driver's
+    ``apply_batch()`` on exit. If the context manager exits with an
+    exception, the buffered writes are discarded.
+
+    Nested batches for the same config join the outermost one.
+    """
+
+    def __init__(self, config: "Config"):
+        self.config = config
+        self.__token = None
+
+    async def __aenter__(self) -> None:
+        if _get_open_batch(self.config) is None:
+            batches = _batches.get() or {}
+            self.__token = _batches.set({**batches, self.config: _BatchOperations()})
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.__token is None:
+            return
+        operations = _batches.get()[self.config]
+        operations.closed = True
+        _batches.reset(self.__token)
+        if exc_type is None and operations:
+            await _timed_batch(self.config._driver, operations)
+
+
 class Value:
     """A singular "value" of data.
 
@@ -141,6 +222,8 @@ class Value:
 
     """
 
+    __slots__ = ("identifier_data", "default", "_driver", "_config")
+
     def __init__(self, identifier_data: IdentifierData, default_value, driver, config: "Config"):
         self.identifier_data = identifier_data
         self.default = default_value
@@ -182,10 +265,10 @@ class Value:
 
     async def _get(self, default=...):
         try:
-            ret = await self._driver.get(self.identifier_data)
+            ret = await _get_view(self._driver, self.identifier_data)
         except KeyError:
-            return default if default is not ... else self.default
-        return ret
+            return default if default is not ... else _copy_value(self.default)
+        return _copy_value(ret)
 
     def __call__(self, default=..., *, acquire_lock: bool = True) -> _ValueCtxManager[Any]:
         """Get the literal value of this data element.
@@ -242,7 +325,7 @@ class Value:
         """
         return _ValueCtxManager(self, self._get(default), acquire_lock=acquire_lock)
 
-    async def set(self, value):
+    async def set(self, value, *, expires_at: Optional[datetime.datetime] = ...):
         """Set the value of the data elements pointed to by `identifiers`.
 
         Example
@@ -255,21 +338,141 @@ class Value:
             # Sets guild specific value of "bar" to True
             await config.guild(some_guild).bar.set(True)
 
+            # Sets member specific value of "muted_until", and clears it once that time comes
+            await config.member(member).muted_until.set(until.timestamp(), expires_at=until)
+
+        When a value expires, it is cleared and the bot dispatches the
+        ``red_config_expired`` event with its `IdentifierData` and old value,
+        so cogs don't need to poll their data for expired entries. Values
+        are checked for expiry every few seconds.
+
         Parameters
         ----------
         value
             The new literal value of this attribute.
 
+        Keyword Arguments
+        -----------------
+        expires_at : Optional[datetime.datetime]
+            The time at which to clear the value, or ``None`` to remove an
+            earlier expiry. If not given, any earlier expiry is kept,
+            even though the value is replaced. Naive datetimes are assumed
+            to be in UTC. Within `Config.transaction`, the expiry is only
+            set if the transaction is committed.
+
+        Raises
+        ------
+        NotImplementedError
+            If ``expires_at`` is given and the storage backend doesn't
+            support expiring values.
+
         """
         if isinstance(value, dict):
             value = _str_key_dict(value)
-        await self._driver.set(self.identifier_data, value=value)
+        await self._config._set(self.identifier_data, value)
+        if expires_at is not ...:
+            if expires_at is not None:
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=datetime.timezone.utc)
+                expires_at = expires_at.timestamp()
+            await self._config._set_expiry(self.identifier_data, expires_at)
 
     async def clear(self):
         """
         Clears the value from record for the data element pointed to by `identifiers`.
         """
-        await self._driver.clear(self.identifier_data)
+        await self._config._clear(self.identifier_data)
+
+    async def inc(
+        self, delta: Union[int, float] = 1, *, default: Union[int, float] = ...
+    ) -> Union[int, float]:
+        """Atomically increment this value.
+
+        Unlike getting the value and setting it again, this doesn't need
+        the value's lock, and only takes a single call to the driver.
+
+        Example
+        -------
+        ::
+
+            # Adds one to the member's message count and gets the new count
+            count = await config.member(member).message_count.inc()
+
+        Note
+        ----
+        This is applied straight away, even within `Config.transaction`.
+        Any writes buffered before it are committed first.
+
+        Parameters
+        ----------
+        delta : Union[int, float]
+            The amount to increment by. Defaults to 1.
+        default : Union[int, float], optional
+            The value to increment if none is stored. Defaults to the
+            registered default.
+
+        Returns
+        -------
+        Union[int, float]
+            The new value.
+
+        Raises
+        ------
+        TypeError
+            If ``delta`` isn't a number.
+        errors.StoredTypeError
+            If the stored value isn't a number.
+
+        """
+        if not isinstance(delta, (int, float)) or isinstance(delta, bool):
+            raise TypeError(f"Increment must be a number, not {type(delta).__name__}.")
+        if default is ...:
+            default = 0 if self.default is None else self.default
+        await self._config._commit_batch()
+        return await _timed(
+            "inc", self.identifier_data, self._driver.inc(self.identifier_data, delta, default)
+        )
+
+    async def toggle(self, *, default: bool = ...) -> bool:
+        """Atomically toggle this value.
+
+        Unlike getting the value and setting it again, this doesn't need
+        the value's lock, and only takes a single call to the driver.
+
+        Example
+        -------
+        ::
+
+            enabled = await config.guild(guild).enabled.toggle()
+
+        Note
+        ----
+        This is applied straight away, even within `Config.transaction`.
+        Any writes buffered before it are committed first.
+
+        Parameters
+        ----------
+        default : bool, optional
+            The value to toggle if none is stored. Defaults to the
+            registered default.
+
+        Returns
+        -------
+        bool
+            The new value.
+
+        Raises
+        ------
+        errors.StoredTypeError
+            If the stored value isn't a boolean.
+
+        """
+        if default is ...:
+            default = bool(self.default)
+        await self._config._commit_batch()
+        return await _timed(
+            "toggle", self.identifier_data, self._driver.toggle(self.identifier_data, default)
+        )
 
 
 class Group(Value):
@@ -291,6 +494,8 @@ class Group(Value):
 
     """
 
+    __slots__ = ("_defaults", "force_registration", "_children", "_children_generation")
+
     def __init__(
         self,
         identifier_data: IdentifierData,
@@ -302,6 +507,9 @@ class Group(Value):
         self._defaults = defaults
         self.force_registration = force_registration
         self._driver = driver
+        # Child accessors, which are dropped when defaults are registered
+        self._children: Dict[str, Value] = {}
+        self._children_generation = config._defaults_generation
 
         super().__init__(identifier_data, {}, self._driver, config)
 
@@ -310,12 +518,14 @@ class Group(Value):
         return pickle.loads(pickle.dumps(self._defaults, -1))
 
     async def _get(self, default: Dict[str, Any] = ...) -> Dict[str, Any]:
-        default = default if default is not ... else self.defaults
-        raw = await super()._get(default)
+        try:
+            raw = await _get_view(self._driver, self.identifier_data)
+        except KeyError:
+            return default if default is not ... else _copy_value(self._defaults)
         if isinstance(raw, dict):
-            return self.nested_update(raw, default)
+            return _overlay_defaults(raw, default if default is not ... else self._defaults)
         else:
-            return raw
+            return _copy_value(raw)
 
     # noinspection PyTypeChecker
     def __getattr__(self, item: str) -> Union["Group", Value]:
@@ -342,11 +552,20 @@ class Group(Value):
             is set to :code:`True`.
 
         """
+        children = self._children
+        if self._children_generation != self._config._defaults_generation:
+            children.clear()
+            self._children_generation = self._config._defaults_generation
+        try:
+            return children[item]
+        except KeyError:
+            pass
+
         is_group = self.is_group(item)
         is_value = not is_group and self.is_value(item)
         new_identifiers = self.identifier_data.get_child(item)
         if is_group:
-            return Group(
+            child = Group(
                 identifier_data=new_identifiers,
                 defaults=self._defaults[item],
                 driver=self._driver,
@@ -354,7 +573,7 @@ class Group(Value):
                 config=self._config,
             )
         elif is_value:
-            return Value(
+            child = Value(
                 identifier_data=new_identifiers,
                 default_value=self._defaults[item],
                 driver=self._driver,
@@ -363,13 +582,18 @@ class Group(Value):
         elif self.force_registration:
             raise AttributeError("'{}' is not a valid registered Group or value.".format(item))
         else:
-            return Value(
+            child = Value(
                 identifier_data=new_identifiers,
                 default_value=None,
                 driver=self._driver,
                 config=self._config,
             )
 
+        if len(children) >= _MAX_CACHED_CHILDREN:
+            del children[next(iter(children))]
+        children[item] = child
+        return child
+
     async def clear_raw(self, *nested_path: Any):
         """
         Allows a developer to clear data as if it was stored in a standard
@@ -392,7 +616,7 @@ class Group(Value):
         """
         path = tuple(str(p) for p in nested_path)
         identifier_data = self.identifier_data.get_child(*path)
-        await self._driver.clear(identifier_data)
+        await self._config._clear(identifier_data)
 
     def is_group(self, item: Any) -> bool:
         """A helper method for `__getattr__`. Most developers will have no need
@@ -499,27 +723,71 @@ class Group(Value):
         """
         path = tuple(str(p) for p in nested_path)
 
+        registered_default = ...
         if default is ...:
-            poss_default = self.defaults
+            poss_default = self._defaults
             for ident in path:
                 try:
                     poss_default = poss_default[ident]
                 except KeyError:
                     break
             else:
-                default = poss_default
+                default = registered_default = poss_default
 
         identifier_data = self.identifier_data.get_child(*path)
         try:
-            raw = await self._driver.get(identifier_data)
+            raw = await _get_view(self._driver, identifier_data)
         except KeyError:
-            if default is not ...:
+            if registered_default is not ...:
+                # The registered defaults are shared, so they must be copied
+                return _copy_value(registered_default)
+            elif default is not ...:
                 return default
             raise
         else:
-            if isinstance(default, dict):
-                return self.nested_update(raw, default)
-            return raw
+            if isinstance(default, dict) and isinstance(raw, dict):
+                return _overlay_defaults(raw, default)
+            return _copy_value(raw)
+
+    async def get_fields(self, *names: str) -> Dict[str, Any]:
+        """Get some of this group's attributes in a single read.
+
+        Unlike `Group.all`, only the requested attributes are fetched from
+        the driver, which saves transferring and decoding the whole
+        document when only a few of its attributes are needed.
+
+        Example
+        -------
+        ::
+
+            data = await config.member(member).get_fields("count", "next_reset")
+            count = data["count"]
+
+        Note
+        ----
+        The return value of this method will include registered defaults
+        for the requested attributes which have not yet been set.
+        Attributes which are neither set nor registered are left out.
+
+        Parameters
+        ----------
+        *names : str
+            The names of the attributes to get.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The requested attributes, resolved as raw data values.
+
+        """
+        defaults = {name: self._defaults[name] for name in names if name in self._defaults}
+        data = await _timed(
+            "get_fields",
+            self.identifier_data,
+            self._driver.get_fields(self.identifier_data, names),
+            read=True,
+        )
+        return _overlay_defaults(data, defaults)
 
     def all(self, *, acquire_lock: bool = True) -> _ValueCtxManager[Dict[str, Any]]:
         """Get a dictionary representation of this group's data.
@@ -546,6 +814,92 @@ class Group(Value):
         """
         return self(acquire_lock=acquire_lock)
 
+    async def find(self, **fields: Any) -> Dict[str, Any]:
+        """Find the entries of this custom group with the given attribute values.
+
+        At least one of the attributes must have been indexed with the
+        ``index_on`` argument to `Config.init_custom`, so that only the
+        entries with its value need to be read. Values are compared as
+        JSON.
+
+        Example
+        -------
+        ::
+
+            config.init_custom("CASES", 2, index_on=("user",))
+            ...
+            cases = await config.custom("CASES", guild.id).find(user=member.id)
+
+        Note
+        ----
+        Like `all`, the return value of this method does not include
+        registered defaults, so entries only match attributes which
+        have been set.
+
+        Parameters
+        ----------
+        **fields
+            The attributes to match, and the values they must have.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The matching entries, nested by the identifiers which this
+            group doesn't specify, in the same form as `all`.
+
+        Raises
+        ------
+        ValueError
+            If this group isn't part of a custom group above the level of
+            individual entries, or none of the attributes are indexed.
+
+        """
+        identifier_data = self.identifier_data
+        if (
+            not identifier_data.is_custom
+            or identifier_data.identifiers
+            or len(identifier_data.primary_key) >= identifier_data.primary_key_len
+        ):
+            raise ValueError("Only groups of entries in a custom group can be searched.")
+        indexes = self._config._custom_indexes.get(identifier_data.category, ())
+        if not any(field in indexes for field in fields):
+            raise ValueError(
+                f"At least one of the attributes must be indexed: {', '.join(fields)}"
+            )
+
+        return await _timed("find", identifier_data, self._find(fields), read=True)
+
+    async def _find(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        ret = {}
+        for pkeys, document in (await self._driver.find(self.identifier_data, fields)).items():
+            *parent_pkeys, last_pkey = pkeys
+            partial = ret
+            for pkey in parent_pkeys:
+                partial = partial.setdefault(pkey, {})
+            partial[last_pkey] = document
+        return ret
+
+    def batch(self) -> _BatchCtxManager:
+        """Batch writes made through this group's config into a single driver call.
+
+        Equivalent to `Config.transaction`.
+
+        Example
+        -------
+        ::
+
+            group = config.member(member)
+            async with group.batch():
+                await group.balance.set(100)
+                await group.created_at.set(now)
+
+        Returns
+        -------
+        `async context manager`
+
+        """
+        return self._config.transaction()
+
     def nested_update(
         self, current: collections.abc.Mapping, defaults: Dict[str, Any] = ...
     ) -> Dict[str, Any]:
@@ -562,13 +916,13 @@ class Group(Value):
                 result = self.nested_update(value, defaults.get(key, {}))
                 defaults[key] = result
             else:
-                defaults[key] = pickle.loads(pickle.dumps(current[key], -1))
+                defaults[key] = _copy_value(value)
         return defaults
 
-    async def set(self, value):
+    async def set(self, value, *, expires_at: Optional[datetime.datetime] = ...):
         if not isinstance(value, dict):
             raise ValueError("You may only set the value of a group to be a dict.")
-        await super().set(value)
+        await super().set(value, expires_at=expires_at)
 
     async def set_raw(self, *nested_path: Any, value):
         """
@@ -596,7 +950,7 @@ class Group(Value):
         identifier_data = self.identifier_data.get_child(*path)
         if isinstance(value, dict):
             value = _str_key_dict(value)
-        await self._driver.set(identifier_data, value=value)
+        await self._config._set(identifier_data, value)
 
 
 class Config(metaclass=ConfigMeta):
@@ -656,6 +1010,10 @@ class Config(metaclass=ConfigMeta):
         self._defaults = defaults or {}
 
         self.custom_groups: Dict[str, int] = {}
+        self._custom_indexes: Dict[str, Set[str]] = {}
+        # Base groups by category and primary keys, dropped when defaults are registered
+        self._group_cache: Dict[Tuple[str, Tuple[str, ...]], Group] = {}
+        self._defaults_generation = 0
         self._lock_cache: MutableMapping[
             IdentifierData, asyncio.Lock
         ] = weakref.WeakValueDictionary()
@@ -811,7 +1169,13 @@ class Config(metaclass=ConfigMeta):
             else:
                 _partial[k] = v
 
+    def _invalidate_groups(self) -> None:
+        """Drop cached groups and values, after defaults or custom groups change."""
+        self._group_cache.clear()
+        self._defaults_generation += 1
+
     def _register_default(self, key: str, **kwargs: Any):
+        self._invalidate_groups()
         if key not in self._defaults:
             self._defaults[key] = {}
 
@@ -822,6 +1186,71 @@ class Config(metaclass=ConfigMeta):
             to_add = self._get_defaults_dict(k, v)
             self._update_defaults(to_add, self._defaults[key])
 
+    def transaction(self) -> _BatchCtxManager:
+        """Batch writes made through this config into a single driver call.
+
+        Sets and clears made within this context manager, along with the
+        expiries given to `Value.set`, are buffered and committed together
+        on exit, e.g. in one database transaction
+        or one file write. If an exception is raised within the context
+        manager, none of the buffered writes are committed.
+
+        Example
+        -------
+        ::
+
+            async with config.transaction():
+                await config.member(member).balance.set(100)
+                await config.member(member).name.set(member.display_name)
+
+        Note
+        ----
+        Reads within the context manager don't see the buffered writes.
+        `Value.inc`, `Value.toggle` and changes made through a value's
+        context manager while holding its lock aren't buffered: any writes
+        buffered before them are committed first.
+
+        Returns
+        -------
+        `async context manager`
+
+        """
+        return _BatchCtxManager(self)
+
+    async def _set(self, identifier_data: IdentifierData, value: Any) -> None:
+        operations = _get_open_batch(self)
+        if operations is not None:
+            operations.append(("set", identifier_data, _copy_value(value)))
+        else:
+            await _timed(
+                "set",
+                identifier_data,
+                self._driver.set(identifier_data, value=value),
+                written=value,
+            )
+
+    async def _set_expiry(self, identifier_data: IdentifierData, expires_at: Optional[float]):
+        operations = _get_open_batch(self)
+        if operations is not None:
+            operations.append(("set_expiry", identifier_data, expires_at))
+        else:
+            await self._driver.set_expiry(identifier_data, expires_at)
+
+    async def _commit_batch(self) -> None:
+        # Commits the writes buffered so far, if this config has an open batch.
+        operations = _get_open_batch(self)
+        if operations:
+            buffered = operations.copy()
+            operations.clear()
+            await _timed_batch(self._driver, buffered)
+
+    async def _clear(self, identifier_data: IdentifierData) -> None:
+        operations = _get_open_batch(self)
+        if operations is not None:
+            operations.append(("clear", identifier_data, None))
+        else:
+            await _timed("clear", identifier_data, self._driver.clear(identifier_data))
+
     def register_global(self, **kwargs):
         """Register default values for attributes you wish to store in `Config`
         at a global level.
@@ -912,14 +1341,42 @@ class Config(metaclass=ConfigMeta):
         """
         self._register_default(group_identifier, **kwargs)
 
-    def init_custom(self, group_identifier: str, identifier_count: int):
+    def init_custom(
+        self, group_identifier: str, identifier_count: int, *, index_on: Iterable[str] = ()
+    ):
         """
         Initializes a custom group for usage. This method must be called first!
+
+        Parameters
+        ----------
+        group_identifier : str
+            Used to identify the custom group.
+        identifier_count : int
+            The number of identifiers needed to uniquely identify an entry
+            in the custom group.
+
+        Keyword Arguments
+        -----------------
+        index_on : Iterable[str]
+            Attributes of the entries to index, so that entries can be
+            looked up by their values with `Group.find` without reading
+            the whole group.
         """
         if identifier_count != self.custom_groups.setdefault(group_identifier, identifier_count):
             raise ValueError(
                 f"Cannot change identifier count of already registered group: {group_identifier}"
             )
+        self._invalidate_groups()
+        index_on = [index_on] if isinstance(index_on, str) else list(index_on)
+        if not index_on:
+            return
+        indexes = self._custom_indexes.setdefault(group_identifier, set())
+        identifier_data = self._get_base_group(group_identifier).identifier_data
+        for field in index_on:
+            if not isinstance(field, str) or not field:
+                raise ValueError(f"Invalid attribute to index on: {field!r}")
+            indexes.add(field)
+            self._driver.declare_index(identifier_data, field)
 
     def _get_base_group(self, category: str, *primary_keys: str) -> Group:
         """
@@ -927,6 +1384,12 @@ class Config(metaclass=ConfigMeta):
             :code:`Config._get_base_group()` should not be used to get config groups as
             this is not a safe operation. Using this could end up corrupting your config file.
         """
+        key = (category, primary_keys)
+        try:
+            return self._group_cache[key]
+        except KeyError:
+            pass
+
         # noinspection PyTypeChecker
         pkey_len, is_custom = ConfigCategory.get_pkey_info(category, self.custom_groups)
         identifier_data = IdentifierData(
@@ -943,8 +1406,8 @@ class Config(metaclass=ConfigMeta):
             # Don't mix in defaults with groups higher than the document level
             defaults = {}
         else:
-            defaults = self.defaults.get(category, {})
-        return Group(
+            defaults = self._defaults.get(category, {})
+        group = Group(
             identifier_data=identifier_data,
             defaults=defaults,
             driver=self._driver,
@@ -952,6 +1415,11 @@ class Config(metaclass=ConfigMeta):
             config=self,
         )
 
+        if len(self._group_cache) >= _MAX_CACHED_GROUPS:
+            del self._group_cache[next(iter(self._group_cache))]
+        self._group_cache[key] = group
+        return group
+
     def guild_from_id(self, guild_id: int) -> Group:
         """Returns a `Group` for the given guild id.
 
@@ -1188,17 +1656,15 @@ class Config(metaclass=ConfigMeta):
         """
         group = self._get_base_group(scope)
         ret = {}
-        defaults = self.defaults.get(scope, {})
+        defaults = self._defaults.get(scope, {})
 
         try:
-            dict_ = await self._driver.get(group.identifier_data)
+            dict_ = await _get_view(self._driver, group.identifier_data)
         except KeyError:
             pass
         else:
             for k, v in dict_.items():
-                data = pickle.loads(pickle.dumps(defaults, -1))
-                data.update(v)
-                ret[int(k)] = data
+                ret[int(k)] = _overlay_defaults(v, defaults, nested=False)
 
         return ret
 
@@ -1272,11 +1738,9 @@ class Config(metaclass=ConfigMeta):
 
     def _all_members_from_guild(self, guild_data: dict) -> dict:
         ret = {}
-        defaults = self.defaults.get(self.MEMBER, {})
+        defaults = self._defaults.get(self.MEMBER, {})
         for member_id, member_data in guild_data.items():
-            new_member_data = pickle.loads(pickle.dumps(defaults, -1))
-            new_member_data.update(member_data)
-            ret[int(member_id)] = new_member_data
+            ret[int(member_id)] = _overlay_defaults(member_data, defaults, nested=False)
         return ret
 
     async def all_members(self, guild: discord.Guild = None) -> dict:
@@ -1308,7 +1772,7 @@ class Config(metaclass=ConfigMeta):
         if guild is None:
             group = self._get_base_group(self.MEMBER)
             try:
-                dict_ = await self._driver.get(group.identifier_data)
+                dict_ = await _get_view(self._driver, group.identifier_data)
             except KeyError:
                 pass
             else:
@@ -1317,13 +1781,156 @@ class Config(metaclass=ConfigMeta):
         else:
             group = self._get_base_group(self.MEMBER, str(guild.id))
             try:
-                guild_data = await self._driver.get(group.identifier_data)
+                guild_data = await _get_view(self._driver, group.identifier_data)
             except KeyError:
                 pass
             else:
                 ret = self._all_members_from_guild(guild_data)
         return ret
 
+    async def _iter_from_scope(
+        self, scope: str, *primary_keys: str, batch_size: int
+    ) -> AsyncIterator[Tuple[Tuple[int, ...], Dict[str, Any]]]:
+        """Iterate over all values from a particular scope of data.
+
+        IDs are casted to `int`, and default values are mixed into the
+        data, just like `_all_from_scope`.
+        """
+        group = self._get_base_group(scope, *primary_keys)
+        defaults = self._defaults.get(scope, {})
+        async for pkeys, document in self._driver.aiter_documents(
+            group.identifier_data, batch_size=batch_size
+        ):
+            yield tuple(map(int, pkeys)), _overlay_defaults(document, defaults, nested=False)
+
+    async def iter_all_guilds(
+        self, *, batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Iterate over all guild data.
+
+        Unlike `all_guilds`, this doesn't load all of the data into
+        memory at once, so it should be used to scan through large
+        amounts of data.
+
+        Example
+        -------
+        ::
+
+            async for guild_id, guild_data in config.iter_all_guilds():
+                ...
+
+        Note
+        ----
+        The yielded data will include registered defaults for values
+        which have not yet been set.
+
+        Parameters
+        ----------
+        batch_size : int
+            How many guilds' data to fetch from the driver at a time.
+
+        Yields
+        ------
+        Tuple[int, dict]
+            :code:`(GUILD_ID, data)` for each guild.
+
+        """
+        async for (guild_id,), data in self._iter_from_scope(self.GUILD, batch_size=batch_size):
+            yield guild_id, data
+
+    async def iter_all_channels(
+        self, *, batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Iterate over all channel data.
+
+        This is the streaming equivalent of `all_channels`. See
+        `iter_all_guilds` for details.
+
+        Yields
+        ------
+        Tuple[int, dict]
+            :code:`(CHANNEL_ID, data)` for each channel.
+
+        """
+        async for (channel_id,), data in self._iter_from_scope(
+            self.CHANNEL, batch_size=batch_size
+        ):
+            yield channel_id, data
+
+    async def iter_all_roles(
+        self, *, batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Iterate over all role data.
+
+        This is the streaming equivalent of `all_roles`. See
+        `iter_all_guilds` for details.
+
+        Yields
+        ------
+        Tuple[int, dict]
+            :code:`(ROLE_ID, data)` for each role.
+
+        """
+        async for (role_id,), data in self._iter_from_scope(self.ROLE, batch_size=batch_size):
+            yield role_id, data
+
+    async def iter_all_users(
+        self, *, batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Iterate over all user data.
+
+        This is the streaming equivalent of `all_users`. See
+        `iter_all_guilds` for details.
+
+        Yields
+        ------
+        Tuple[int, dict]
+            :code:`(USER_ID, data)` for each user.
+
+        """
+        async for (user_id,), data in self._iter_from_scope(self.USER, batch_size=batch_size):
+            yield user_id, data
+
+    async def iter_all_members(
+        self, guild: Optional[discord.Guild] = None, *, batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[int, int, Dict[str, Any]]]:
+        """Iterate over data for all members.
+
+        This is the streaming equivalent of `all_members`. See
+        `iter_all_guilds` for details.
+
+        Example
+        -------
+        ::
+
+            async for guild_id, member_id, member_data in config.iter_all_members():
+                ...
+
+        Parameters
+        ----------
+        guild : `discord.Guild`, optional
+            The guild to iterate over member data from. Can be omitted
+            to iterate over member data from all guilds.
+        batch_size : int
+            How many members' data to fetch from the driver at a time.
+
+        Yields
+        ------
+        Tuple[int, int, dict]
+            :code:`(GUILD_ID, MEMBER_ID, data)` for each member.
+
+        """
+        if guild is None:
+            async for (guild_id, member_id), data in self._iter_from_scope(
+                self.MEMBER, batch_size=batch_size
+            ):
+                yield guild_id, member_id, data
+        else:
+            async for (member_id,), data in self._iter_from_scope(
+                self.MEMBER, str(guild.id), batch_size=batch_size
+            ):
+                yield guild.id, member_id, data
+
     async def _clear_scope(self, *scopes: str):
         """Clear all data in a particular scope.
 
@@ -1428,6 +2035,102 @@ class Config(metaclass=ConfigMeta):
         """
         await self._clear_scope(str(group_identifier))
 
+    async def compact(self, *, batch_size: int = 1000) -> Dict[str, int]:
+        """Remove stored data which is equal to the registered defaults.
+
+        Stored values which are identical to their defaults, and groups
+        left empty, are cleared. This doesn't change what is read from
+        this Config, except that documents left with nothing but
+        defaults no longer show up in the results of methods like
+        `all_members`, the same as if they had been cleared.
+
+        Documents are scanned in batches, so that this can run while the
+        bot is in use. Each value is only cleared if it is still equal to
+        its default, which the driver checks atomically with clearing it,
+        so values written to meanwhile are left as they are.
+
+        Parameters
+        ----------
+        batch_size : int
+            The number of documents to scan at a time.
+
+        Returns
+        -------
+        Dict[str, int]
+            The number of documents scanned, compacted and removed,
+            the number of empty containers removed, and an estimate of
+            the bytes of JSON reclaimed.
+
+        """
+        result = {
+            "documents": 0,
+            "documents_compacted": 0,
+            "documents_removed": 0,
+            "containers_removed": 0,
+            "bytes_reclaimed": 0,
+        }
+        categories = [c.value for c in ConfigCategory]
+        categories.extend(self.custom_groups)
+        for category in categories:
+            defaults = self._defaults.get(category, {})
+            pkey_len, is_custom = ConfigCategory.get_pkey_info(category, self.custom_groups)
+            identifier_data = IdentifierData(
+                self.cog_name, self.unique_identifier, category, (), (), pkey_len, is_custom
+            )
+            candidates = []
+            async for pkeys, document in self._driver.aiter_documents(
+                identifier_data, batch_size=batch_size
+            ):
+                result["documents"] += 1
+                if _default_equal_paths(document, defaults)[1]:
+                    candidates.append(pkeys)
+                if len(candidates) >= batch_size:
+                    await self._compact_documents(identifier_data, candidates, defaults, result)
+                    candidates = []
+                if result["documents"] % batch_size == 0:
+                    await asyncio.sleep(0)
+            await self._compact_documents(identifier_data, candidates, defaults, result)
+            result["containers_removed"] += await self._driver.remove_empty_containers(
+                identifier_data
+            )
+        return result
+
+    async def _compact_documents(
+        self,
+        identifier_data: IdentifierData,
+        candidates: List[Tuple[str, ...]],
+        defaults: Dict[str, Any],
+        result: Dict[str, int],
+    ) -> None:
+        for pkeys in candidates:
+            document_ident = identifier_data.get_child(*pkeys)
+            try:
+                document = await _get_view(self._driver, document_ident)
+            except KeyError:
+                continue
+            removable, paths = _default_equal_paths(document, defaults)
+            if not paths:
+                continue
+            size = len(json.dumps(document))
+            if removable:
+                operations = [("clear_if_equal", document_ident, _copy_value(document))]
+                result["documents_removed"] += 1
+                result["bytes_reclaimed"] += size
+            else:
+                operations = [
+                    (
+                        "clear_if_equal",
+                        document_ident.get_child(*path),
+                        _copy_value(_get_path(document, path)),
+                    )
+                    for path in paths
+                ]
+                result["documents_compacted"] += 1
+                result["bytes_reclaimed"] += size - len(
+                    json.dumps(_without_paths(document, paths))
+                )
+            await _timed_batch(self._driver, operations)
+
     def get_guilds_lock(self) -> asyncio.Lock:
         """Get a lock for all guild data.
 
@@ -1529,14 +2232,133 @@ class Config(metaclass=ConfigMeta):
             return self._lock_cache.setdefault(id_data, asyncio.Lock())
 
 
-async def migrate(cur_driver_cls: Type[BaseDriver], new_driver_cls: Type[BaseDriver]) -> None:
+async def migrate(
+    cur_driver_cls: Type[BaseDriver],
+    new_driver_cls: Type[BaseDriver],
+    *,
+    workers: int = 4,
+    chunk_size: int = 1000,
+) -> None:
     """Migrate from one driver type to another."""
     # Get custom group data
     core_conf = Config.get_core_conf(allow_old=True)
     core_conf.init_custom("CUSTOM_GROUPS", 2)
     all_custom_group_data = await core_conf.custom("CUSTOM_GROUPS").all()
 
-    await cur_driver_cls.migrate_to(new_driver_cls, all_custom_group_data)
+    await cur_driver_cls.migrate_to(
+        new_driver_cls, all_custom_group_data, workers=workers, chunk_size=chunk_size
+    )
+
+
+async def export_ndjson(
+    driver_cls: Type[BaseDriver], fp: TextIO, *, batch_size: int = 1000
+) -> int:
+    """Export all data stored with a driver type as newline-delimited JSON."""
+    core_conf = Config.get_core_conf(allow_old=True)
+    core_conf.init_custom("CUSTOM_GROUPS", 2)
+    all_custom_group_data = await core_conf.custom("CUSTOM_GROUPS").all()
+
+    return await driver_cls.export_ndjson(fp, all_custom_group_data, batch_size=batch_size)
+
+
+async def import_ndjson(
+    driver_cls: Type[BaseDriver], fp: TextIO, *, chunk_size: int = 1000
+) -> int:
+    """Import data exported by `export_ndjson` with a driver type."""
+    return await driver_cls.import_ndjson(fp, chunk_size=chunk_size)
+
+
+async def compact(
+    cog_names: Optional[Iterable[str]] = None, *, batch_size: int = 1000
+) -> Dict[str, Dict[str, int]]:
+    """Compact the data of each Config in use, with `Config.compact`.
+
+    Parameters
+    ----------
+    cog_names : Optional[Iterable[str]]
+        The names of the cogs to compact. Defaults to all of them.
+    batch_size : int
+        The number of documents to scan at a time.
+
+    Returns
+    -------
+    Dict[str, Dict[str, int]]
+        The totals of the results of `Config.compact`, per cog name.
+
+    """
+    if cog_names is not None:
+        cog_names = set(cog_names)
+    totals: Dict[str, Dict[str, int]] = {}
+    for conf in sorted(_config_cache.values(), key=lambda c: c.cog_name):
+        if cog_names is not None and conf.cog_name not in cog_names:
+            continue
+        result = await conf.compact(batch_size=batch_size)
+        cog_totals = totals.setdefault(conf.cog_name, dict.fromkeys(result, 0))
+        for key, count in result.items():
+            cog_totals[key] += count
+    return totals
+
+
+async def _get_view(driver: BaseDriver, identifier_data: IdentifierData) -> Any:
+    """Get a view of the stored value from the driver, recording stats if enabled."""
+    collector = _config_stats.collector
+    if collector is None:
+        return await driver.get_view(identifier_data)
+    start = time.perf_counter()
+    try:
+        ret = await driver.get_view(identifier_data)
+    except KeyError:
+        collector.record("get", identifier_data, time.perf_counter() - start)
+        raise
+    collector.record("get", identifier_data, time.perf_counter() - start, ret)
+    return ret
+
+
+async def _timed(
+    operation: str,
+    identifier_data: IdentifierData,
+    awaitable: Awaitable[_T],
+    *,
+    written: Any = ...,
+    read: bool = False,
+) -> _T:
+    """Await a driver call, recording stats for it if enabled.
+
+    The size of ``written`` is recorded, or the size of the result when
+    ``read`` is true.
+    """
+    collector = _config_stats.collector
+    if collector is None:
+        return await awaitable
+    start = time.perf_counter()
+    ret = await awaitable
+    collector.record(
+        operation, identifier_data, time.perf_counter() - start, ret if read else written
+    )
+    return ret
+
+
+async def _timed_batch(
+    driver: BaseDriver, operations: List[Tuple[str, IdentifierData, Any]]
+) -> None:
+    """Apply a batch of operations, recording stats for it if enabled.
+
+    A batch which spans several categories is recorded as a batch call
+    in each of them, with the size of the values written to it.
+    """
+    collector = _config_stats.collector
+    if collector is None:
+        return await driver.apply_batch(operations)
+    start = time.perf_counter()
+    await driver.apply_batch(operations)
+    seconds = time.perf_counter() - start
+    written: Dict[str, Tuple[IdentifierData, List[Any]]] = {}
+    for op, identifier_data, value in operations:
+        __, values = written.setdefault(identifier_data.category, (identifier_data, []))
+        if op == "set":
+            values.append(value)
+    for identifier_data, values in written.values():
+        collector.record("batch", identifier_data, seconds, values)
 
 
 def _str_key_dict(value: Dict[Any, _T]) -> Dict[str, _T]:
@@ -1560,3 +2382,113 @@ def _str_key_dict(value: Dict[Any, _T]) -> Dict[str, _T]:
             v = _str_key_dict(v)
         ret[str(k)] = v
     return ret
+
+
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+
+def _default_equal_paths(
+    value: Any, default: Any, path: Tuple[str, ...] = ()
+) -> Tuple[bool, List[Tuple[str, ...]]]:
+    """Find the paths in a stored value which can be cleared without changing what is read.
+
+    Returns whether the whole value can be cleared, and the paths to clear.
+    Those are ``[path]`` when the whole value can be cleared.
+    """
+    if default is not ... and _strictly_equal(value, default):
+        return True, [path]
+    if not isinstance(value, dict) or not isinstance(default, dict):
+        return False, []
+    all_removable = True
+    paths = []
+    for key, inner_value in value.items():
+        removable, inner_paths = _default_equal_paths(
+            inner_value, default.get(key, ...), path + (key,)
+        )
+        all_removable = all_removable and removable
+        paths.extend(inner_paths)
+    if all_removable:
+        # Includes empty groups, which read the same as missing ones
+        return True, [path]
+    return False, paths
+
+
+def _get_path(value: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    """Get the value at the given path within a dict."""
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _without_paths(value: Dict[str, Any], paths: List[Tuple[str, ...]]) -> Dict[str, Any]:
+    """Get a copy of a dict, with the values at the given paths removed."""
+    value = json.loads(json.dumps(value))
+    for path in paths:
+        partial = value
+        for key in path[:-1]:
+            partial = partial[key]
+        del partial[path[-1]]
+    return value
+
+
+def _copy_value(value: _T) -> _T:
+    """
+    Copies a value read from a driver's view, so that it can be handed
+    out to the caller.
+
+    Immutable values are returned as they are.
+
+    """
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    elif type(value) is list and all(isinstance(v, _IMMUTABLE_TYPES) for v in value):
+        return value.copy()
+    elif type(value) is dict and all(isinstance(v, _IMMUTABLE_TYPES) for v in value.values()):
+        return value.copy()
+    return pickle.loads(pickle.dumps(value, -1))
+
+
+def _overlay_defaults(
+    data: Dict[str, Any], defaults: Dict[str, Any], *, nested: bool = True
+) -> Dict[str, Any]:
+    """
+    Get stored data with the registered defaults filled in, as a new `dict`.
+
+    Neither argument is modified, and only immutable values are shared
+    with them. This means the defaults don't have to be copied up
+    front, and the data can be a driver's view.
+
+    Parameters
+    ----------
+    data : Dict[str, Any]
+        The stored data.
+    defaults : Dict[str, Any]
+        The defaults to fill in.
+    nested : bool
+        Whether to also fill in defaults within nested dicts.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The data with defaults.
+
+    """
+    if not nested:
+        ret = {**defaults, **data}
+        for key, value in ret.items():
+            if not isinstance(value, _IMMUTABLE_TYPES):
+                ret[key] = _copy_value(value)
+        return ret
+
+    ret = {}
+    for key, default in defaults.items():
+        if key not in data:
+            ret[key] = _copy_value(default)
+        elif nested and isinstance(default, dict) and isinstance(data[key], dict):
+            ret[key] = _overlay_defaults(data[key], default)
+        else:
+            ret[key] = _copy_value(data[key])
+    for key, value in data.items():
+        if key not in ret:
+            ret[key] = _copy_value(value)
+    return ret
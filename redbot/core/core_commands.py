@@ -34,6 +34,7 @@ from typing import (
     Dict,
     Set,
     Literal,
+    Any,
 )
 
 import aiohttp
@@ -45,11 +46,13 @@ from . import (
     __version__,
     version_info as red_version_info,
     commands,
+    config,
     errors,
     i18n,
     bank,
     modlog,
 )
+from . import _config_stats
 from ._diagnoser import IssueDiagnoser
 from .utils import AsyncIter, can_user_send_messages_in
 from .utils._internal_utils import fetch_latest_red_version_info
@@ -130,6 +133,8 @@ class CoreLogic:
         self.bot.register_rpc_handler(self._prefixes)
         self.bot.register_rpc_handler(self._version_info)
         self.bot.register_rpc_handler(self._invite_url)
+        self.bot.register_rpc_handler(self._driver_metrics)
+        self.bot.register_rpc_handler(self._get_config_stats)
 
     async def _load(self, pkg_names: Iterable[str]) -> Dict[str, Union[List[str], Dict[str, str]]]:
         """
@@ -379,6 +384,37 @@ class CoreLogic:
         """
         return await self.bot.get_invite_url()
 
+    async def _driver_metrics(self) -> Dict[str, Any]:
+        """
+        Gets the storage driver's performance metrics.
+
+        Returns
+        -------
+        dict
+            Driver specific metrics, e.g. query latencies and connection
+            pool usage. Empty if the driver doesn't collect any.
+        """
+        return type(self.bot._config._driver).get_metrics()
+
+    async def _get_config_stats(self) -> Dict[str, Any]:
+        """
+        Gets Config's storage access statistics.
+
+        Returns
+        -------
+        dict
+            Dictionary with keys:
+              ``enabled``: Whether statistics are being collected
+              ``started_at``: UNIX timestamp of when collection started
+              ``cogs``: Call counts, latencies and bytes serialized per
+              category and operation, and lock waits per category,
+              keyed by cog name
+        """
+        collector = _config_stats.collector
+        if collector is None:
+            return {"enabled": False}
+        return {"enabled": True, **collector.to_dict()}
+
     @staticmethod
     async def _can_get_invite_url(ctx):
         is_owner = await ctx.bot.is_owner(ctx.author)
@@ -4780,7 +4816,7 @@ class Core(commands.commands._RuleDropper, commands.Cog, CoreLogic):
         msg = _("Data path: {path}").format(path=data_dir)
         await ctx.send(box(msg))
 
-    @commands.command(hidden=True)
+    @commands.group(hidden=True, invoke_without_command=True)
     @commands.is_owner()
     async def debuginfo(self, ctx: commands.Context):
         """Shows debug information useful for debugging."""
@@ -4788,6 +4824,131 @@ class Core(commands.commands._RuleDropper, commands.Cog, CoreLogic):
 
         await ctx.send(await DebugInfo(self.bot).get_command_text())
 
+    @debuginfo.group(name="driver", invoke_without_command=True)
+    async def debuginfo_driver(self, ctx: commands.Context):
+        """Shows the storage driver's query latencies and connection pool usage.
+
+        Connection acquire waits which are long compared to query latencies
+        mean the connection pool is too small for the load.
+        """
+        from redbot.core._debuginfo import DebugInfo
+
+        await ctx.send(await DebugInfo(self.bot).get_driver_metrics_command_text())
+
+    @debuginfo_driver.command(name="memory")
+    async def debuginfo_driver_memory(self, ctx: commands.Context):
+        """Shows the memory used by each cog's data loaded by the JSON driver.
+
+        Sizes are estimates of everything held by the loaded data, counting objects
+        shared between cogs in each of them. With the JSON driver's compact mode,
+        the members of guilds which haven't been accessed yet are kept encoded.
+        """
+        from redbot.core._debuginfo import DebugInfo
+
+        async with ctx.typing():
+            text = await DebugInfo(self.bot).get_driver_memory_text()
+        await ctx.send_interactive(pagify(text), box_lang="")
+
+    @debuginfo.group(name="config", invoke_without_command=True)
+    async def debuginfo_config(self, ctx: commands.Context):
+        """Shows Config's storage access statistics per cog.
+
+        This includes call counts, latencies and bytes serialized for each
+        category and operation, as well as time spent waiting on value locks.
+        Statistics are only collected after being enabled with `[p]debuginfo config enable`.
+        """
+        from redbot.core._debuginfo import DebugInfo
+
+        await ctx.send_interactive(
+            pagify(DebugInfo(self.bot).get_config_stats_text(), delims=["\n\n", "\n"]),
+            box_lang="",
+        )
+
+    @debuginfo_config.command(name="enable")
+    async def debuginfo_config_enable(self, ctx: commands.Context):
+        """Starts collecting Config statistics, discarding any collected so far.
+
+        This adds some overhead to every Config access, so remember to disable it when done.
+        """
+        _config_stats.enable()
+        await ctx.send(_("Config statistics are now being collected."))
+
+    @debuginfo_config.command(name="disable")
+    async def debuginfo_config_disable(self, ctx: commands.Context):
+        """Stops collecting Config statistics."""
+        _config_stats.disable()
+        await ctx.send(_("Config statistics are no longer being collected."))
+
+    @commands.command()
+    @commands.is_owner()
+    async def compactconfig(self, ctx: commands.Context, *cog_names: str):
+        """Removes stored Config data which is equal to the registered defaults.
+
+        Values identical to their defaults, and groups left empty, are removed from storage.
+        What cogs read from Config doesn't change, but entries holding nothing but defaults
+        no longer show up when iterating over all of a cog's guilds, members, etc.
+        This can't be undone, so consider making a backup first.
+
+        Only cogs which used Config since the bot started can be compacted, since the
+        defaults of other cogs aren't known. Data is compacted in batches, so the bot
+        keeps working meanwhile.
+
+        **Arguments:**
+        - `[cog_names...]` - The names of the cogs to compact, as used by Config. Omit to compact all of them.
+        """
+        if cog_names:
+            msg = _(
+                "This will permanently remove the stored data of {cogs} which is equal to"
+                " the defaults. Do you want to continue?"
+            ).format(cogs=humanize_list([inline(cog_name) for cog_name in cog_names]))
+        else:
+            msg = _(
+                "This will permanently remove the stored data of all cogs which is equal to"
+                " the defaults. Do you want to continue?"
+            )
+        await ctx.send(msg + " (yes/no)")
+        pred = MessagePredicate.yes_or_no(ctx)
+        try:
+            await self.bot.wait_for("message", check=pred, timeout=30)
+        except asyncio.TimeoutError:
+            await ctx.send(_("Response timed out."))
+            return
+        if pred.result is False:
+            await ctx.send(_("Cancelled."))
+            return
+
+        async with ctx.typing():
+            totals = await config.compact(cog_names or None)
+        if not totals:
+            await ctx.send(_("None of the given cogs have used Config since the bot started."))
+            return
+
+        header = (_("Cog"), _("Documents"), _("Compacted"), _("Removed"), _("Bytes reclaimed"))
+        rows = [header]
+        for cog_name, result in totals.items():
+            rows.append(
+                (
+                    cog_name,
+                    humanize_number(result["documents"]),
+                    humanize_number(result["documents_compacted"]),
+                    humanize_number(result["documents_removed"]),
+                    humanize_number(result["bytes_reclaimed"]),
+                )
+            )
+        widths = [max(len(row[idx]) for row in rows) for idx in range(len(header))]
+        text = "\n".join(
+            "  ".join(
+                cell.ljust(width) if idx == 0 else cell.rjust(width)
+                for idx, (cell, width) in enumerate(zip(row, widths))
+            )
+            for row in rows
+        )
+        total_bytes = sum(result["bytes_reclaimed"] for result in totals.values())
+        text += "\n\n" + _("{bytes} bytes reclaimed in total.").format(
+            bytes=humanize_number(total_bytes)
+        )
+        await ctx.send_interactive(pagify(text), box_lang="")
+
     # You may ask why this command is owner-only,
     # cause after all it could be quite useful to guild owners!
     # Truth to be told, that would require us to make some part of this
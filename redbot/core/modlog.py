@@ -8,7 +8,6 @@ from typing import List, Literal, Union, Optional, cast, TYPE_CHECKING
 import discord
 
 from redbot.core import Config
-from .utils import AsyncIter
 from .utils.common_filters import (
     filter_invites,
     filter_mass_mentions,
@@ -65,12 +64,10 @@ async def _process_data_deletion(
     key_paths = []
 
     async with _data_deletion_lock:
-        all_cases = await _config.custom(_CASES).all()
-        async for guild_id_str, guild_cases in AsyncIter(all_cases.items(), steps=100):
-            async for case_num_str, case in AsyncIter(guild_cases.items(), steps=100):
-                for keyname in ("user", "moderator", "amended_by"):
-                    if (case.get(keyname, 0) or 0) == user_id:  # this could be None...
-                        key_paths.append((guild_id_str, case_num_str))
+        for keyname in ("user", "moderator", "amended_by"):
+            found = await _config.custom(_CASES).find(**{keyname: user_id})
+            for guild_id_str, guild_cases in found.items():
+                key_paths.extend((guild_id_str, case_num_str) for case_num_str in guild_cases)
 
         async with _config.custom(_CASES).all() as all_cases:
             for guild_id_str, case_num_str in key_paths:
@@ -92,7 +89,7 @@ async def _init(bot: Red):
     _config.register_global(schema_version=1)
     _config.register_guild(mod_log=None, casetypes={}, latest_case_number=0)
     _config.init_custom(_CASETYPES, 1)
-    _config.init_custom(_CASES, 2)
+    _config.init_custom(_CASES, 2, index_on=("user", "moderator", "amended_by"))
     _config.register_custom(_CASETYPES)
     _config.register_custom(_CASES)
     await _migrate_config(from_version=await _config.schema_version(), to_version=_SCHEMA_VERSION)
@@ -900,14 +897,14 @@ async def get_cases_for_member(
         Fetching the user failed.
     """
 
-    cases = await _config.custom(_CASES, str(guild.id)).all()
-
     if not (member_id or member):
         raise ValueError("Expected a member or a member id to be provided.") from None
 
     if not member_id:
         member_id = member.id
 
+    cases = await _config.custom(_CASES, str(guild.id)).find(user=member_id)
+
     if not member:
         member = bot.get_user(member_id) or member_id
 
@@ -919,7 +916,6 @@ async def get_cases_for_member(
     cases = [
         await Case.from_json(modlog_channel, bot, case_number, case_data, user=member, guild=guild)
         for case_number, case_data in cases.items()
-        if case_data["user"] == member_id
     ]
 
     return cases
@@ -1018,8 +1014,9 @@ async def create_case(
             message=None,
             last_known_username=last_known_username,
         )
-        await _config.custom(_CASES, str(guild.id), str(next_case_number)).set(case.to_json())
-        await _config.guild(guild).latest_case_number.set(next_case_number)
+        async with _config.transaction():
+            await _config.custom(_CASES, str(guild.id), str(next_case_number)).set(case.to_json())
+            await _config.guild(guild).latest_case_number.set(next_case_number)
 
     await set_contextual_locales_from_guild(bot, guild)
     bot.dispatch("modlog_case_create", case)
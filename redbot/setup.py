@@ -4,13 +4,14 @@ from redbot import _early_init
 _early_init()
 
 import asyncio
+import gzip
 import json
 import logging
 import sys
 import re
 from copy import deepcopy
 from pathlib import Path
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Optional, TextIO, Union
 
 import click
 
@@ -103,13 +104,14 @@ def get_storage_type(backend: Optional[str], *, interactive: bool):
         return get_target_backend(backend)
     if not interactive:
         return BackendType.JSON
-    storage_dict = {1: BackendType.JSON, 2: BackendType.POSTGRES}
+    storage_dict = {1: BackendType.JSON, 2: BackendType.POSTGRES, 3: BackendType.SQLITE}
     storage = None
     while storage is None:
         print()
         print("Please choose your storage backend.")
         print("1. JSON (file storage, requires no database).")
         print("2. PostgreSQL (Requires a database server)")
+        print("3. SQLite (single file database, requires no database server).")
         print("If you're unsure, press [ENTER] to use the recommended default - JSON.")
 
         storage = input("> ")
@@ -125,6 +127,37 @@ def get_storage_type(backend: Optional[str], *, interactive: bool):
     return storage_dict[storage]
 
 
+def get_storage_details(
+    storage_type: BackendType,
+    *,
+    json_layout: Optional[str] = None,
+    json_fsync: Optional[str] = None,
+    json_fsync_interval: Optional[int] = None,
+    json_compact: Optional[bool] = None,
+    json_flush_interval: Optional[int] = None,
+    json_max_pending_writes: Optional[int] = None,
+    json_journal: Optional[bool] = None,
+) -> Dict[str, Any]:
+    driver_cls = _drivers.get_driver_class(storage_type)
+    storage_details = driver_cls.get_config_details()
+    if storage_type == BackendType.JSON:
+        if json_layout is not None:
+            storage_details["layout"] = json_layout
+        if json_fsync is not None:
+            storage_details["fsync"] = json_fsync
+        if json_fsync_interval is not None:
+            storage_details["fsync_interval_ms"] = json_fsync_interval
+        if json_compact is not None:
+            storage_details["compact"] = json_compact
+        if json_flush_interval is not None:
+            storage_details["flush_interval"] = json_flush_interval
+        if json_max_pending_writes is not None:
+            storage_details["max_pending_writes"] = json_max_pending_writes
+        if json_journal is not None:
+            storage_details["journal"] = json_journal
+    return storage_details
+
+
 def get_name(name: str) -> str:
     INSTANCE_NAME_RE = re.compile(
         r"""
@@ -182,6 +215,13 @@ def basic_setup(
     backend: Optional[str],
     interactive: bool,
     overwrite_existing_instance: bool,
+    json_layout: Optional[str] = None,
+    json_fsync: Optional[str] = None,
+    json_fsync_interval: Optional[int] = None,
+    json_compact: Optional[bool] = None,
+    json_flush_interval: Optional[int] = None,
+    json_max_pending_writes: Optional[int] = None,
+    json_journal: Optional[bool] = None,
 ):
     """
     Creates the data storage folder.
@@ -211,8 +251,16 @@ def basic_setup(
     storage_type = get_storage_type(backend, interactive=interactive)
 
     default_dirs["STORAGE_TYPE"] = storage_type.value
-    driver_cls = _drivers.get_driver_class(storage_type)
-    default_dirs["STORAGE_DETAILS"] = driver_cls.get_config_details()
+    default_dirs["STORAGE_DETAILS"] = get_storage_details(
+        storage_type,
+        json_layout=json_layout,
+        json_fsync=json_fsync,
+        json_fsync_interval=json_fsync_interval,
+        json_compact=json_compact,
+        json_flush_interval=json_flush_interval,
+        json_max_pending_writes=json_max_pending_writes,
+        json_journal=json_journal,
+    )
 
     if name in instance_data:
         if overwrite_existing_instance:
@@ -257,20 +305,42 @@ def get_target_backend(backend: str) -> BackendType:
         return BackendType.JSON
     elif backend == "postgres":
         return BackendType.POSTGRES
+    elif backend == "sqlite":
+        return BackendType.SQLITE
 
 
 async def do_migration(
-    current_backend: BackendType, target_backend: BackendType
+    current_backend: BackendType,
+    target_backend: BackendType,
+    *,
+    json_layout: Optional[str] = None,
+    json_fsync: Optional[str] = None,
+    json_fsync_interval: Optional[int] = None,
+    json_compact: Optional[bool] = None,
+    json_flush_interval: Optional[int] = None,
+    json_max_pending_writes: Optional[int] = None,
+    json_journal: Optional[bool] = None,
+    workers: int = 4,
+    chunk_size: int = 1000,
 ) -> Dict[str, Any]:
     cur_driver_cls = _drivers._get_driver_class_include_old(current_backend)
     new_driver_cls = _drivers.get_driver_class(target_backend)
     cur_storage_details = data_manager.storage_details()
-    new_storage_details = new_driver_cls.get_config_details()
+    new_storage_details = get_storage_details(
+        target_backend,
+        json_layout=json_layout,
+        json_fsync=json_fsync,
+        json_fsync_interval=json_fsync_interval,
+        json_compact=json_compact,
+        json_flush_interval=json_flush_interval,
+        json_max_pending_writes=json_max_pending_writes,
+        json_journal=json_journal,
+    )
 
     await cur_driver_cls.initialize(**cur_storage_details)
     await new_driver_cls.initialize(**new_storage_details)
 
-    await config.migrate(cur_driver_cls, new_driver_cls)
+    await config.migrate(cur_driver_cls, new_driver_cls, workers=workers, chunk_size=chunk_size)
 
     await cur_driver_cls.teardown()
     await new_driver_cls.teardown()
@@ -294,6 +364,39 @@ async def create_backup(instance: str, destination_folder: Path = Path.home()) -
         print("Creating the backup failed.")
 
 
+def _open_ndjson(path: Path, mode: str) -> TextIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+async def export_data(instance: str, destination: Path, *, batch_size: int = 1000) -> None:
+    data_manager.load_basic_configuration(instance)
+    driver_cls = _drivers._get_driver_class_include_old(get_current_backend(instance))
+    await driver_cls.initialize(**data_manager.storage_details())
+    try:
+        with _open_ndjson(destination, "w") as fp:
+            count = await config.export_ndjson(driver_cls, fp, batch_size=batch_size)
+    finally:
+        await driver_cls.teardown()
+    print(f"Exported {count} documents from {instance} to {destination}")
+
+
+async def import_data(instance: str, source: Path, *, chunk_size: int = 1000) -> None:
+    data_manager.load_basic_configuration(instance)
+    driver_cls = _drivers.get_driver_class(get_current_backend(instance))
+    await driver_cls.initialize(**data_manager.storage_details())
+    try:
+        with _open_ndjson(source, "r") as fp:
+            count = await config.import_ndjson(driver_cls, fp, chunk_size=chunk_size)
+    except ValueError as exc:
+        print(f"Importing the data failed: {exc}")
+        sys.exit(ExitCodes.INVALID_CLI_USAGE)
+    finally:
+        await driver_cls.teardown()
+    print(f"Imported {count} documents from {source} into {instance}")
+
+
 async def remove_instance(
     instance: str,
     interactive: bool = False,
@@ -307,13 +410,13 @@ async def remove_instance(
 
     if interactive is True and delete_data is None:
         msg = "Would you like to delete this instance's data?"
-        if backend != BackendType.JSON:
+        if backend == BackendType.POSTGRES:
             msg += " The database server must be running for this to work."
         delete_data = click.confirm(msg, default=False)
 
     if interactive is True and _create_backup is None:
         msg = "Would you like to make a backup of the data for this instance?"
-        if backend != BackendType.JSON:
+        if backend == BackendType.POSTGRES:
             msg += " The database server must be running for this to work."
         _create_backup = click.confirm(msg, default=False)
 
@@ -401,7 +504,7 @@ async def remove_instance_interaction() -> None:
 )
 @click.option(
     "--backend",
-    type=click.Choice(["json", "postgres"]),
+    type=click.Choice(["json", "postgres", "sqlite"]),
     default=None,
     help=(
         "Choose a backend type for the new instance."
@@ -410,6 +513,69 @@ async def remove_instance_interaction() -> None:
         "Note: Choosing PostgreSQL will prevent the setup from being completely non-interactive."
     ),
 )
+@click.option(
+    "--json-layout",
+    type=click.Choice(["single", "sharded"]),
+    default=None,
+    help=(
+        "Choose how the JSON backend lays out each cog's data on disk. The sharded layout"
+        " stores each guild, member and channel in its own file, so that a write only"
+        " rewrites the data it touches. Defaults to single."
+    ),
+)
+@click.option(
+    "--json-fsync",
+    type=click.Choice(["always", "interval", "shutdown"]),
+    default=None,
+    help=(
+        "Choose when the JSON backend waits for written data to reach the disk."
+        " 'always' does so on every write, 'interval' every --json-fsync-interval"
+        " milliseconds, and 'shutdown' only when the bot shuts down. The last two are"
+        " faster, but writes since the last fsync may be lost on a crash. Defaults to always."
+    ),
+)
+@click.option(
+    "--json-fsync-interval",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Milliseconds between fsyncs with the 'interval' JSON fsync policy. Defaults to 1000.",
+)
+@click.option(
+    "--json-compact/--no-json-compact",
+    default=None,
+    help=(
+        "Reduce the memory used by the JSON backend's loaded data, by keeping the members"
+        " of each guild encoded until they're accessed and interning keys. Disabled by default."
+    ),
+)
+@click.option(
+    "--json-flush-interval",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Seconds between the JSON backend's writes of changed data to disk. Writes made in"
+        " between are coalesced, and flushed when the bot shuts down. By default, every"
+        " write is made to disk straight away."
+    ),
+)
+@click.option(
+    "--json-max-pending-writes",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Number of coalesced writes to a cog after which the JSON backend flushes its data"
+        " without waiting for --json-flush-interval. Defaults to 100."
+    ),
+)
+@click.option(
+    "--json-journal/--no-json-journal",
+    default=None,
+    help=(
+        "Append each JSON backend write to a journal before returning, so that coalesced"
+        " writes aren't lost on a crash. Implies a --json-flush-interval of 60 unless one"
+        " is given. Disabled by default."
+    ),
+)
 @click.option(
     "--overwrite-existing-instance",
     type=bool,
@@ -427,6 +593,13 @@ def cli(
     instance_name: str,
     data_path: Optional[Path],
     backend: Optional[str],
+    json_layout: Optional[str],
+    json_fsync: Optional[str],
+    json_fsync_interval: Optional[int],
+    json_compact: Optional[bool],
+    json_flush_interval: Optional[int],
+    json_max_pending_writes: Optional[int],
+    json_journal: Optional[bool],
     overwrite_existing_instance: bool,
 ) -> None:
     """Create a new instance."""
@@ -447,6 +620,13 @@ def cli(
             backend=backend,
             overwrite_existing_instance=overwrite_existing_instance,
             interactive=interactive,
+            json_layout=json_layout,
+            json_fsync=json_fsync,
+            json_fsync_interval=json_fsync_interval,
+            json_compact=json_compact,
+            json_flush_interval=json_flush_interval,
+            json_max_pending_writes=json_max_pending_writes,
+            json_journal=json_journal,
         )
 
 
@@ -517,8 +697,96 @@ def delete(
 
 @cli.command()
 @click.argument("instance", type=click.Choice(instance_list), metavar="<INSTANCE_NAME>")
-@click.argument("backend", type=click.Choice(["json", "postgres"]))
-def convert(instance: str, backend: str) -> None:
+@click.argument("backend", type=click.Choice(["json", "postgres", "sqlite"]))
+@click.option(
+    "--json-layout",
+    type=click.Choice(["single", "sharded"]),
+    default=None,
+    help=(
+        "Layout to use for the JSON backend's data. This can also be used to convert an"
+        " instance which already uses the JSON backend to a different layout."
+    ),
+)
+@click.option(
+    "--json-fsync",
+    type=click.Choice(["always", "interval", "shutdown"]),
+    default=None,
+    help=(
+        "Choose when the JSON backend waits for written data to reach the disk."
+        " 'always' does so on every write, 'interval' every --json-fsync-interval"
+        " milliseconds, and 'shutdown' only when the bot shuts down. The last two are"
+        " faster, but writes since the last fsync may be lost on a crash. Defaults to always."
+    ),
+)
+@click.option(
+    "--json-fsync-interval",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Milliseconds between fsyncs with the 'interval' JSON fsync policy. Defaults to 1000.",
+)
+@click.option(
+    "--json-compact/--no-json-compact",
+    default=None,
+    help=(
+        "Reduce the memory used by the JSON backend's loaded data, by keeping the members"
+        " of each guild encoded until they're accessed and interning keys. Disabled by default."
+    ),
+)
+@click.option(
+    "--json-flush-interval",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Seconds between the JSON backend's writes of changed data to disk. Writes made in"
+        " between are coalesced, and flushed when the bot shuts down. By default, every"
+        " write is made to disk straight away."
+    ),
+)
+@click.option(
+    "--json-max-pending-writes",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Number of coalesced writes to a cog after which the JSON backend flushes its data"
+        " without waiting for --json-flush-interval. Defaults to 100."
+    ),
+)
+@click.option(
+    "--json-journal/--no-json-journal",
+    default=None,
+    help=(
+        "Append each JSON backend write to a journal before returning, so that coalesced"
+        " writes aren't lost on a crash. Implies a --json-flush-interval of 60 unless one"
+        " is given. Disabled by default."
+    ),
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Number of cogs to convert concurrently.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Number of documents to copy to the new backend at once.",
+)
+def convert(
+    instance: str,
+    backend: str,
+    json_layout: Optional[str],
+    json_fsync: Optional[str],
+    json_fsync_interval: Optional[int],
+    json_compact: Optional[bool],
+    json_flush_interval: Optional[int],
+    json_max_pending_writes: Optional[int],
+    json_journal: Optional[bool],
+    workers: int,
+    chunk_size: int,
+) -> None:
     """Convert data backend of an instance."""
     current_backend = get_current_backend(instance)
     target = get_target_backend(backend)
@@ -530,7 +798,21 @@ def convert(instance: str, backend: str) -> None:
     if current_backend == BackendType.MONGOV1:
         raise RuntimeError("Please see the 3.2 release notes for upgrading a bot using mongo.")
     else:
-        new_storage_details = asyncio.run(do_migration(current_backend, target))
+        new_storage_details = asyncio.run(
+            do_migration(
+                current_backend,
+                target,
+                json_layout=json_layout,
+                json_fsync=json_fsync,
+                json_fsync_interval=json_fsync_interval,
+                json_compact=json_compact,
+                json_flush_interval=json_flush_interval,
+                json_max_pending_writes=json_max_pending_writes,
+                json_journal=json_journal,
+                workers=workers,
+                chunk_size=chunk_size,
+            )
+        )
 
     if new_storage_details is not None:
         default_dirs["STORAGE_TYPE"] = target.value
@@ -557,6 +839,52 @@ def backup(instance: str, destination_folder: Path) -> None:
     asyncio.run(create_backup(instance, destination_folder))
 
 
+@cli.command(name="export-data")
+@click.argument("instance", type=click.Choice(instance_list), metavar="<INSTANCE_NAME>")
+@click.argument(
+    "destination",
+    type=click.Path(dir_okay=False, resolve_path=True, writable=True, path_type=Path),
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Number of documents to fetch from the backend at once.",
+)
+def export_data_command(instance: str, destination: Path, batch_size: int) -> None:
+    """Export instance's Config data as newline-delimited JSON.
+
+    The data is written one document per line, so that it never has to
+    be held in memory at once. Use a destination ending in .gz to
+    compress it. The export can be restored into an instance using any
+    backend with the import-data command.
+    """
+    asyncio.run(export_data(instance, destination, batch_size=batch_size))
+
+
+@cli.command(name="import-data")
+@click.argument("instance", type=click.Choice(instance_list), metavar="<INSTANCE_NAME>")
+@click.argument(
+    "source",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True, path_type=Path),
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Number of documents to store in the backend at once.",
+)
+def import_data_command(instance: str, source: Path, chunk_size: int) -> None:
+    """Import Config data exported with the export-data command.
+
+    Documents in the export replace those stored under the same keys.
+    Any other data stored by the instance is kept.
+    """
+    asyncio.run(import_data(instance, source, chunk_size=chunk_size))
+
+
 def run_cli():
     # Setuptools entry point script stuff...
     try:
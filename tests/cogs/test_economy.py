@@ -1,4 +1,7 @@
+import asyncio
+
 import pytest
+from redbot.core import errors
 from redbot.pytest.economy import *
 
 
@@ -73,3 +76,18 @@ async def test_nonint_transaction_amount(bank, member_factory):
         await bank.withdraw_credits(mbr1, 1.0)
     with pytest.raises(TypeError):
         await bank.transfer_credits(mbr1, mbr2, 1.0)
+
+
+async def test_concurrent_deposits_respect_max_balance(bank, member_factory):
+    mbr = member_factory.get()
+    await bank.set_max_balance(1000, mbr.guild)
+    await bank.set_balance(mbr, 400)
+    results = await asyncio.gather(
+        bank.deposit_credits(mbr, 400), bank.deposit_credits(mbr, 400), return_exceptions=True
+    )
+    # Together they'd exceed the maximum, but one of them fits
+    assert sorted(map(type, results), key=lambda t: t.__name__) == [
+        errors.BalanceTooHigh,
+        int,
+    ]
+    assert await bank.get_balance(mbr) == 800
@@ -20,16 +20,21 @@ def event_loop(request):
 
 
 def _get_backend_type():
-    if os.getenv("RED_STORAGE_TYPE") == "postgres":
+    storage_type = os.getenv("RED_STORAGE_TYPE")
+    if storage_type == "postgres":
         return _drivers.BackendType.POSTGRES
+    elif storage_type == "sqlite":
+        return _drivers.BackendType.SQLITE
     else:
         return _drivers.BackendType.JSON
 
 
 @pytest.fixture(scope="session", autouse=True)
-async def _setup_driver():
+async def _setup_driver(tmp_path_factory):
     backend_type = _get_backend_type()
     storage_details = {}
+    if backend_type == _drivers.BackendType.SQLITE:
+        storage_details["path"] = tmp_path_factory.mktemp("sqlite") / "config.sqlite3"
     data_manager.storage_type = lambda: backend_type.value
     data_manager.storage_details = lambda: storage_details
     driver_cls = _drivers.get_driver_class(backend_type)
@@ -1,5 +1,7 @@
 import inspect
 import datetime
+from copy import copy
+from types import SimpleNamespace
 from dateutil.relativedelta import relativedelta
 
 import pytest
@@ -69,3 +71,38 @@ def test_converter_relativedelta():
     assert converter.parse_relativedelta("1 year 10 days 3 seconds") == relativedelta(
         years=1, days=10, seconds=3
     )
+
+
+async def test_get_cached_context(red, monkeypatch):
+    monkeypatch.setattr(red._connection, "user", SimpleNamespace(id=1), raising=False)
+    await red._prefix_cache.set_prefixes(prefixes=["!"])
+    author = SimpleNamespace(id=2, bot=False)
+    message = SimpleNamespace(
+        id=3, content="!notacommand arg", guild=None, author=author, _state=None
+    )
+
+    ctx = await red.get_cached_context(message)
+    assert ctx.prefix == "!"
+    assert ctx.invoked_with == "notacommand"
+    assert ctx.command is None
+
+    async def get_context(*args, **kwargs):
+        raise AssertionError("The cached context wasn't used")
+
+    monkeypatch.setattr(red, "get_context", get_context)
+    ctx.view.skip_ws()
+    ctx.view.get_word()
+    ctx.prefix = None
+    reused = await red.get_cached_context(message)
+    assert reused is not ctx
+    assert reused.prefix == "!"
+    assert reused.view.index < ctx.view.index
+
+    # Messages which can't be commands don't need get_context()
+    plain_message = SimpleNamespace(id=4, content="hello", guild=None, author=author, _state=None)
+    assert (await red.get_cached_context(plain_message)).prefix is None
+
+    # A copy of the message, e.g. made by Alias, has the same ID but gets its own context
+    new_message = copy(message)
+    new_message.content = "hello"
+    assert (await red.get_cached_context(new_message)).prefix is None
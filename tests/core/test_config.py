@@ -1,8 +1,12 @@
 import asyncio
+import datetime
 from unittest.mock import patch
 import pytest
 from collections import Counter
 
+from redbot.core.config import Group
+from redbot.core.errors import StoredTypeError
+
 
 # region Register Tests
 async def test_config_register_global(config):
@@ -106,6 +110,20 @@ def test_nested_group_value_badreg(config):
         config.register_global(foo__bar=False)
 
 
+def test_accessors_reused_until_registration(config, empty_guild):
+    config.register_guild(enabled=True)
+    group = config.guild(empty_guild)
+    assert config.guild(empty_guild) is group
+    value = group.foo
+    assert group.foo is value
+    assert value.default is None
+
+    config.register_guild(foo={"bar": 1})
+    assert config.guild(empty_guild) is not group
+    assert isinstance(group.foo, Group)
+    assert group.foo.bar.default == 1
+
+
 async def test_nested_toplevel_reg(config):
     defaults = {"bar": True, "baz": False}
     config.register_global(foo=defaults)
@@ -226,6 +244,43 @@ async def test_membergroup_allmembers(config, empty_member):
     assert empty_member.id in all_members
 
 
+async def test_iter_all_members(config, member_factory):
+    config.register_member(foo=True, bar=0)
+    members = [member_factory.get() for _ in range(5)]
+    for idx, member in enumerate(members):
+        await config.member(member).bar.set(idx)
+
+    expected = {
+        (member.guild.id, member.id): {"foo": True, "bar": idx}
+        for idx, member in enumerate(members)
+    }
+    assert {
+        (guild_id, member_id): data
+        async for guild_id, member_id, data in config.iter_all_members(batch_size=2)
+    } == expected
+
+    guild = members[0].guild
+    assert [
+        (guild_id, member_id, data)
+        async for guild_id, member_id, data in config.iter_all_members(guild, batch_size=2)
+    ] == [(guild.id, members[0].id, {"foo": True, "bar": 0})]
+
+
+async def test_iter_all_guilds_while_clearing(config, guild_factory):
+    config.register_guild(foo=True)
+    guilds = [guild_factory.get() for _ in range(5)]
+    for guild in guilds:
+        await config.guild(guild).foo.set(False)
+
+    seen = []
+    async for guild_id, data in config.iter_all_guilds(batch_size=2):
+        assert data == {"foo": False}
+        seen.append(guild_id)
+        await config.guild_from_id(guild_id).clear()
+    assert sorted(seen) == sorted(guild.id for guild in guilds)
+    assert await config.all_guilds() == {}
+
+
 # Clearing testing
 async def test_global_clear(config):
     config.register_global(foo=True, bar=False)
@@ -372,7 +427,7 @@ async def test_ctxmgr_no_shared_default(config, member_factory):
 async def test_ctxmgr_no_unnecessary_write(config):
     config.register_global(foo=[])
     foo_value_obj = config.foo
-    with patch.object(foo_value_obj, "set") as set_method:
+    with patch.object(type(foo_value_obj), "set") as set_method:
         async with foo_value_obj() as foo:
             pass
         set_method.assert_not_called()
@@ -538,6 +593,259 @@ async def test_raw_with_partial_primary_keys(config):
     assert await config.custom("CUSTOM", "primary_key").identifier() is False
 
 
+async def test_returned_data_is_not_shared(config, empty_member):
+    config.register_member(tags=[], level=0)
+    await config.member(empty_member).tags.set(["a"])
+    await config.member(empty_member).level.set(5)
+
+    for data in (
+        await config.member(empty_member).all(),
+        await config.member(empty_member).get_raw(),
+        (await config.all_members(empty_member.guild))[empty_member.id],
+        (await config.all_members())[empty_member.guild.id][empty_member.id],
+    ):
+        data["tags"].append("b")
+        data["level"] += 1
+    tags = await config.member(empty_member).tags()
+    tags.append("c")
+
+    assert await config.member(empty_member).all() == {"tags": ["a"], "level": 5}
+
+
+async def test_registered_defaults_are_not_shared(config, empty_guild, empty_member):
+    config.register_guild(tags=[], nested={"foo": [], "bar": 0})
+    config.register_member(tags=[])
+
+    (await config.guild(empty_guild).tags()).append("a")
+    (await config.guild(empty_guild).get_raw("nested", "foo")).append("a")
+    (await config.guild(empty_guild).nested())["foo"].append("a")
+    (await config.guild(empty_guild).all())["tags"].append("a")
+    await config.member(empty_member).set_raw("unregistered", value=True)
+    (await config.all_members(empty_member.guild))[empty_member.id]["tags"].append("a")
+
+    assert await config.guild(empty_guild).all() == {
+        "tags": [],
+        "nested": {"foo": [], "bar": 0},
+    }
+    assert config.defaults["MEMBER"] == {"tags": []}
+    assert await config.member(empty_member).all() == {"tags": [], "unregistered": True}
+
+
+async def test_transaction_commits_on_exit(config, empty_member):
+    config.register_member(balance=0, name="")
+    group = config.member(empty_member)
+    with patch.object(config._driver, "set", wraps=config._driver.set) as set_mock:
+        async with config.transaction():
+            await group.balance.set(100)
+            await group.name.set("Red")
+            assert await group.balance() == 0
+        assert set_mock.call_count == 0
+    assert await group.all() == {"balance": 100, "name": "Red"}
+
+
+async def test_batch_discarded_on_error(config, empty_member):
+    config.register_member(balance=0, name="")
+    group = config.member(empty_member)
+    await group.balance.set(10)
+    with pytest.raises(RuntimeError):
+        async with group.batch():
+            await group.balance.clear()
+            await group.name.set("Red")
+            raise RuntimeError
+    assert await group.all() == {"balance": 10, "name": ""}
+
+    async with group.batch():
+        async with group.batch():
+            await group.balance.clear()
+        await group.set_raw("name", value="Red")
+    assert await group.all() == {"balance": 0, "name": "Red"}
+
+
+async def test_task_created_in_batch_writes_after_exit(config, empty_member):
+    config.register_member(balance=0, name="")
+    group = config.member(empty_member)
+    can_write = asyncio.Event()
+
+    async def write_later():
+        await can_write.wait()
+        await group.name.set("Red")
+
+    async with config.transaction():
+        await group.balance.set(100)
+        task = asyncio.create_task(write_later())
+    can_write.set()
+    await task
+    assert await group.all() == {"balance": 100, "name": "Red"}
+
+
+async def test_ctxmgr_in_transaction_commits_before_unlocking(config, empty_member):
+    config.register_member(tags=[])
+    group = config.member(empty_member)
+    tagged = asyncio.Event()
+
+    async def tag_later():
+        await tagged.wait()
+        async with group.tags() as tags:
+            tags.append("b")
+
+    task = asyncio.create_task(tag_later())
+    async with config.transaction():
+        async with group.tags() as tags:
+            tags.append("a")
+        tagged.set()
+        await task
+    assert await group.tags() == ["a", "b"]
+
+
+async def test_value_inc(config, empty_member):
+    config.register_member(count=10, enabled=False)
+    group = config.member(empty_member)
+    assert await group.count.inc() == 11
+    assert await group.count.inc(-5) == 6
+    assert await group.count.inc(0.5) == 6.5
+    assert await group.count() == 6.5
+
+    await asyncio.gather(*(group.count.inc(1) for _ in range(10)))
+    assert await group.count() == 16.5
+
+    with pytest.raises(TypeError):
+        await group.count.inc("1")
+    await group.enabled.set(True)
+    with pytest.raises(StoredTypeError):
+        await group.enabled.inc()
+
+
+async def test_value_toggle(config, empty_guild):
+    config.register_guild(enabled=False, name="")
+    assert await config.guild(empty_guild).enabled.toggle() is True
+    assert await config.guild(empty_guild).enabled.toggle() is False
+    assert await config.guild(empty_guild).enabled() is False
+    await config.guild(empty_guild).name.set("Red")
+    with pytest.raises(StoredTypeError):
+        await config.guild(empty_guild).name.toggle()
+
+
+async def test_group_get_fields(config, empty_member):
+    config.register_member(count=0, settings={"a": 1, "b": 2}, name="")
+    group = config.member(empty_member)
+    assert await group.get_fields("count", "settings") == {
+        "count": 0,
+        "settings": {"a": 1, "b": 2},
+    }
+
+    await group.count.set(5)
+    await group.settings.set_raw("a", value=10)
+    await group.set_raw("unregistered", value=True)
+    data = await group.get_fields("count", "settings", "unregistered", "missing")
+    assert data == {"count": 5, "settings": {"a": 10, "b": 2}, "unregistered": True}
+
+    data["settings"]["b"] = 20
+    assert await group.settings.b() == 2
+
+
+async def test_custom_group_find(config):
+    config.init_custom("CASES", 2, index_on=("user",))
+    await config.custom("CASES", 1, 1).set({"user": 10, "moderator": 20})
+    await config.custom("CASES", 1, 2).set({"user": 11, "moderator": 20})
+    await config.custom("CASES", 2, 1).set({"user": 10, "moderator": 21})
+
+    assert await config.custom("CASES").find(user=10) == {
+        "1": {"1": {"user": 10, "moderator": 20}},
+        "2": {"1": {"user": 10, "moderator": 21}},
+    }
+    assert await config.custom("CASES", 1).find(user=10, moderator=20) == {
+        "1": {"user": 10, "moderator": 20}
+    }
+    assert await config.custom("CASES", 1).find(user=10, moderator=21) == {}
+
+    # The index follows writes
+    await config.custom("CASES", 1, 2).set_raw("user", value=10)
+    await config.custom("CASES", 2).clear()
+    assert sorted(await config.custom("CASES", 1).find(user=10)) == ["1", "2"]
+    assert await config.custom("CASES", 2).find(user=10) == {}
+    await config.custom("CASES").set({"3": {"1": {"user": 10}}})
+    assert await config.custom("CASES").find(user=10) == {"3": {"1": {"user": 10}}}
+
+    with pytest.raises(ValueError):
+        await config.custom("CASES", 1).find(moderator=20)
+    with pytest.raises(ValueError):
+        await config.custom("CASES", 1, 1).find(user=10)
+
+
+async def test_value_set_expires_at(config, empty_member):
+    config.register_member(muted_until=None)
+    driver_cls = type(config._driver)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    value = config.member(empty_member).muted_until
+
+    await value.set(1, expires_at=now + datetime.timedelta(minutes=5))
+    assert await driver_cls.pop_expired(now.timestamp()) == []
+    expired = await driver_cls.pop_expired(now.timestamp() + 600)
+    assert expired == [value.identifier_data]
+    # Expiries are only returned once
+    assert await driver_cls.pop_expired(now.timestamp() + 600) == []
+
+    await value.set(2, expires_at=now + datetime.timedelta(minutes=5))
+    await value.set(3)
+    await value.set(4, expires_at=None)
+    assert await driver_cls.pop_expired(now.timestamp() + 600) == []
+    assert await value() == 4
+
+
+async def test_expiry_is_part_of_transaction(config, empty_member):
+    config.register_member(muted_until=None)
+    driver_cls = type(config._driver)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    value = config.member(empty_member).muted_until
+    await value.set(7)
+
+    with pytest.raises(RuntimeError):
+        async with config.transaction():
+            await value.set(8, expires_at=now + datetime.timedelta(minutes=5))
+            raise RuntimeError
+    assert await value() == 7
+    assert await driver_cls.pop_expired(now.timestamp() + 600) == []
+
+    async with config.transaction():
+        await value.set(8, expires_at=now + datetime.timedelta(minutes=5))
+        assert await driver_cls.pop_expired(now.timestamp() + 600) == []
+    assert await driver_cls.pop_expired(now.timestamp() + 600) == [value.identifier_data]
+
+
+async def test_clear_removes_expiry(config, empty_member):
+    config.register_member(muted_until=None, roles=[])
+    driver_cls = type(config._driver)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    later = now + datetime.timedelta(minutes=5)
+    member = config.member(empty_member)
+
+    await member.muted_until.set(1, expires_at=later)
+    await member.muted_until.clear()
+    await member.muted_until.set(2)
+    assert await driver_cls.pop_expired(now.timestamp() + 600) == []
+
+    # Clearing any scope containing the value removes its expiry too
+    for clear in (
+        member.clear,
+        config.clear_all_members,
+        config.clear_all,
+    ):
+        await member.muted_until.set(3, expires_at=later)
+        await member.roles.set([1], expires_at=later)
+        await clear()
+        await member.muted_until.set(4)
+        assert await driver_cls.pop_expired(now.timestamp() + 600) == []
+
+    # Other values keep theirs
+    await member.muted_until.set(5, expires_at=later)
+    await member.roles.set([1], expires_at=later)
+    await config.clear_all_globals()
+    await member.roles.clear()
+    assert await driver_cls.pop_expired(now.timestamp() + 600) == [
+        member.muted_until.identifier_data
+    ]
+
+
 @pytest.mark.asyncio
 async def test_cast_subclass_default(config):
     # regression test for GH-5557/GH-5585
@@ -685,3 +993,66 @@ async def test_config_custom_clear_identifiers_that_do_not_exist(config, pkeys,
         # Clear needed to be able to differ between missing config data and missing scope data
         await scope.clear_raw(*to_set)
     await group.clear_raw(*raw_args)
+
+
+async def test_compact(config):
+    config.register_member(xp=0, settings={"notify": True, "colour": None})
+    config.register_global(enabled=True)
+    await config.enabled.set(True)
+    await config.member_from_ids(1, 1).set_raw("xp", value=0)
+    await config.member_from_ids(1, 2).set_raw("xp", value=5)
+    await config.member_from_ids(1, 2).set_raw("settings", value={"notify": True})
+    await config.member_from_ids(1, 3).set_raw("xp", value=False)
+    await config.member_from_ids(2, 1).set_raw("settings", value={})
+    await config.member_from_ids(2, 2).set_raw("extra", value={})
+
+    result = await config.compact(batch_size=2)
+
+    assert result["documents"] == 6
+    assert result["documents_removed"] == 3
+    assert result["documents_compacted"] == 1
+    assert result["bytes_reclaimed"] > 0
+    assert await config.member_from_ids(1, 2).all() == {
+        "xp": 5,
+        "settings": {"notify": True, "colour": None},
+    }
+    assert await config.all_members() == {
+        1: {
+            2: {"xp": 5, "settings": {"notify": True, "colour": None}},
+            3: {"xp": False, "settings": {"notify": True, "colour": None}},
+        },
+        2: {2: {"xp": 0, "settings": {"notify": True, "colour": None}, "extra": {}}},
+    }
+    assert await config.compact() == {
+        "documents": 3,
+        "documents_compacted": 0,
+        "documents_removed": 0,
+        "containers_removed": 0,
+        "bytes_reclaimed": 0,
+    }
+
+
+async def test_clear_if_equal(config):
+    config.register_member(xp=0, settings={})
+    member = config.member_from_ids(1, 2)
+    await member.set_raw("xp", value=1)
+    await member.set_raw("settings", value={"a": [1, True]})
+
+    # Values written since they were read aren't cleared
+    await config._driver.apply_batch(
+        [
+            ("clear_if_equal", member.xp.identifier_data, 0),
+            ("clear_if_equal", member.xp.identifier_data, True),
+            ("clear_if_equal", member.settings.identifier_data, {"a": [1, 1]}),
+            ("clear_if_equal", member.identifier_data.get_child("missing"), None),
+        ]
+    )
+    assert await member.all() == {"xp": 1, "settings": {"a": [1, True]}}
+
+    await config._driver.apply_batch(
+        [
+            ("clear_if_equal", member.xp.identifier_data, 1),
+            ("clear_if_equal", member.settings.identifier_data, {"a": [1, True]}),
+        ]
+    )
+    assert await config._driver.get(member.identifier_data) == {}
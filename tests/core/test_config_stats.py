@@ -0,0 +1,59 @@
+import pytest
+
+from redbot.core import _config_stats
+
+
+@pytest.fixture
+def collector():
+    collector = _config_stats.enable()
+    yield collector
+    _config_stats.disable()
+
+
+async def test_config_stats_disabled(config):
+    config.register_global(foo=1)
+    await config.foo.set(2)
+    assert _config_stats.collector is None
+
+
+async def test_config_stats_records_operations(config, collector):
+    config.register_global(foo=None, bar=0)
+    await config.foo.set({"a": "b"})
+    assert await config.foo() == {"a": "b"}
+    await config.bar.clear()
+    async with config.foo() as foo:
+        foo["c"] = "d"
+
+    stats = collector.to_dict()["cogs"][config.cog_name]
+    global_ops = stats["operations"]["GLOBAL"]
+    assert global_ops["set"]["count"] == 2
+    assert global_ops["set"]["bytes"] == len('{"a": "b"}') + len('{"a": "b", "c": "d"}')
+    assert global_ops["get"]["count"] == 2
+    assert global_ops["clear"]["count"] == 1
+    assert stats["lock_waits"]["GLOBAL"]["count"] == 1
+
+
+async def test_config_stats_records_batches(config, collector):
+    config.register_member(xp=0)
+    async with config.batch():
+        await config.member_from_ids(1, 2).xp.set(5)
+        await config.member_from_ids(1, 3).xp.set(6)
+
+    stats = collector.to_dict()["cogs"][config.cog_name]
+    assert stats["operations"]["MEMBER"]["batch"]["count"] == 1
+    assert stats["operations"]["MEMBER"]["batch"]["bytes"] == len("[5, 6]")
+
+
+async def test_config_stats_splits_batches_by_category(config, collector):
+    config.register_global(foo=0)
+    config.register_member(xp=0)
+    async with config.batch():
+        await config.foo.set(1)
+        await config.member_from_ids(1, 2).xp.set(5)
+        await config.member_from_ids(1, 3).xp.clear()
+
+    operations = collector.to_dict()["cogs"][config.cog_name]["operations"]
+    assert operations["GLOBAL"]["batch"]["count"] == 1
+    assert operations["GLOBAL"]["batch"]["bytes"] == len("[1]")
+    assert operations["MEMBER"]["batch"]["count"] == 1
+    assert operations["MEMBER"]["batch"]["bytes"] == len("[5]")
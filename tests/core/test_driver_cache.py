@@ -0,0 +1,123 @@
+import pytest
+
+from redbot.core._drivers import IdentifierData
+from redbot.core._drivers.cache import ReadCache
+
+
+class FakeStorage:
+    def __init__(self):
+        self.data = {}
+        self.fetches = 0
+
+    async def fetch(self, identifier_data):
+        self.fetches += 1
+        return self.data[identifier_data.to_tuple()]
+
+
+def _member_ident(*pkeys_and_identifiers):
+    pkeys, identifiers = pkeys_and_identifiers[:2], pkeys_and_identifiers[2:]
+    return IdentifierData("PyTest", "1", "MEMBER", pkeys, identifiers, 2)
+
+
+async def test_cache_hits_and_misses():
+    storage = FakeStorage()
+    cache = ReadCache(10)
+    ident = _member_ident("1", "2", "xp")
+    storage.data[ident.to_tuple()] = 5
+
+    assert await cache.get(ident, storage.fetch) == 5
+    assert await cache.get(ident, storage.fetch) == 5
+    assert storage.fetches == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "max_size": 10}
+
+    # Values which aren't stored are cached as well
+    missing = _member_ident("1", "2", "level")
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            await cache.get(missing, storage.fetch)
+    assert storage.fetches == 2
+
+
+async def test_cache_evicts_least_recently_used():
+    storage = FakeStorage()
+    cache = ReadCache(2)
+    idents = [_member_ident("1", str(i)) for i in range(3)]
+    for ident in idents:
+        storage.data[ident.to_tuple()] = {}
+
+    await cache.get(idents[0], storage.fetch)
+    await cache.get(idents[1], storage.fetch)
+    await cache.get(idents[0], storage.fetch)
+    await cache.get(idents[2], storage.fetch)
+    assert len(cache) == 2
+
+    await cache.get(idents[0], storage.fetch)
+    assert storage.fetches == 3
+    await cache.get(idents[1], storage.fetch)
+    assert storage.fetches == 4
+
+
+async def test_cache_invalidates_overlapping_paths():
+    storage = FakeStorage()
+    cache = ReadCache(10)
+    paths = {
+        "guild": _member_ident("1"),
+        "member": _member_ident("1", "2"),
+        "xp": _member_ident("1", "2", "xp"),
+        "other_member": _member_ident("1", "3"),
+        "other_guild": _member_ident("4", "2"),
+    }
+    for ident in paths.values():
+        storage.data[ident.to_tuple()] = {}
+        await cache.get(ident, storage.fetch)
+
+    cache.invalidate(_member_ident("1", "2", "xp"))
+    assert len(cache) == 2
+    cache.invalidate(_member_ident("4"))
+    assert len(cache) == 1
+
+    await cache.get(paths["other_member"], storage.fetch)
+    assert storage.fetches == 5
+
+
+async def test_cache_skips_reads_racing_with_writes():
+    cache = ReadCache(10)
+    ident = _member_ident("1", "2")
+
+    async def fetch(identifier_data):
+        cache.invalidate(identifier_data)
+        return {"xp": 0}
+
+    assert await cache.get(ident, fetch) == {"xp": 0}
+    assert len(cache) == 0
+
+
+async def test_cache_invalidates_whole_cog():
+    storage = FakeStorage()
+    cache = ReadCache(10)
+    for ident in (_member_ident("1", "2"), _member_ident("1", "2", "xp")):
+        storage.data[ident.to_tuple()] = {}
+        await cache.get(ident, storage.fetch)
+
+    other_cog = IdentifierData("Other", "1", "MEMBER", ("1", "2"), (), 2)
+    storage.data[other_cog.to_tuple()] = {}
+    await cache.get(other_cog, storage.fetch)
+
+    # As done by Config.clear_all()
+    cache.invalidate(IdentifierData("PyTest", "1", "", (), (), 0))
+    assert len(cache) == 1
+    fetches = storage.fetches
+    await cache.get(_member_ident("1", "2"), storage.fetch)
+    assert storage.fetches == fetches + 1
+
+
+async def test_cache_invalidates_whole_category():
+    storage = FakeStorage()
+    cache = ReadCache(10)
+    for ident in (_member_ident("1", "2"), _member_ident("3", "4", "xp")):
+        storage.data[ident.to_tuple()] = {}
+        await cache.get(ident, storage.fetch)
+
+    # As done by Config.clear_all_members()
+    cache.invalidate(IdentifierData("PyTest", "1", "MEMBER", (), (), 2))
+    assert len(cache) == 0
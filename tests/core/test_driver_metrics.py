@@ -0,0 +1,27 @@
+from redbot.core._drivers.metrics import LatencyHistogram
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.to_dict()["p99_ms"] == 0.0
+
+    for _ in range(90):
+        histogram.observe(0.0008)
+    for _ in range(10):
+        histogram.observe(0.2)
+    histogram.observe(7)
+
+    summary = histogram.to_dict()
+    assert summary["count"] == 101
+    assert summary["p50_ms"] == 1
+    assert summary["p95_ms"] == 250
+    assert summary["p99_ms"] == 250
+    assert summary["max_ms"] == 7000
+    assert summary["buckets"]["<=1ms"] == 90
+    assert summary["buckets"][">5000ms"] == 1
+
+
+def test_latency_histogram_percentile_capped_at_max():
+    histogram = LatencyHistogram()
+    histogram.observe(0.003)
+    assert histogram.percentile(50) == 3.0
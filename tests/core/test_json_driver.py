@@ -0,0 +1,345 @@
+import io
+import json
+import random
+import uuid
+from pathlib import Path
+
+import pytest
+
+from redbot.core._drivers import IdentifierData, JsonDriver
+from redbot.core._drivers import json as json_driver_module
+
+
+@pytest.fixture()
+def json_driver(tmpdir_factory):
+    path = Path(str(tmpdir_factory.mktemp(str(uuid.uuid4()))))
+    cog_name = f"PyTestJson{random.randint(1, 999999)}"
+    return JsonDriver(cog_name, str(random.randint(1, 999999)), data_path_override=path)
+
+
+def _member_ident(driver, guild_id, member_id, *identifiers):
+    return IdentifierData(
+        driver.cog_name,
+        driver.unique_cog_identifier,
+        "MEMBER",
+        (guild_id, member_id),
+        identifiers,
+        2,
+    )
+
+
+def _read_file(driver):
+    with driver.data_path.open(encoding="utf-8") as fs:
+        return json.load(fs)
+
+
+async def test_coalesced_writes_flush_on_teardown(json_driver):
+    await JsonDriver.initialize(flush_interval=3600)
+    try:
+        await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), 5)
+        assert await json_driver.get(_member_ident(json_driver, "1", "2", "xp")) == 5
+        assert _read_file(json_driver) == {}
+    finally:
+        await JsonDriver.teardown()
+        await JsonDriver.initialize()
+
+    uuid_ = json_driver.unique_cog_identifier
+    assert _read_file(json_driver) == {uuid_: {"MEMBER": {"1": {"2": {"xp": 5}}}}}
+
+
+async def test_coalesced_writes_flush_after_max_pending(json_driver):
+    await JsonDriver.initialize(flush_interval=3600, max_pending_writes=3)
+    try:
+        for xp in range(2):
+            await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), xp)
+        assert _read_file(json_driver) == {}
+        await json_driver.set(_member_ident(json_driver, "1", "3", "xp"), 10)
+        uuid_ = json_driver.unique_cog_identifier
+        assert _read_file(json_driver) == {
+            uuid_: {"MEMBER": {"1": {"2": {"xp": 1}, "3": {"xp": 10}}}}
+        }
+    finally:
+        await JsonDriver.teardown()
+        await JsonDriver.initialize()
+
+
+def _guild_ident(driver, *pkeys_and_identifiers):
+    pkeys, identifiers = pkeys_and_identifiers[:1], pkeys_and_identifiers[1:]
+    return IdentifierData(
+        driver.cog_name, driver.unique_cog_identifier, "GUILD", pkeys, identifiers, 1
+    )
+
+
+def _reload(driver):
+    # Drop the cog's data from memory, as if the bot was restarted.
+    json_driver_module._shared_datastore.pop(driver.cog_name)
+    json_driver_module._loaded_shards.pop(driver.cog_name, None)
+    json_driver_module._encoded_scopes.pop(driver.cog_name, None)
+    return JsonDriver(
+        driver.cog_name, driver.unique_cog_identifier, data_path_override=driver.data_path.parent
+    )
+
+
+async def test_sharded_layout_writes_one_shard_per_guild(json_driver):
+    await JsonDriver.initialize(layout="sharded")
+    try:
+        await json_driver.set(_guild_ident(json_driver, "1", "prefix"), "!")
+        await json_driver.set(_guild_ident(json_driver, "2", "prefix"), "?")
+        await json_driver.set(_member_ident(json_driver, "1", "3", "xp"), 5)
+
+        uuid_ = json_driver.unique_cog_identifier
+        shard_root = json_driver.data_path.parent / "settings_shards" / uuid_
+        with (shard_root / "GUILD" / "1.json").open() as fs:
+            assert json.load(fs) == {"prefix": "!"}
+        with (shard_root / "MEMBER" / "1.json").open() as fs:
+            assert json.load(fs) == {"3": {"xp": 5}}
+        assert _read_file(json_driver) == {uuid_: {}}
+
+        await json_driver.clear(_guild_ident(json_driver, "2"))
+        assert not (shard_root / "GUILD" / "2.json").exists()
+
+        json_driver = _reload(json_driver)
+        assert json_driver.data == {uuid_: {}}
+        assert await json_driver.get(_guild_ident(json_driver, "1", "prefix")) == "!"
+        assert json_driver.data == {uuid_: {"GUILD": {"1": {"prefix": "!"}}}}
+        assert await json_driver.get(_member_ident(json_driver, "1", "3")) == {"xp": 5}
+    finally:
+        await JsonDriver.initialize()
+
+
+async def test_layout_conversion_round_trip(json_driver):
+    uuid_ = json_driver.unique_cog_identifier
+    await json_driver.set(_guild_ident(json_driver, "1", "prefix"), "!")
+    await json_driver.set(_member_ident(json_driver, "1", "3", "xp"), 5)
+    expected = await json_driver.get(_guild_ident(json_driver))
+
+    await JsonDriver.initialize(layout="sharded")
+    try:
+        json_driver = _reload(json_driver)
+        assert _read_file(json_driver) == {uuid_: {}}
+        assert (json_driver.data_path.parent / "settings_shards" / uuid_ / "GUILD").is_dir()
+        assert await json_driver.get(_guild_ident(json_driver)) == expected
+    finally:
+        await JsonDriver.initialize()
+
+    json_driver = _reload(json_driver)
+    assert not (json_driver.data_path.parent / "settings_shards").exists()
+    assert _read_file(json_driver) == {
+        uuid_: {"GUILD": {"1": {"prefix": "!"}}, "MEMBER": {"1": {"3": {"xp": 5}}}}
+    }
+
+
+async def test_journal_is_replayed_after_crash(json_driver):
+    uuid_ = json_driver.unique_cog_identifier
+    journal_path = json_driver.data_path.with_suffix(".journal")
+    await JsonDriver.initialize(journal=True)
+    try:
+        await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), 5)
+        await json_driver.set(_member_ident(json_driver, "1", "3", "xp"), 10)
+        await json_driver.clear(_member_ident(json_driver, "1", "3"))
+        assert _read_file(json_driver) == {}
+        with journal_path.open() as fs:
+            assert len(fs.readlines()) == 3
+
+        # Simulate the bot stopping without flushing, midway through appending a record
+        json_driver_module._dirty_paths.pop(json_driver.cog_name)
+        json_driver_module._dirty_units.pop(json_driver.cog_name)
+        with journal_path.open("a") as fs:
+            fs.write('{"op": "set", "path": ["')
+        json_driver = _reload(json_driver)
+    finally:
+        await JsonDriver.teardown()
+        await JsonDriver.initialize()
+
+    assert await json_driver.get(_member_ident(json_driver, "1", "2")) == {"xp": 5}
+    assert _read_file(json_driver) == {uuid_: {"MEMBER": {"1": {"2": {"xp": 5}}}}}
+    assert journal_path.read_text() == ""
+
+
+async def test_batch_is_journaled_as_one_record(json_driver):
+    uuid_ = json_driver.unique_cog_identifier
+    journal_path = json_driver.data_path.with_suffix(".journal")
+    await JsonDriver.initialize(journal=True)
+    try:
+        await json_driver.apply_batch(
+            [
+                ("set", _member_ident(json_driver, "1", "2", "xp"), 5),
+                ("set", _member_ident(json_driver, "1", "3", "xp"), 10),
+                ("clear", _member_ident(json_driver, "1", "3"), None),
+            ]
+        )
+        with journal_path.open() as fs:
+            assert len(fs.readlines()) == 1
+
+        json_driver_module._dirty_paths.pop(json_driver.cog_name)
+        json_driver_module._dirty_units.pop(json_driver.cog_name)
+        json_driver = _reload(json_driver)
+    finally:
+        await JsonDriver.teardown()
+        await JsonDriver.initialize()
+
+    assert _read_file(json_driver) == {uuid_: {"MEMBER": {"1": {"2": {"xp": 5}}}}}
+
+
+async def test_cogs_only_in_journal_are_listed():
+    json_driver = JsonDriver(f"PyTestJson{random.randint(1, 999999)}", str(uuid.uuid4()))
+    await JsonDriver.initialize(journal=True)
+    try:
+        await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), 5)
+        # Simulate the bot stopping before flushing
+        json_driver_module._dirty_paths.pop(json_driver.cog_name)
+        json_driver_module._dirty_units.pop(json_driver.cog_name)
+        assert _read_file(json_driver) == {}
+        cogs = [cog async for cog in JsonDriver.aiter_cogs()]
+        assert (json_driver.cog_name, json_driver.unique_cog_identifier) in cogs
+    finally:
+        await JsonDriver.teardown()
+        await JsonDriver.initialize()
+
+
+async def test_pending_writes_are_flushed_before_listing_cogs():
+    json_driver = JsonDriver(f"PyTestJson{random.randint(1, 999999)}", str(uuid.uuid4()))
+    await JsonDriver.initialize(flush_interval=3600)
+    try:
+        await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), 5)
+        cogs = [cog async for cog in JsonDriver.aiter_cogs()]
+        assert (json_driver.cog_name, json_driver.unique_cog_identifier) in cogs
+        assert _read_file(json_driver) != {}
+    finally:
+        await JsonDriver.teardown()
+        await JsonDriver.initialize()
+
+
+@pytest.mark.parametrize("fsync", ["interval", "shutdown"])
+async def test_deferred_fsync(json_driver, monkeypatch, fsync):
+    synced = []
+    monkeypatch.setattr(json_driver_module.os, "fsync", synced.append)
+    await JsonDriver.initialize(fsync=fsync, fsync_interval_ms=3600 * 1000)
+    try:
+        await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), 5)
+        # The file is still replaced straight away, but not fsynced
+        uuid_ = json_driver.unique_cog_identifier
+        assert _read_file(json_driver) == {uuid_: {"MEMBER": {"1": {"2": {"xp": 5}}}}}
+        assert synced == []
+        assert json_driver.data_path in json_driver_module._unsynced_paths
+    finally:
+        await JsonDriver.teardown()
+        await JsonDriver.initialize()
+
+    assert len(synced) == 2
+    assert not json_driver_module._unsynced_paths
+
+
+async def test_teardown_resets_settings():
+    defaults = {
+        name: getattr(JsonDriver, name)
+        for name in (
+            "_flush_interval",
+            "_journal",
+            "_layout",
+            "_max_pending_writes",
+            "_fsync",
+            "_fsync_interval",
+            "_compact",
+        )
+    }
+    await JsonDriver.teardown()
+    try:
+        await JsonDriver.initialize(
+            flush_interval=3600,
+            max_pending_writes=3,
+            journal=True,
+            layout="sharded",
+            fsync="shutdown",
+            fsync_interval_ms=5,
+            compact=True,
+        )
+        await JsonDriver.teardown()
+        assert {name: getattr(JsonDriver, name) for name in defaults} == defaults
+    finally:
+        await JsonDriver.initialize()
+
+
+async def test_invalid_fsync_policy():
+    with pytest.raises(ValueError):
+        await JsonDriver.initialize(fsync="never")
+
+
+async def test_remove_empty_containers(json_driver):
+    await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), 5)
+    await json_driver.set(_member_ident(json_driver, "3", "4", "xp"), 5)
+    await json_driver.clear(_member_ident(json_driver, "3", "4"))
+    category = IdentifierData(
+        json_driver.cog_name, json_driver.unique_cog_identifier, "MEMBER", (), (), 2
+    )
+
+    assert await json_driver.remove_empty_containers(category) == 1
+    uuid_ = json_driver.unique_cog_identifier
+    assert _read_file(json_driver) == {uuid_: {"MEMBER": {"1": {"2": {"xp": 5}}}}}
+
+    await json_driver.clear(_member_ident(json_driver, "1", "2"))
+    assert await json_driver.remove_empty_containers(category) == 1
+    assert _read_file(json_driver) == {uuid_: {}}
+    assert await json_driver.remove_empty_containers(category) == 0
+
+
+async def test_compact_mode_decodes_member_scopes_lazily(json_driver):
+    uuid_ = json_driver.unique_cog_identifier
+    await json_driver.set(_guild_ident(json_driver, "1", "prefix"), "!")
+    await json_driver.set(_member_ident(json_driver, "1", "3", "xp"), 5)
+    await json_driver.set(_member_ident(json_driver, "2", "4", "xp"), 6)
+    expected = _read_file(json_driver)
+
+    await JsonDriver.initialize(compact=True)
+    try:
+        json_driver = _reload(json_driver)
+        usage = await JsonDriver.get_memory_usage()
+        assert usage[json_driver.cog_name]["encoded_scopes"] == 2
+        assert usage[json_driver.cog_name]["resident_bytes"] > 0
+
+        assert await json_driver.get(_member_ident(json_driver, "1", "3", "xp")) == 5
+        usage = await JsonDriver.get_memory_usage()
+        assert usage[json_driver.cog_name]["encoded_scopes"] == 1
+
+        # The guild which is still encoded is written out as it was read
+        await json_driver.set(_member_ident(json_driver, "1", "5", "xp"), 7)
+        expected[uuid_]["MEMBER"]["1"]["5"] = {"xp": 7}
+        assert _read_file(json_driver) == expected
+    finally:
+        await JsonDriver.initialize()
+
+    # Encoded scopes left in memory are still written correctly after compact mode is disabled
+    await json_driver.set(_guild_ident(json_driver, "1", "prefix"), "?")
+    expected[uuid_]["GUILD"]["1"]["prefix"] = "?"
+    assert _read_file(json_driver) == expected
+    member_ident = IdentifierData(json_driver.cog_name, uuid_, "MEMBER", (), (), 2)
+    assert await json_driver.get(member_ident) == expected[uuid_]["MEMBER"]
+    assert json_driver.cog_name not in json_driver_module._encoded_scopes
+
+
+def test_compact_mode_streams_encoded_scopes(monkeypatch):
+    monkeypatch.setattr(JsonDriver, "_compact", True)
+    writes = []
+
+    class RecordingIO(io.StringIO):
+        def write(self, text):
+            writes.append(text)
+            return super().write(text)
+
+    data = {
+        "MEMBER": {
+            "1": json_driver_module._EncodedScope('{"2": {"xp": 5}}'),
+            "3": {"4": {"xp": 6}},
+        },
+        "GLOBAL": {"names": ["a", json_driver_module._EncodedScope("[1]")]},
+    }
+    fs = RecordingIO()
+    json_driver_module._dump_json(data, fs)
+
+    assert json.loads(fs.getvalue()) == {
+        "MEMBER": {"1": {"2": {"xp": 5}}, "3": {"4": {"xp": 6}}},
+        "GLOBAL": {"names": ["a", [1]]},
+    }
+    # Written in pieces, rather than as one string
+    assert len(writes) > 1
+    assert '{"2": {"xp": 5}}' in writes
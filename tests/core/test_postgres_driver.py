@@ -0,0 +1,201 @@
+import asyncio
+import io
+import json
+import os
+import random
+
+import pytest
+
+from redbot.core import data_manager
+from redbot.core._drivers import IdentifierData, PostgresDriver
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("RED_STORAGE_TYPE") != "postgres",
+    reason="Needs a PostgreSQL server, see `tox -e postgres`",
+)
+
+
+@pytest.fixture()
+def pg_driver():
+    return PostgresDriver("PyTestPostgres", str(random.randint(1, 999999)))
+
+
+def _member_ident(driver, *pkeys_and_identifiers):
+    pkeys, identifiers = pkeys_and_identifiers[:2], pkeys_and_identifiers[2:]
+    return IdentifierData(
+        driver.cog_name, driver.unique_cog_identifier, "MEMBER", pkeys, identifiers, 2
+    )
+
+
+async def test_teardown_stops_reconnecting(pg_driver):
+    await pg_driver.add_invalidation_listener("MEMBER", lambda identifier_data: None)
+    conn = PostgresDriver._listener_conn
+    # As if the connection was lost just before the bot shut down
+    PostgresDriver._on_listener_terminated(conn)
+    reconnect_task = PostgresDriver._reconnect_task
+    assert reconnect_task is not None
+
+    await PostgresDriver.teardown()
+    try:
+        await conn.close()
+        assert PostgresDriver._pool is None
+        assert PostgresDriver._reconnect_task is None
+        await asyncio.sleep(0)
+        assert reconnect_task.cancelled()
+        # Nothing is left to reconnect through
+        await asyncio.wait_for(PostgresDriver._reconnect_listener(), 1)
+        assert PostgresDriver._listener_conn is None
+    finally:
+        await PostgresDriver.initialize(**data_manager.storage_details())
+
+
+async def _wait_for(queue: "asyncio.Queue[IdentifierData]") -> IdentifierData:
+    return await asyncio.wait_for(queue.get(), 5)
+
+
+async def test_writes_are_notified(pg_driver):
+    notified: "asyncio.Queue[IdentifierData]" = asyncio.Queue()
+    await pg_driver.add_invalidation_listener("MEMBER", notified.put_nowait)
+
+    await pg_driver.set(_member_ident(pg_driver, "1", "2", "xp"), 5)
+    identifier_data = await _wait_for(notified)
+    assert identifier_data.to_tuple() == _member_ident(pg_driver, "1", "2", "xp").to_tuple()
+
+    await pg_driver.inc(_member_ident(pg_driver, "1", "2", "xp"), 1, 0)
+    await _wait_for(notified)
+    # Clearing the whole cog reaches the listeners of every category
+    await pg_driver.clear(
+        IdentifierData(pg_driver.cog_name, pg_driver.unique_cog_identifier, "", (), (), 0)
+    )
+    assert (await _wait_for(notified)).category == ""
+
+    # Writes to categories nobody listens to aren't notified
+    guild_ident = IdentifierData(
+        pg_driver.cog_name, pg_driver.unique_cog_identifier, "GUILD", ("1",), ("prefix",), 1
+    )
+    await pg_driver.set(guild_ident, "!")
+    await pg_driver.set(_member_ident(pg_driver, "1", "3", "xp"), 1)
+    assert (await _wait_for(notified)).category == "MEMBER"
+
+
+async def test_listener_reconnects(pg_driver):
+    notified: "asyncio.Queue[IdentifierData]" = asyncio.Queue()
+    await pg_driver.add_invalidation_listener("MEMBER", notified.put_nowait)
+    conn = PostgresDriver._listener_conn
+    await pg_driver._execute("SELECT pg_terminate_backend($1)", conn.get_server_pid())
+
+    # Everything listened to is invalidated, since writes may have been missed
+    assert (await _wait_for(notified)).primary_key == ()
+    for _ in range(50):
+        if PostgresDriver._listener_conn not in (None, conn):
+            break
+        await asyncio.sleep(0.1)
+    assert PostgresDriver._listener_conn not in (None, conn)
+    await pg_driver.set(_member_ident(pg_driver, "1", "2", "xp"), 5)
+    assert (await _wait_for(notified)).identifiers == ("xp",)
+
+
+async def test_find_uses_field_index(pg_driver):
+    category = IdentifierData(
+        pg_driver.cog_name, pg_driver.unique_cog_identifier, "CASES", (), (), 2, True
+    )
+    pg_driver.declare_index(category, "user")
+    # The index is created by the first lookup, even before the table exists
+    assert await pg_driver.find(category, {"user": 10}) == {}
+    indexes = await pg_driver._execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = $1 AND tablename = 'CASES'",
+        f"{pg_driver.cog_name}.{pg_driver.unique_cog_identifier}",
+        method="fetch",
+    )
+    assert any("'user'" in row["indexdef"] for row in indexes)
+
+    for pkeys, document in (
+        (("1", "1"), {"user": 10, "moderator": 20}),
+        (("1", "2"), {"user": 11, "moderator": 20}),
+        (("2", "1"), {"user": 10, "moderator": 21}),
+    ):
+        await pg_driver.set(category.get_child(*pkeys), document)
+
+    assert await pg_driver.find(category, {"user": 10}) == {
+        ("1", "1"): {"user": 10, "moderator": 20},
+        ("2", "1"): {"user": 10, "moderator": 21},
+    }
+    # Criteria which aren't indexed are checked on the fetched documents
+    assert await pg_driver.find(category.get_child("1"), {"user": 10}) == {
+        ("1",): {"user": 10, "moderator": 20}
+    }
+    assert await pg_driver.find(category, {"user": 10, "moderator": 22}) == {}
+
+
+async def test_get_fields(pg_driver):
+    member = _member_ident(pg_driver, "1", "2")
+    assert await pg_driver.get_fields(member, ["xp"]) == {}
+    await pg_driver.set(member, {"xp": 5, "settings": {"a": 1}, "name": None})
+    assert await pg_driver.get_fields(member, ["xp", "settings", "name", "missing"]) == {
+        "xp": 5,
+        "settings": {"a": 1},
+        "name": None,
+    }
+    assert await pg_driver.get_fields(member.get_child("settings"), ["a"]) == {"a": 1}
+
+
+async def test_ndjson_export_import(pg_driver):
+    for member_id in range(3):
+        await pg_driver.set(_member_ident(pg_driver, "1", str(member_id), "xp"), member_id)
+    custom_ident = IdentifierData(
+        pg_driver.cog_name, pg_driver.unique_cog_identifier, "CUSTOM", (), (), 1, True
+    )
+    await pg_driver.set(custom_ident.get_child("a", "x"), True)
+    global_ident = IdentifierData(
+        pg_driver.cog_name, pg_driver.unique_cog_identifier, "GLOBAL", (), (), 0
+    )
+    await pg_driver.set(global_ident.get_child("x"), 1)
+    custom_group_data = {pg_driver.cog_name: {pg_driver.unique_cog_identifier: {"CUSTOM": 1}}}
+
+    fp = io.StringIO()
+    await PostgresDriver.export_ndjson(fp, custom_group_data, batch_size=2)
+    exported = [
+        (line["category"], line["primary_key"], line["data"])
+        for line in map(json.loads, fp.getvalue().splitlines()[1:])
+        if line["cog_id"] == pg_driver.unique_cog_identifier
+    ]
+    assert sorted(exported) == [
+        ("CUSTOM", ["a"], {"x": True}),
+        ("GLOBAL", [], {"x": 1}),
+        *(("MEMBER", ["1", str(member_id)], {"xp": member_id}) for member_id in range(3)),
+    ]
+
+    await pg_driver.clear(
+        IdentifierData(pg_driver.cog_name, pg_driver.unique_cog_identifier, "", (), (), 0)
+    )
+    fp.seek(0)
+    await PostgresDriver.import_ndjson(fp, chunk_size=2)
+    assert await pg_driver.get(_member_ident(pg_driver, "1")) == {
+        str(member_id): {"xp": member_id} for member_id in range(3)
+    }
+    assert await pg_driver.get(custom_ident) == {"a": {"x": True}}
+    assert await pg_driver.get(global_ident) == {"x": 1}
+
+
+async def test_aiter_documents_releases_connection_between_batches(pg_driver):
+    # Sorted differently as text, which must not make any page skip documents
+    member_ids = ["9", "10", "8", "100", "7"]
+    for member_id in member_ids:
+        await pg_driver.set(_member_ident(pg_driver, "1", member_id, "xp"), int(member_id))
+    await PostgresDriver.teardown()
+    await PostgresDriver.initialize(**data_manager.storage_details(), min_size=1, max_size=1)
+    try:
+        seen = []
+        documents = pg_driver.aiter_documents(_member_ident(pg_driver, "1"), batch_size=2)
+        async for pkeys, document in documents:
+            seen.append((pkeys, document))
+            # As the data deletion handlers do while iterating over all members
+            await asyncio.wait_for(pg_driver.clear(_member_ident(pg_driver, "1", *pkeys)), 5)
+        assert seen == [
+            ((member_id,), {"xp": int(member_id)}) for member_id in sorted(member_ids, key=int)
+        ]
+        with pytest.raises(KeyError):
+            await pg_driver.get(_member_ident(pg_driver, "1"))
+    finally:
+        await PostgresDriver.teardown()
+        await PostgresDriver.initialize(**data_manager.storage_details())
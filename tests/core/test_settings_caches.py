@@ -0,0 +1,76 @@
+from argparse import Namespace
+from collections import namedtuple
+
+from redbot.core._settings_caches import DisabledCogCache, PrefixManager, PrefixMatcher
+
+Guild = namedtuple("Guild", "id")
+
+
+async def test_prefix_manager_invalidate(config):
+    config.register_global(prefix=[])
+    config.register_guild(prefix=[])
+    await config.prefix.set(["!"])
+    manager = PrefixManager(config, Namespace(prefix=[]))
+    guild = Guild(1)
+    assert await manager.get_prefixes(guild) == ["!"]
+
+    # A write made by another process
+    await config.guild(guild).prefix.set(["?"])
+    assert await manager.get_prefixes(guild) == ["!"]
+    manager.invalidate(config.guild(guild).prefix.identifier_data)
+    assert await manager.get_prefixes(guild) == ["?"]
+
+    await config.guild(guild).prefix.clear()
+    await config.prefix.set(["."])
+    manager.invalidate(config.guild(guild).identifier_data)
+    manager.invalidate(config.prefix.identifier_data)
+    assert await manager.get_prefixes(guild) == ["."]
+    assert await manager.get_prefixes(None) == ["."]
+
+
+def test_prefix_matcher():
+    matcher = PrefixMatcher(["<@1> ", "<@!1> ", "!!", "!", "<"])
+    assert matcher.match("!!ping") == "!!"
+    assert matcher.match("!ping") == "!"
+    assert matcher.match("<@1> ping") == "<@1> "
+    assert matcher.match("<@2> ping") == "<"
+    assert matcher.match("hello") is None
+    assert matcher.match("") is None
+    # The first matching prefix wins, as with discord.py's matching
+    assert PrefixMatcher(["!", "!!"]).match("!!ping") == "!"
+    assert PrefixMatcher([""]).match("hello") == ""
+
+
+async def test_prefix_manager_matcher_invalidate(config):
+    config.register_global(prefix=[])
+    config.register_guild(prefix=[])
+    await config.prefix.set(["!"])
+    manager = PrefixManager(config, Namespace(prefix=[]))
+    guild = Guild(1)
+    matcher = await manager.get_matcher(guild, ("<@1> ",))
+    assert matcher.prefixes == ("<@1> ", "!")
+    assert await manager.get_matcher(guild, ("<@1> ",)) is matcher
+
+    await manager.set_prefixes(guild, ["?"])
+    assert (await manager.get_matcher(guild, ("<@1> ",))).prefixes == ("<@1> ", "?")
+
+    await config.prefix.set(["."])
+    manager.invalidate(config.prefix.identifier_data)
+    assert (await manager.get_matcher(None)).prefixes == (".",)
+
+
+async def test_disabled_cog_cache_invalidate(config):
+    config.init_custom("COG_DISABLE_SETTINGS", 2)
+    config.register_custom("COG_DISABLE_SETTINGS", disabled=None)
+    cache = DisabledCogCache(config)
+    assert await cache.cog_disabled_in_guild("Cog", 1) is False
+
+    group = config.custom("COG_DISABLE_SETTINGS", "Cog", 0)
+    await group.disabled.set(True)
+    cache.invalidate(group.disabled.identifier_data)
+    assert await cache.cog_disabled_in_guild("Cog", 1) is True
+
+    group = config.custom("COG_DISABLE_SETTINGS", "Cog", 1)
+    await group.disabled.set(False)
+    cache.invalidate(group.identifier_data)
+    assert await cache.cog_disabled_in_guild("Cog", 1) is False
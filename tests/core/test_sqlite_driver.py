@@ -0,0 +1,186 @@
+import io
+import json
+import random
+
+import pytest
+
+from redbot.core import errors
+from redbot.core._drivers import IdentifierData, JsonDriver, SqliteDriver
+
+
+@pytest.fixture()
+async def sqlite_driver(tmp_path):
+    if SqliteDriver._conn is not None:
+        # The session is already running with the SQLite backend
+        yield SqliteDriver("PyTestSqlite", str(random.randint(1, 999999)))
+        return
+    await SqliteDriver.initialize(path=tmp_path / "config.sqlite3")
+    try:
+        yield SqliteDriver("PyTestSqlite", str(random.randint(1, 999999)))
+    finally:
+        await SqliteDriver.teardown()
+
+
+def _member_ident(driver, *pkeys_and_identifiers):
+    pkeys, identifiers = pkeys_and_identifiers[:2], pkeys_and_identifiers[2:]
+    return IdentifierData(
+        driver.cog_name, driver.unique_cog_identifier, "MEMBER", pkeys, identifiers, 2
+    )
+
+
+async def test_partial_primary_key(sqlite_driver):
+    await sqlite_driver.set(_member_ident(sqlite_driver, "1", "2", "xp"), 5)
+    await sqlite_driver.set(_member_ident(sqlite_driver, "1", "3", "xp"), 10)
+    await sqlite_driver.set(_member_ident(sqlite_driver, "11", "2", "xp"), 15)
+
+    assert await sqlite_driver.get(_member_ident(sqlite_driver, "1")) == {
+        "2": {"xp": 5},
+        "3": {"xp": 10},
+    }
+    await sqlite_driver.set(_member_ident(sqlite_driver, "1"), {"4": {"xp": 20}})
+    assert await sqlite_driver.get(_member_ident(sqlite_driver)) == {
+        "1": {"4": {"xp": 20}},
+        "11": {"2": {"xp": 15}},
+    }
+    await sqlite_driver.clear(_member_ident(sqlite_driver, "1"))
+    with pytest.raises(KeyError):
+        await sqlite_driver.get(_member_ident(sqlite_driver, "1"))
+    assert await sqlite_driver.get(_member_ident(sqlite_driver, "11", "2", "xp")) == 15
+
+
+async def test_inc_and_toggle(sqlite_driver):
+    ident = _member_ident(sqlite_driver, "1", "2", "xp")
+    assert await sqlite_driver.inc(ident, 5, 100) == 105
+    assert await sqlite_driver.inc(ident, -5, 100) == 100
+    assert await sqlite_driver.get(ident) == 100
+
+    ident = _member_ident(sqlite_driver, "1", "2", "muted")
+    assert await sqlite_driver.toggle(ident, False) is True
+    assert await sqlite_driver.toggle(ident, False) is False
+    with pytest.raises(errors.StoredTypeError):
+        await sqlite_driver.inc(ident, 1, 0)
+
+
+@pytest.mark.parametrize("document", [0, False, "", []])
+async def test_cannot_set_subfield_of_falsy_document(sqlite_driver, document):
+    await sqlite_driver.set(_member_ident(sqlite_driver, "1", "2"), document)
+    with pytest.raises(errors.CannotSetSubfield):
+        await sqlite_driver.set(_member_ident(sqlite_driver, "1", "2", "xp"), 5)
+    with pytest.raises(errors.CannotSetSubfield):
+        await sqlite_driver.inc(_member_ident(sqlite_driver, "1", "2", "xp"), 5, 0)
+    assert await sqlite_driver.get(_member_ident(sqlite_driver, "1", "2")) == document
+
+
+async def test_import_from_json(sqlite_driver, tmp_path):
+    json_driver = JsonDriver(
+        sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier, data_path_override=tmp_path
+    )
+    await json_driver.set(_member_ident(json_driver, "1", "2", "xp"), 5)
+    await json_driver.set(
+        IdentifierData(
+            json_driver.cog_name, json_driver.unique_cog_identifier, "GLOBAL", (), ("x",), 0
+        ),
+        True,
+    )
+
+    await sqlite_driver.import_data(await json_driver.export_data({}), {})
+
+    assert await sqlite_driver.get(_member_ident(sqlite_driver, "1", "2")) == {"xp": 5}
+    assert await sqlite_driver.get(
+        IdentifierData(
+            sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier, "GLOBAL", (), (), 0
+        )
+    ) == {"x": True}
+
+
+async def test_migrate_from_json(sqlite_driver):
+    json_driver = JsonDriver(sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier)
+    for member_id in range(5):
+        await json_driver.set(_member_ident(json_driver, "1", str(member_id), "xp"), member_id)
+    await json_driver.set(
+        IdentifierData(
+            json_driver.cog_name, json_driver.unique_cog_identifier, "CUSTOM", ("a",), ("x",), 1
+        ),
+        True,
+    )
+    # Global data has no primary key to split into chunks
+    await json_driver.set(
+        IdentifierData(
+            json_driver.cog_name, json_driver.unique_cog_identifier, "GLOBAL", (), ("x",), 0
+        ),
+        1,
+    )
+    custom_group_data = {
+        sqlite_driver.cog_name: {sqlite_driver.unique_cog_identifier: {"CUSTOM": 1}}
+    }
+
+    await JsonDriver.migrate_to(SqliteDriver, custom_group_data, workers=2, chunk_size=2)
+
+    assert await sqlite_driver.get(_member_ident(sqlite_driver, "1")) == {
+        str(member_id): {"xp": member_id} for member_id in range(5)
+    }
+    assert await sqlite_driver.get(
+        IdentifierData(
+            sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier, "CUSTOM", (), (), 1, True
+        )
+    ) == {"a": {"x": True}}
+    assert await sqlite_driver.get(
+        IdentifierData(
+            sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier, "GLOBAL", (), (), 0
+        )
+    ) == {"x": 1}
+
+
+async def test_ndjson_export_import(sqlite_driver):
+    json_driver = JsonDriver(sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier)
+    for member_id in range(5):
+        await json_driver.set(_member_ident(json_driver, "1", str(member_id), "xp"), member_id)
+    await json_driver.set(
+        IdentifierData(
+            json_driver.cog_name, json_driver.unique_cog_identifier, "CUSTOM", ("a",), ("x",), 1
+        ),
+        True,
+    )
+    custom_group_data = {
+        sqlite_driver.cog_name: {sqlite_driver.unique_cog_identifier: {"CUSTOM": 1}}
+    }
+
+    await json_driver.set(
+        IdentifierData(
+            json_driver.cog_name, json_driver.unique_cog_identifier, "GLOBAL", (), ("x",), 0
+        ),
+        1,
+    )
+
+    fp = io.StringIO()
+    assert await JsonDriver.export_ndjson(fp, custom_group_data, batch_size=2) == 7
+    lines = fp.getvalue().splitlines()
+    assert json.loads(lines[2]) == {
+        "cog_name": sqlite_driver.cog_name,
+        "cog_id": sqlite_driver.unique_cog_identifier,
+        "category": "MEMBER",
+        "primary_key": ["1", "0"],
+        "primary_key_len": 2,
+        "is_custom": False,
+        "data": {"xp": 0},
+    }
+
+    fp.seek(0)
+    assert await SqliteDriver.import_ndjson(fp, chunk_size=2) == 7
+
+    assert await sqlite_driver.get(_member_ident(sqlite_driver, "1")) == {
+        str(member_id): {"xp": member_id} for member_id in range(5)
+    }
+    assert await sqlite_driver.get(
+        IdentifierData(
+            sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier, "CUSTOM", (), (), 1, True
+        )
+    ) == {"a": {"x": True}}
+    assert await sqlite_driver.get(
+        IdentifierData(
+            sqlite_driver.cog_name, sqlite_driver.unique_cog_identifier, "GLOBAL", (), (), 0
+        )
+    ) == {"x": 1}
+
+    with pytest.raises(ValueError):
+        await SqliteDriver.import_ndjson(io.StringIO(lines[1] + "\n"))
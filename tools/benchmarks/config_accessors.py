@@ -0,0 +1,74 @@
+"""Measure the cost of building Config accessors like config.guild(guild).prefix.
+
+Usage: python tools/benchmarks/config_accessors.py [--guilds 100] [--accesses 200000]
+
+Compares attribute chains on the cached groups and values against
+building every Group, IdentifierData and Value anew, as was done before
+they were cached, by dropping the cache before each access. Reports the
+accesses per second, and the memory allocated per access with tracemalloc.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+from redbot.core import Config
+from redbot.core._drivers import JsonDriver
+
+SAMPLES = 10_000
+
+
+def _measure(
+    access: Callable[[int], object], num_guilds: int, num_accesses: int
+) -> Tuple[float, float]:
+    guild_ids = [random.randrange(num_guilds) for _ in range(num_accesses)]
+    start = time.perf_counter()
+    for guild_id in guild_ids:
+        access(guild_id)
+    accesses_per_sec = num_accesses / (time.perf_counter() - start)
+
+    # The peak memory while building one chain, above what was allocated before it
+    tracemalloc.start()
+    allocated = 0
+    for guild_id in guild_ids[:SAMPLES]:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        access(guild_id)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return accesses_per_sec, allocated / min(num_accesses, SAMPLES)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--accesses", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cog_name = f"Bench{random.randint(0, 10**9)}"
+        config = Config(cog_name, "1", JsonDriver(cog_name, "1", data_path_override=Path(tmp)))
+        config.register_guild(prefix=None, settings={"embeds": True})
+
+        def cached(guild_id: int) -> object:
+            return config.guild_from_id(guild_id).settings.embeds
+
+        def uncached(guild_id: int) -> object:
+            config._invalidate_groups()
+            return config.guild_from_id(guild_id).settings.embeds
+
+        print(f"config.guild_from_id(id).settings.embeds, {args.guilds} guilds")
+        for name, access in (("uncached", uncached), ("cached", cached)):
+            accesses_per_sec, bytes_per_access = _measure(access, args.guilds, args.accesses)
+            print(
+                f"  {name:10} {accesses_per_sec:12.1f} accesses/sec"
+                f"  {bytes_per_access:8.1f} bytes allocated/access"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
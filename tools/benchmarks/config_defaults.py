@@ -0,0 +1,90 @@
+"""Measure the time and memory taken by Config.all_members() to fill in defaults.
+
+Usage: python tools/benchmarks/config_defaults.py [--members 100000] [--reads 5]
+
+Compares Config.all_members(), which overlays stored data onto the
+registered defaults in a single pass, against the previous approach of
+deep copying the defaults for every member with pickle.
+"""
+import argparse
+import asyncio
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from redbot.core import Config
+from redbot.core._drivers import JsonDriver
+
+MEMBER_DEFAULTS = {
+    "xp": 0,
+    "level": 0,
+    "muted": False,
+    "name": "",
+    "roles": [],
+    "settings": {"notify": True, "colour": None},
+}
+
+
+def _build_dataset(uuid: str, num_members: int) -> dict:
+    members = {}
+    for member_id in range(num_members):
+        guild = members.setdefault(str(member_id % 50), {})
+        guild[str(10**17 + member_id)] = {"xp": member_id, "level": member_id % 100}
+    return {uuid: {"MEMBER": members}}
+
+
+async def _pickled_defaults_all_members(config: Config) -> dict:
+    # The previous implementation of Config.all_members()
+    defaults = config.defaults.get(config.MEMBER, {})
+    all_data = await config._driver.get(config._get_base_group(config.MEMBER).identifier_data)
+    ret = {}
+    for guild_id, guild_data in all_data.items():
+        guild_ret = ret[int(guild_id)] = {}
+        for member_id, member_data in guild_data.items():
+            new_member_data = pickle.loads(pickle.dumps(defaults, -1))
+            new_member_data.update(member_data)
+            guild_ret[int(member_id)] = new_member_data
+    return ret
+
+
+async def _measure(coro_func, num_reads: int):
+    start = time.perf_counter()
+    for _ in range(num_reads):
+        await coro_func()
+    elapsed = (time.perf_counter() - start) / num_reads
+
+    tracemalloc.start()
+    result = await coro_func()
+    __, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--reads", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cog_name = f"Bench{random.randint(0, 10**9)}"
+        driver = JsonDriver(cog_name, "1", data_path_override=Path(tmp))
+        driver.data = _build_dataset("1", args.members)
+        config = Config(cog_name, "1", driver)
+        config.register_member(**MEMBER_DEFAULTS)
+
+        print(f"{args.members} members, mean of {args.reads} reads")
+        for name, coro_func in (
+            ("pickled defaults", lambda: _pickled_defaults_all_members(config)),
+            ("defaults overlay", config.all_members),
+        ):
+            elapsed, peak = await _measure(coro_func, args.reads)
+            print(f"  {name:18} {elapsed * 1000:8.1f} ms  peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,280 @@
+"""Run the same Config workloads against each storage backend.
+
+Usage: python tools/benchmarks/config_drivers.py [--backend json --backend sqlite]
+           [--members 100000] [--ops 2000] [--format markdown|json] [--output report.md]
+
+The workloads are a hot single value get, nested set_raw() calls,
+Config.all_members() over --members members, concurrent counters updated
+under their value locks, and Config.clear_all_members(). Each reports its
+throughput and per-operation latencies, so that the report of a driver
+change can be compared with one made before it. Latency percentiles are
+estimated to the upper bound of the LatencyHistogram bucket they fall in.
+
+The PostgreSQL backend connects using the PG* environment variables, the
+same as the test suite does with ``tox -e postgres``. The MongoDB driver
+is only kept for converting old instances, so it isn't benchmarked.
+
+The workloads can also be run as a smoke test, with small sizes, using
+``python -m pytest tools/benchmarks/config_drivers.py``. The backend used
+is selected with RED_STORAGE_TYPE, as with the test suite.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+from redbot.core import Config
+from redbot.core._drivers import BackendType, IdentifierData, get_driver_class
+from redbot.core._drivers.metrics import LatencyHistogram
+
+BACKENDS = {
+    "json": BackendType.JSON,
+    "sqlite": BackendType.SQLITE,
+    "postgres": BackendType.POSTGRES,
+}
+NUM_GUILDS = 50
+NUM_COUNTERS = 10
+CONCURRENCY = 50
+
+Guild = namedtuple("Guild", "id")
+
+
+class Workload:
+    """Times operations, recording their latencies."""
+
+    def __init__(self) -> None:
+        self.histogram = LatencyHistogram()
+        self.elapsed = 0.0
+
+    async def timed(self, awaitable: Awaitable[Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.histogram.observe(time.perf_counter() - start)
+
+    def result(self) -> Dict[str, Any]:
+        summary = self.histogram.to_dict()
+        del summary["buckets"]
+        return {
+            "ops": self.histogram.count,
+            "seconds": self.elapsed,
+            "ops_per_sec": self.histogram.count / self.elapsed if self.elapsed else 0.0,
+            **summary,
+        }
+
+
+def _members_dataset(num_members: int) -> Dict[str, Dict[str, Dict[str, int]]]:
+    members: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for member_id in range(num_members):
+        guild = members.setdefault(str(member_id % NUM_GUILDS), {})
+        guild[str(10**17 + member_id)] = {"xp": member_id, "level": member_id % 100}
+    return members
+
+
+async def _seed_members(config: Config, num_members: int) -> None:
+    identifier_data = IdentifierData(
+        config.cog_name, config.unique_identifier, Config.MEMBER, (), (), 2
+    )
+    await config._driver.set(identifier_data, _members_dataset(num_members))
+
+
+async def hot_get(config: Config, args: argparse.Namespace) -> Workload:
+    workload = Workload()
+    await config.prefix.set("!")
+    start = time.perf_counter()
+    for _ in range(args.ops):
+        await workload.timed(config.prefix())
+    workload.elapsed = time.perf_counter() - start
+    return workload
+
+
+async def nested_set_raw(config: Config, args: argparse.Namespace) -> Workload:
+    workload = Workload()
+    start = time.perf_counter()
+    for i in range(args.ops):
+        group = config.guild_from_id(i % NUM_GUILDS)
+        await workload.timed(group.set_raw("words", str(i % 100), "count", value=i))
+    workload.elapsed = time.perf_counter() - start
+    return workload
+
+
+async def all_members(config: Config, args: argparse.Namespace) -> Workload:
+    workload = Workload()
+    await _seed_members(config, args.members)
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        data = await workload.timed(config.all_members())
+    workload.elapsed = time.perf_counter() - start
+    assert sum(map(len, data.values())) == args.members
+    return workload
+
+
+async def concurrent_counters(config: Config, args: argparse.Namespace) -> Workload:
+    workload = Workload()
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(args.ops):
+        queue.put_nowait(i % NUM_COUNTERS)
+
+    async def increment(value) -> None:
+        async with value.get_lock():
+            await value.set(await value() + 1)
+
+    async def worker() -> None:
+        while not queue.empty():
+            member_id = queue.get_nowait()
+            await workload.timed(increment(config.member_from_ids(0, member_id).counter))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    workload.elapsed = time.perf_counter() - start
+    members = await config.all_members(Guild(0))
+    assert sum(data["counter"] for data in members.values()) == args.ops
+    return workload
+
+
+async def clear_all_members(config: Config, args: argparse.Namespace) -> Workload:
+    workload = Workload()
+    for _ in range(args.reads):
+        await _seed_members(config, args.members)
+        start = time.perf_counter()
+        await workload.timed(config.clear_all_members())
+        workload.elapsed += time.perf_counter() - start
+    assert not await config.all_members()
+    return workload
+
+
+WORKLOADS: Dict[str, Callable[[Config, argparse.Namespace], Awaitable[Workload]]] = {
+    "hot_get": hot_get,
+    "nested_set_raw": nested_set_raw,
+    "all_members": all_members,
+    "concurrent_counters": concurrent_counters,
+    "clear_all_members": clear_all_members,
+}
+
+
+@contextlib.asynccontextmanager
+async def _initialized(backend: str, tmp: Path) -> AsyncIterator[Callable[[str], Config]]:
+    driver_cls = get_driver_class(BACKENDS[backend])
+    storage_details = {}
+    if backend == "sqlite":
+        storage_details["path"] = tmp / "config.sqlite3"
+    await driver_cls.initialize(**storage_details)
+
+    def get_config(cog_name: str) -> Config:
+        driver = driver_cls(cog_name, "1", data_path_override=tmp / cog_name)
+        config = Config(cog_name, "1", driver)
+        config.register_global(prefix=None)
+        config.register_guild(words={})
+        config.register_member(xp=0, level=0, counter=0)
+        return config
+
+    try:
+        yield get_config
+    finally:
+        await driver_cls.teardown()
+
+
+async def run_backend(backend: str, args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """Run each workload against a backend, using a new cog for each of them."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        async with _initialized(backend, Path(tmp)) as get_config:
+            for name, workload_func in WORKLOADS.items():
+                config = get_config(f"Bench{random.randint(0, 10**9)}")
+                try:
+                    workload = await workload_func(config, args)
+                finally:
+                    await config.clear_all()
+                results[name] = workload.result()
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the benchmarks, and get the report as JSON serializable data."""
+    return {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"members": args.members, "ops": args.ops, "reads": args.reads},
+        "results": {backend: await run_backend(backend, args) for backend in args.backends},
+    }
+
+
+def format_markdown(report: Dict[str, Any]) -> str:
+    """Format a report as markdown tables, one per workload, with a row per backend."""
+    params = report["parameters"]
+    lines = [
+        "# Config driver benchmarks",
+        "",
+        f"Python {report['python']} on {report['platform']}, {params['members']} members,"
+        f" {params['ops']} operations, {params['reads']} reads.",
+    ]
+    for workload in WORKLOADS:
+        lines += [
+            "",
+            f"## {workload}",
+            "",
+            "| Backend | Ops | Ops/sec | Mean (ms) | p50 (ms) | p95 (ms) | p99 (ms) | Max (ms) |",
+            "|---|---:|---:|---:|---:|---:|---:|---:|",
+        ]
+        for backend, results in report["results"].items():
+            r = results[workload]
+            lines.append(
+                f"| {backend} | {r['ops']} | {r['ops_per_sec']:.1f} | {r['mean_ms']:.3f}"
+                f" | {r['p50_ms']:.3f} | {r['p95_ms']:.3f} | {r['p99_ms']:.3f}"
+                f" | {r['max_ms']:.3f} |"
+            )
+    return "\n".join(lines) + "\n"
+
+
+async def test_workloads():
+    backend = os.getenv("RED_STORAGE_TYPE", "json")
+    args = argparse.Namespace(backends=[backend], members=500, ops=100, reads=2)
+    report = await run(args)
+    assert set(report["results"][backend]) == set(WORKLOADS)
+    assert format_markdown(report).count(f"| {backend} |") == len(WORKLOADS)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backend",
+        dest="backends",
+        choices=BACKENDS,
+        action="append",
+        help="Backend to benchmark. Can be given multiple times. Defaults to json and sqlite.",
+    )
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=2_000)
+    parser.add_argument(
+        "--reads", type=int, default=5, help="Repetitions of all_members and clear_all_members."
+    )
+    parser.add_argument("--format", choices=("markdown", "json"), default="markdown")
+    parser.add_argument("--output", type=Path, help="File to write the report to.")
+    args = parser.parse_args()
+    if not args.backends:
+        args.backends = ["json", "sqlite"]
+
+    report = await run(args)
+    if args.format == "json":
+        text = json.dumps(report, indent=4) + "\n"
+    else:
+        text = format_markdown(report)
+    if args.output is None:
+        sys.stdout.write(text)
+    else:
+        args.output.write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
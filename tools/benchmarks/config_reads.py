@@ -0,0 +1,81 @@
+"""Measure Config read throughput with copy-free driver reads.
+
+Usage: python tools/benchmarks/config_reads.py [--members 50000] [--guild-keys 5000] [--reads 20]
+
+Compares Group.all() on a large guild blob and Config.all_members() on a
+large member dataset, reading through JsonDriver.get_view(), against a
+driver which deep copies the data on every read.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from redbot.core import Config
+from redbot.core._drivers import IdentifierData, JsonDriver
+
+Guild = namedtuple("Guild", "id")
+
+
+class CopyingJsonDriver(JsonDriver):
+    async def get_view(self, identifier_data: IdentifierData):
+        return await self.get(identifier_data)
+
+
+def _build_dataset(uuid: str, num_members: int, num_guild_keys: int) -> dict:
+    members = {}
+    for member_id in range(num_members):
+        guild = members.setdefault(str(member_id % 50), {})
+        guild[str(10**17 + member_id)] = {"xp": member_id, "level": member_id % 100}
+    guild_data = {
+        "prefix": "!",
+        "words": {str(i): {"count": i, "aliases": ["a", "b"]} for i in range(num_guild_keys)},
+    }
+    return {uuid: {"MEMBER": members, "GUILD": {"0": guild_data}}}
+
+
+async def _run(driver_cls, args) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cog_name = f"Bench{random.randint(0, 10**9)}"
+        driver = driver_cls(cog_name, "1", data_path_override=Path(tmp))
+        driver.data = _build_dataset("1", args.members, args.guild_keys)
+        config = Config(cog_name, "1", driver)
+        config.register_guild(prefix=None, words={}, enabled=True)
+        config.register_member(xp=0, level=0, muted=False)
+
+        for name, coro_func in (
+            ("Group.all()", lambda: config.guild_from_id(0).all()),
+            ("all_members(guild)", lambda: config.all_members(Guild(0))),
+            ("all_members()", lambda: config.all_members()),
+        ):
+            start = time.perf_counter()
+            for _ in range(args.reads):
+                await coro_func()
+            results[name] = args.reads / (time.perf_counter() - start)
+        del config, driver
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument("--guild-keys", type=int, default=5_000)
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+
+    copying = await _run(CopyingJsonDriver, args)
+    views = await _run(JsonDriver, args)
+    print(f"{args.members} members, {args.guild_keys} keys in the guild blob, {args.reads} reads")
+    for name, baseline in copying.items():
+        print(
+            f"  {name:20} copying: {baseline:8.1f} reads/sec"
+            f"  views: {views[name]:8.1f} reads/sec ({views[name] / baseline:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
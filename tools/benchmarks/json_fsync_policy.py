@@ -0,0 +1,84 @@
+"""Measure JsonDriver write throughput with each fsync policy.
+
+Usage: python tools/benchmarks/json_fsync_policy.py [--dir /dev/shm --dir ~/bench] [--writes 500]
+
+Run it with directories on the filesystems to compare, e.g. a tmpfs mount
+and an ext4 disk. Each write sets a member's XP in a small cog, so the
+time is dominated by the write and fsync calls rather than serialization.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from redbot.core._drivers import IdentifierData, JsonDriver
+from redbot.core._drivers.json import FSYNC_POLICIES
+
+
+def _filesystem_type(path: Path) -> str:
+    """Get the type of the filesystem mounted at the path, on Linux."""
+    path = path.resolve()
+    best_match, fs_type = "", "unknown"
+    try:
+        with open("/proc/mounts", encoding="utf-8") as fs:
+            for line in fs:
+                _, mount_point, mount_type, *_ = line.split()
+                try:
+                    path.relative_to(mount_point)
+                except ValueError:
+                    continue
+                if len(mount_point) > len(best_match):
+                    best_match, fs_type = mount_point, mount_type
+    except OSError:
+        pass
+    return fs_type
+
+
+async def _run(directory: Path, num_writes: int, fsync: str) -> float:
+    await JsonDriver.initialize(fsync=fsync)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        cog_name = f"Bench{random.randint(0, 10**9)}"
+        driver = JsonDriver(cog_name, "1", data_path_override=Path(tmp))
+        start = time.perf_counter()
+        for i in range(num_writes):
+            member_id = random.randrange(1000)
+            ident = IdentifierData(
+                cog_name, "1", "MEMBER", ("1", str(10**17 + member_id)), ("xp",), 2
+            )
+            await driver.set(ident, i)
+        # The data isn't durable until the last fsync, so that's part of the time taken
+        await JsonDriver.teardown()
+        elapsed = time.perf_counter() - start
+        del driver
+    return num_writes / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--dir",
+        dest="dirs",
+        type=Path,
+        action="append",
+        help="Directory to write in. Can be given multiple times. Defaults to /dev/shm and ~.",
+    )
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args()
+    dirs: List[Path] = args.dirs or [
+        d for d in (Path("/dev/shm"), Path.home()) if d.is_dir() and os.access(d, os.W_OK)
+    ]
+
+    print(f"{args.writes} writes per run")
+    for directory in dirs:
+        print(f"{directory} ({_filesystem_type(directory)}):")
+        for fsync in FSYNC_POLICIES:
+            writes_per_sec = await _run(directory, args.writes, fsync)
+            print(f"  {fsync:<10} {writes_per_sec:10.1f} writes/sec")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Measure JsonDriver write throughput with and without write coalescing.
+
+Usage: python tools/benchmarks/json_write_coalescing.py [--members 50000] [--writes 200]
+
+Each write simulates a member XP tick on a cog storing data for the given
+number of members, which is the worst case for the full-file rewrite done
+by JsonDriver on every write.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from redbot.core._drivers import IdentifierData, JsonDriver
+
+
+def _build_dataset(uuid: str, num_members: int) -> dict:
+    members = {}
+    for member_id in range(num_members):
+        guild = members.setdefault(str(member_id % 50), {})
+        guild[str(10**17 + member_id)] = {"xp": member_id, "level": member_id % 100}
+    return {uuid: {"MEMBER": members}}
+
+
+async def _run(num_members: int, num_writes: int, **storage_details) -> float:
+    await JsonDriver.initialize(**storage_details)
+    with tempfile.TemporaryDirectory() as tmp:
+        cog_name = f"Bench{random.randint(0, 10**9)}"
+        driver = JsonDriver(cog_name, "1", data_path_override=Path(tmp))
+        driver.data = _build_dataset("1", num_members)
+        start = time.perf_counter()
+        for i in range(num_writes):
+            member_id = random.randrange(num_members)
+            ident = IdentifierData(
+                cog_name,
+                "1",
+                "MEMBER",
+                (str(member_id % 50), str(10**17 + member_id)),
+                ("xp",),
+                2,
+            )
+            await driver.set(ident, i)
+        await JsonDriver.teardown()
+        elapsed = time.perf_counter() - start
+        del driver
+    return num_writes / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    baseline = await _run(args.members, args.writes)
+    coalesced = await _run(args.members, args.writes, flush_interval=5, max_pending_writes=100)
+    print(f"{args.members} members, {args.writes} writes")
+    print(f"  write-through:  {baseline:10.1f} writes/sec")
+    print(f"  coalesced:      {coalesced:10.1f} writes/sec ({coalesced / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())